@@ -1 +1,9 @@
-# This will make sure the app is always imported when
\ No newline at end of file
+# This will make sure the app is always imported when Django starts so that
+# shared_task will use this app. Celery is optional: without it background
+# jobs run in-process (see video.tasks).
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ("celery_app",)
@@ -0,0 +1,17 @@
+"""
+Celery application for background jobs.
+
+Workers are started with ``celery -A ndas worker``; settings prefixed with
+``CELERY_`` configure it. Without a broker (or without celery installed) the
+jobs run in-process instead, see ``video.tasks``.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ndas.settings")
+
+app = Celery("ndas")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils.translation import gettext_lazy as _
 
+from ndas.custom_codes.ages import assessment_age_days
+
 
 class TimeStampedModel(models.Model):
     """
@@ -47,4 +49,76 @@ class UserTrackingMixin(models.Model):
     )
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+
+ASSESSMENT_AGE_FIELDS = ("age_days_at_assessment", "corrected_age_days_at_assessment")
+
+
+class AssessmentAgeMixin(models.Model):
+    """
+    Abstract base class storing the patient's age in days on the day of the
+    record, so age bands can be filtered and indexed in SQL. The ages are
+    recomputed on every save; ``AGE_REFERENCE_FIELD`` names the date field
+    they are measured at.
+    """
+
+    AGE_REFERENCE_FIELD = "date_of_assessment"
+
+    age_days_at_assessment = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_("Age at Assessment (days)"),
+        help_text=_("Chronological age in days on the assessment date"),
+    )
+    corrected_age_days_at_assessment = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_("Corrected Age at Assessment (days)"),
+        help_text=_("Age corrected for prematurity, in days, on the assessment date"),
+    )
+
+    class Meta:
+        abstract = True
+
+    def set_assessment_ages(self):
+        """Recompute the stored ages from the patient and the record date"""
+        patient = self.patient if self.patient_id else None
+        assessed_on = getattr(self, self.AGE_REFERENCE_FIELD)
+        if patient is None or assessed_on is None:
+            self.age_days_at_assessment = None
+            self.corrected_age_days_at_assessment = None
+            return
+        (age,), (corrected,) = assessment_age_days(
+            [patient.dob_tob], [patient.pog_wks], [patient.pog_days], [assessed_on]
+        )
+        self.age_days_at_assessment = age
+        self.corrected_age_days_at_assessment = corrected
+
+    def save(self, *args, **kwargs):
+        self.set_assessment_ages()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | set(ASSESSMENT_AGE_FIELDS)
+        super().save(*args, **kwargs)
+
+
+class CountedRecordMixin(models.Model):
+    """
+    Abstract base class for records counted in a patient counter column (see
+    ``patients.counters``). The save runs in a transaction, so the row write
+    and the counter adjustments made by its post_save handlers commit
+    together; ``delete()`` already runs its signals inside one.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
@@ -0,0 +1,262 @@
+"""
+Chronological and corrected age calculations.
+
+All functions take sequences (lists, tuples or NumPy arrays) and return NumPy
+arrays, so a whole page, export or cohort is computed in one call. Dates may be
+``date``/``datetime`` objects or ``datetime64`` values; datetimes are reduced to
+their date. Missing values (``None``) propagate as NaN.
+
+Months are calendar months everywhere (the same definition as
+``dateutil.relativedelta``): a baby born on 31 January is one month old on
+28/29 February.
+"""
+
+from datetime import date, datetime
+from typing import NamedTuple
+
+import numpy as np
+from django.utils import timezone
+
+TERM_DAYS = 40 * 7
+
+
+class AgeArrays(NamedTuple):
+    chronological_days: np.ndarray
+    corrected_days: np.ndarray
+    postmenstrual_days: np.ndarray
+    chronological_months: np.ndarray
+    corrected_months: np.ndarray
+
+
+def _as_day(value):
+    if value is None:
+        return np.datetime64("NaT", "D")
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return np.datetime64(value, "D")
+    return np.datetime64(value, "D")
+
+
+def to_days(values):
+    """Convert a sequence of dates/datetimes to a datetime64[D] array"""
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]")
+    return np.array([_as_day(value) for value in values], dtype="datetime64[D]")
+
+
+def _reference_days(reference, size):
+    if reference is None:
+        reference = timezone.now().date()
+    if isinstance(reference, (date, datetime, np.datetime64)):
+        return np.full(size, _as_day(reference), dtype="datetime64[D]")
+    return to_days(reference)
+
+
+def _as_float(values):
+    return np.array(
+        [np.nan if value is None else value for value in values], dtype=float
+    )
+
+
+def _days_between(start, end):
+    delta = (end - start).astype(float)
+    delta[np.isnat(start) | np.isnat(end)] = np.nan
+    return delta
+
+
+def _days_in_month(months):
+    return (
+        (months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")
+    ).astype(int)
+
+
+def _anniversary(start_month, start_day, months):
+    """start + months, with the day clamped to the last day of the month"""
+    month = start_month + months
+    return month.astype("datetime64[D]") + np.minimum(
+        start_day, _days_in_month(month) - 1
+    )
+
+
+def split_ymd(start, end):
+    """
+    Split the interval between two date arrays into calendar years, months and
+    days, returned as three float arrays. Intervals that run backwards have all
+    three parts negative.
+    """
+    start = to_days(start)
+    end = to_days(end)
+    missing = np.isnat(start) | np.isnat(end)
+    start = np.where(missing, np.datetime64("1970-01-01"), start)
+    end = np.where(missing, np.datetime64("1970-01-01"), end)
+    backwards = end < start
+
+    start_month = start.astype("datetime64[M]")
+    start_day = (start - start_month.astype("datetime64[D]")).astype(int)
+
+    # Step back one month when the anniversary overshoots the end date
+    months = (end.astype("datetime64[M]") - start_month).astype(int)
+    anniversary = _anniversary(start_month, start_day, months)
+    months = months - ((anniversary > end) & ~backwards)
+    months = months + ((anniversary < end) & backwards)
+    days = (end - _anniversary(start_month, start_day, months)).astype(float)
+
+    years = np.fix(months / 12)
+    months = months - years * 12
+    for part in (years, months, days):
+        part[missing] = np.nan
+    return years, months, days
+
+
+def completed_months(start, end):
+    """Completed calendar months between two date arrays"""
+    years, months, _days = split_ymd(start, end)
+    return years * 12 + months
+
+
+def gestation_days(pog_wks, pog_days):
+    """Gestational age at birth in days"""
+    return _as_float(pog_wks) * 7 + np.nan_to_num(_as_float(pog_days))
+
+
+def correction_days(pog_wks, pog_days):
+    """Days of prematurity to subtract for corrected age (0 for term babies)"""
+    return np.clip(TERM_DAYS - gestation_days(pog_wks, pog_days), 0, None)
+
+
+def compute_ages(dob_tob, pog_wks, pog_days, reference=None):
+    """
+    Chronological, corrected and postmenstrual ages for a batch of patients.
+
+    ``reference`` is a single date (today when omitted) or one date per patient.
+    """
+    dob = to_days(dob_tob)
+    ref = _reference_days(reference, len(dob))
+    gestation = gestation_days(pog_wks, pog_days)
+    correction = np.clip(TERM_DAYS - gestation, 0, None)
+
+    chronological = _days_between(dob, ref)
+    corrected_ref = ref - np.nan_to_num(correction).astype("timedelta64[D]")
+    corrected = _days_between(dob, corrected_ref)
+    corrected[np.isnan(correction)] = np.nan
+    postmenstrual = chronological + gestation
+
+    return AgeArrays(
+        chronological_days=chronological,
+        corrected_days=corrected,
+        postmenstrual_days=postmenstrual,
+        chronological_months=completed_months(dob, ref),
+        corrected_months=completed_months(dob, corrected_ref),
+    )
+
+
+def corrected_ymd(dob_tob, pog_wks, pog_days, reference=None):
+    """Corrected age as calendar years, months and days arrays"""
+    dob = to_days(dob_tob)
+    ref = _reference_days(reference, len(dob))
+    correction = np.nan_to_num(correction_days(pog_wks, pog_days))
+    return split_ymd(dob, ref - correction.astype("timedelta64[D]"))
+
+
+def format_gestational_age(postmenstrual_days):
+    """Format a postmenstrual age in days as "weeks + days", or "Term +" """
+    if np.isnan(postmenstrual_days):
+        return "Unknown"
+    weeks, days = divmod(int(postmenstrual_days), 7)
+    if weeks < 40:
+        return f"{weeks} + {days}"
+    return "Term +"
+
+
+def patient_ages(patients, reference=None):
+    """compute_ages for an iterable of Patient objects"""
+    patients = list(patients)
+    return compute_ages(
+        [patient.dob_tob for patient in patients],
+        [patient.pog_wks for patient in patients],
+        [patient.pog_days for patient in patients],
+        reference,
+    )
+
+
+def format_ymd(years, months, days):
+    """Format one years/months/days triple the way patient pages show ages"""
+    return f"{int(years)} Years {int(months)} Months {int(days)} Days"
+
+
+def age_ymd(dob, reference=None):
+    """Years/months/days between one date of birth and a reference date"""
+    years, months, days = split_ymd([dob], _reference_days(reference, 1))
+    return years[0], months[0], days[0]
+
+
+def display_ages(patients, reference=None):
+    """
+    The age strings shown on patient pages, computed for a whole list at once.
+
+    Returns one {"current", "corrected", "gestational"} dict per patient.
+    """
+    patients = list(patients)
+    if not patients:
+        return []
+    dob = [patient.dob_tob for patient in patients]
+    pog_wks = [patient.pog_wks for patient in patients]
+    pog_days = [patient.pog_days for patient in patients]
+
+    ages = compute_ages(dob, pog_wks, pog_days, reference)
+    current = split_ymd(dob, _reference_days(reference, len(dob)))
+    corrected = corrected_ymd(dob, pog_wks, pog_days, reference)
+
+    results = []
+    for index in range(len(patients)):
+        if np.isnan(ages.chronological_days[index]):
+            results.append(
+                {"current": "Unknown", "corrected": "Unknown", "gestational": "Unknown"}
+            )
+            continue
+        results.append(
+            {
+                "current": format_ymd(*(part[index] for part in current)),
+                "corrected": format_ymd(*(part[index] for part in corrected)),
+                "gestational": format_gestational_age(ages.postmenstrual_days[index]),
+            }
+        )
+    return results
+
+
+# Average calendar month, for turning month bands into day ranges
+DAYS_PER_MONTH = 365.25 / 12
+# Calendar months since any date stay within 3 days of the average-month
+# estimate, so a day range widened by this much holds every age of a band
+MONTH_BAND_SLACK_DAYS = 4
+
+
+def _as_int_or_none(values):
+    return [None if np.isnan(value) else int(value) for value in values]
+
+
+def assessment_age_days(dob_tob, pog_wks, pog_days, assessed_on):
+    """
+    Chronological and corrected age in days at each assessment date, as two
+    lists of ints (None where the dates or the gestation are missing).
+    """
+    if not len(dob_tob):
+        return [], []
+    ages = compute_ages(dob_tob, pog_wks, pog_days, to_days(assessed_on))
+    return _as_int_or_none(ages.chronological_days), _as_int_or_none(
+        ages.corrected_days
+    )
+
+
+def month_band_days(min_months, max_months):
+    """
+    Day range [low, high) holding every age of ``min_months`` to
+    ``max_months`` completed months, for range filters on stored day ages.
+    Ages within ``2 * MONTH_BAND_SLACK_DAYS`` of either end may fall outside
+    the band and need an exact ``completed_months`` check.
+    """
+    return (
+        int(np.floor(min_months * DAYS_PER_MONTH)) - MONTH_BAND_SLACK_DAYS,
+        int(np.floor((max_months + 1) * DAYS_PER_MONTH)) + MONTH_BAND_SLACK_DAYS,
+    )
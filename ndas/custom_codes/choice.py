@@ -44,6 +44,16 @@ BOOKMARK_TYPE = (
     ("CDICR", "CDICR"),
 )
 
+SEARCH_ENTITY_TYPE = BOOKMARK_TYPE + (("Bookmark", "Bookmark"),)
+
+IDENTIFIER_KIND = (
+    ("BHT", "BHT Number"),
+    ("NNC", "NNC Number"),
+    ("PTC", "PTC Number"),
+    ("PC", "PC Number"),
+    ("PIN", "PIN / PHN"),
+)
+
 ATTACHMENT_TYPE = (("Photo", "Photo"), ("PDF", "PDF"), ("Video", "Video"))
 DX_CONCLUTION = (("NORMAL", "NORMAL"), ("ABNORMAL", "ABNORMAL"))
 
@@ -167,3 +177,11 @@ ALLOWED_EXTENSIONS = {
     "video": [".mp4", ".mov", ".avi", ".mkv", ".webm"],
     "document": [".doc", ".docx", ".txt", ".rtf", ".odt"],
 }
+
+RECOMMENDATION_RULES = [
+    ("GMA_FIRST_WM", "Initial GMA (writhing movements)"),
+    ("GMA_FIRST_FM", "Initial GMA (fidgety movements)"),
+    ("GMA_SECOND", "Second GMA"),
+    ("HINE_DUE", "HINE due"),
+    ("MDT_REFERRAL", "MDT referral"),
+]
@@ -0,0 +1,229 @@
+"""
+Cached row counts for list pages and stats cards.
+
+``cached_count(queryset)`` stores ``COUNT(*)`` results under a key made of the
+query's SQL signature and the version of every table the query reads. Any
+save or delete on one of those tables bumps its version (see
+``patients.signals``), so cached counts never outlive a write for longer than
+the transaction; bulk ``update()``/``delete()`` calls, which send no signals,
+are covered by ``TIMEOUT``.
+
+Unfiltered totals of large tables come from the planner's row estimate
+(``pg_class.reltuples`` on PostgreSQL, ``sqlite_stat1`` on SQLite) instead of
+a full scan. Those figures are only as fresh as the last ANALYZE, which is
+why callers present them as "about N"; ``count_with_estimate`` tells them
+whether a figure is one.
+
+``ManagerStats`` declares the buckets of a stats card once and counts them
+all with a single conditional aggregation, cached the same way.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+from django.db.models import Count
+from django.db.models.sql import Query
+
+CACHE_PREFIX = "counts"
+VERSION_PREFIX = "counts:version"
+TIMEOUT = 300
+# Below this many rows an exact COUNT(*) is cheap enough and estimates are
+# too coarse to be worth showing
+ESTIMATE_THRESHOLD = 10000
+
+
+def _version_key(table):
+    return f"{VERSION_PREFIX}:{table}"
+
+
+def _expression_tables(node, tables):
+    if isinstance(node, Query):
+        _query_tables(node, tables)
+        return
+    # Subquery and Exists wrap the query they run
+    if isinstance(getattr(node, "query", None), Query):
+        _query_tables(node.query, tables)
+    children = getattr(node, "children", None)
+    if children is None and hasattr(node, "get_source_expressions"):
+        children = node.get_source_expressions()
+    for child in children or ():
+        if child is not None:
+            _expression_tables(child, tables)
+
+
+def _query_tables(query, tables):
+    """Add every table ``query`` reads, nested subqueries included"""
+    if query.model is not None:
+        tables.add(query.model._meta.db_table)
+    tables.update(
+        join.table_name
+        for join in query.alias_map.values()
+        if isinstance(join.table_name, str)
+    )
+    _expression_tables(query.where, tables)
+    for annotation in query.annotations.values():
+        _expression_tables(annotation, tables)
+    for combined in query.combined_queries:
+        _query_tables(combined, tables)
+
+
+def _tables(queryset):
+    tables = set()
+    _query_tables(queryset.query, tables)
+    return sorted(tables)
+
+
+def _versions(tables):
+    keys = [_version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so a lost version key never resurrects
+            # counts still cached under a small version number
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(model):
+    """Make every cached count that reads ``model``'s table unreachable"""
+    key = _version_key(model._meta.db_table)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), None)
+
+
+def _signature(queryset, extra=""):
+    query = queryset.order_by().query
+    sql, params = query.sql_with_params()
+    raw = f"{queryset.db}|{sql}|{params!r}|{extra}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_key(signature, queryset):
+    versions = _versions(_tables(queryset))
+    return f"{CACHE_PREFIX}:{signature}:{'.'.join(map(str, versions))}"
+
+
+def _is_unfiltered(queryset):
+    query = queryset.query
+    return not (
+        query.where
+        or query.distinct
+        or query.combinator
+        or query.group_by
+        or query.low_mark
+        or query.high_mark is not None
+    )
+
+
+def estimate(model, using="default"):
+    """Planner row estimate for ``model``'s table, or None when unavailable"""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+        params = [connection.ops.quote_name(table)]
+    elif connection.vendor == "sqlite":
+        # The first number of each stat is the row count of that index
+        sql = "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s"
+        params = [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+    if not row or row[0] is None or row[0] < 0:
+        # reltuples is -1 on PostgreSQL until the table is first analyzed
+        return None
+    return int(row[0])
+
+
+def count_with_estimate(queryset, estimated=True):
+    """
+    ``(count, is_estimate)`` for ``queryset``, cached until one of the tables
+    it reads changes.
+
+    With ``estimated``, an unfiltered queryset over a table of at least
+    ``ESTIMATE_THRESHOLD`` rows is answered from the planner estimate and
+    ``is_estimate`` is True; every other count is an exact ``COUNT(*)``.
+    """
+    if queryset._result_cache is not None:
+        return len(queryset._result_cache), False
+    try:
+        signature = _signature(queryset)
+    except EmptyResultSet:
+        return 0, False
+
+    key = _cache_key(signature, queryset)
+    cached = cache.get(key)
+    if isinstance(cached, tuple):
+        return cached
+
+    count = None
+    if estimated and _is_unfiltered(queryset):
+        count = estimate(queryset.model, queryset.db)
+        if count is not None and count < ESTIMATE_THRESHOLD:
+            count = None
+    result = (count, True) if count is not None else (queryset.count(), False)
+    cache.set(key, result, TIMEOUT)
+    return result
+
+
+def cached_count(queryset, estimated=True):
+    """``queryset.count()``, cached; see ``count_with_estimate``"""
+    return count_with_estimate(queryset, estimated)[0]
+
+
+class ManagerStats:
+    """
+    Named row counts over a queryset, computed in one ``aggregate()`` query.
+
+    Each bucket is a ``Q`` object, ``None`` for all rows, or a callable
+    returning a ``Q`` for buckets relative to the current date::
+
+        HINE_STATS = ManagerStats(
+            total=None,
+            normal=Q(score__gte=60),
+            this_month=lambda: Q(date_of_assessment__gte=month_ago()),
+        )
+        hine_stats = HINE_STATS.compute(var_hine_list)
+    """
+
+    def __init__(self, **buckets):
+        self.buckets = buckets
+
+    def conditions(self):
+        return {
+            name: bucket() if callable(bucket) else bucket
+            for name, bucket in self.buckets.items()
+        }
+
+    def compute(self, queryset, cached=True):
+        """Return ``{bucket name: count}`` for ``queryset``"""
+        conditions = self.conditions()
+        aggregates = {
+            name: Count("pk", filter=condition) if condition else Count("pk")
+            for name, condition in conditions.items()
+        }
+        if not cached:
+            return queryset.order_by().aggregate(**aggregates)
+        try:
+            signature = _signature(queryset, repr(sorted(conditions.items())))
+        except EmptyResultSet:
+            return dict.fromkeys(conditions, 0)
+
+        key = _cache_key(signature, queryset)
+        stats = cache.get(key)
+        if stats is None:
+            stats = queryset.order_by().aggregate(**aggregates)
+            cache.set(key, stats, TIMEOUT)
+        return stats
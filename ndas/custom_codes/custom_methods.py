@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
-from django.db.models.functions import TruncMonth
-from django.db.models import Count, Q
+from django.db.models import Count
 import os, math
 from django.utils.timezone import localtime, now
 from django.utils import timezone
@@ -37,64 +36,74 @@ def get_all_diagnosis_data():
 
     return diagnosis_data
 
-def get_userStats():
-    from patients.models import GMAssessment, HINEAssessment, DevelopmentalAssessment, Patient, CDICRecord, Attachment, Bookmark
-    from video.models import Video
+# (label, app label, model name, user field) for the per-user contribution stats
+USER_STAT_SOURCES = (
+    ('Patient', 'patients', 'Patient', 'added_by'),
+    ('Video', 'video', 'Video', 'added_by'),
+    ('GMA', 'patients', 'GMAssessment', 'added_by'),
+    ('HINE', 'patients', 'HINEAssessment', 'added_by'),
+    ('DA', 'patients', 'DevelopmentalAssessment', 'added_by'),
+    ('CDIC', 'patients', 'CDICRecord', 'added_by'),
+    ('Attachment', 'patients', 'Attachment', 'added_by'),
+    ('Bookmark', 'patients', 'Bookmark', 'owner'),
+)
+
+def get_userStats(days=None):
+    """
+    Per-user record counts, as {username: {label: count}}.
+
+    Each model is counted with a single GROUP BY on its user field. Pass ``days``
+    to only count records created in that many recent days.
+    """
+    from django.apps import apps
     from users.models import CustomUser
 
-    user_list = CustomUser.objects.all()
-    pt_list = Patient.objects.all()
-    video_list = Video.objects.all()
-    gma_list = GMAssessment.objects.all()
-    hine_list = HINEAssessment.objects.all()
-    da_list = DevelopmentalAssessment.objects.all()
-    cdic_list = CDICRecord.objects.all()
-    attachments_list = Attachment.objects.all()
-    bookmark_list = Bookmark.objects.all()
-    
-    user_stats_val = {}
-    user_stats = {}
-    
-    for u_o in user_list:
-        user_stats_val = {'Patient': getCountZeroIfNone(pt_list.filter(added_by=u_o)),
-        'Video': getCountZeroIfNone(video_list.filter(added_by=u_o)),
-        'GMA': getCountZeroIfNone(gma_list.filter(added_by=u_o)),
-        'HINE': getCountZeroIfNone(hine_list.filter(added_by=u_o)),
-        'DA': getCountZeroIfNone(da_list.filter(added_by=u_o)),
-        'CDIC': getCountZeroIfNone(cdic_list.filter(added_by=u_o)),
-        'Attachment': getCountZeroIfNone(attachments_list.filter(added_by=u_o)),
-        'Bookmark': getCountZeroIfNone(bookmark_list.filter(owner=u_o)),
-        }
-        
-        # add each users data to final list
-        user_stats[u_o.username] = user_stats_val
-        
+    usernames = dict(CustomUser.objects.values_list('id', 'username'))
+    user_stats = {
+        username: dict.fromkeys([source[0] for source in USER_STAT_SOURCES], 0)
+        for username in usernames.values()
+    }
+
+    since = timezone.now() - timedelta(days=days) if days else None
+    for label, app_label, model_name, user_field in USER_STAT_SOURCES:
+        records = apps.get_model(app_label, model_name).objects.filter(
+            **{f'{user_field}__isnull': False}
+        )
+        if since is not None:
+            records = records.filter(created_at__gte=since)
+        counts = records.order_by().values_list(user_field).annotate(total=Count('id'))
+        for user_id, total in counts:
+            username = usernames.get(user_id)
+            if username is not None:
+                user_stats[username][label] = total
+
     return user_stats
 
-def get_admissions_data_barchart():
-    from patients.models import Patient
+def get_admissions_data_barchart(months=5, moh_area=None, years=None):
+    # Births per month, or per year when ``years`` is given, read from the
+    # daily rollup table (see patients.rollups)
+    from patients.rollups import monthly_rollups, yearly_rollups
 
     today = datetime.now().date()
-    five_months_ago = today - timedelta(days=30*5)
-
-    admissions = (
-        Patient.objects
-        .filter(dob_tob__gte=five_months_ago)
-        .annotate(month=TruncMonth('dob_tob'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
-
-    months = []
+    if years:
+        rows = yearly_rollups(
+            start=today.replace(year=today.year - years + 1, month=1, day=1),
+            moh_area=moh_area,
+        )
+        label_format = '%Y'
+    else:
+        rows = monthly_rollups(start=today - timedelta(days=30*months), moh_area=moh_area)
+        label_format = '%b %Y'
+
+    labels = []
     counts = []
-    
-    for admission in admissions:
-        months.append(admission['month'].strftime('%b %Y'))
-        counts.append(admission['count'])
+
+    for row in rows:
+        labels.append(row['period'].strftime(label_format))
+        counts.append(row['births'])
 
     return {
-        'labels': months,
+        'labels': labels,
         'data': counts,
     }
 
@@ -170,7 +179,8 @@ def get_compressed_video_path(instance, filename):
 
 def get_video_thumbnail_path(instance, filename):
     """
-    Generate path for video thumbnail images
+    Generate path for video thumbnail images; the stem of ``filename`` names
+    the kind of preview (poster, sprite, ...) and its extension is kept
     """
     import os
     from django.utils.text import slugify
@@ -184,8 +194,12 @@ def get_video_thumbnail_path(instance, filename):
     year = now.strftime('%Y')
     month = now.strftime('%m')
     
+    kind, ext = os.path.splitext(filename)
+    kind = slugify(kind) or 'thumb'
+    ext = ext.lower() or '.jpg'
+    
     timestamp = now.strftime('%Y%m%d_%H%M%S')
-    filename = f"{patient_name}_{title}_thumb_{timestamp}.jpg"
+    filename = f"{patient_name}_{title}_{kind}_{timestamp}{ext}"
     
     return os.path.join('videos', year, month, patient_name, 'thumbnails', filename)
 
@@ -231,34 +245,16 @@ def getCountZeroIfNone(var_value):
         return var_value.count()
 
 # get patients according to type
-def getPatientList(pts_type):
-    from patients.models import Patient
-    
-    try:
-        var_ptl = Patient.objects.all()
-    except:
-        var_ptl = None
-
-    if pts_type == PtStatus.ALL:
-        return var_ptl
-    elif pts_type == PtStatus.NEW:
-        return var_ptl.filter(videos__isnull=True).distinct()
-    elif pts_type == PtStatus.DISCHARGED:
-        return var_ptl.filter(cdicrecord__is_discharged=True).distinct()
-    elif pts_type == PtStatus.DIAGNOSED:
-        return var_ptl.filter(Q(gmassessment__diagnosis_conclusion='ABNORMAL') | Q(hineassessment__score__lt = 73) | Q(developmentalassessment__is_dx_normal=False)).distinct()
-    elif pts_type == PtStatus.DX_NORMAL:
-        return var_ptl.exclude(Q(gmassessment__diagnosis_conclusion='ABNORMAL') and Q(hineassessment__score__lt = 73) and Q(developmentalassessment__is_dx_normal=False)).exclude(videos__isnull=True).distinct()
-    elif pts_type == PtStatus.DX_GMA_ABNORMAL:
-        return var_ptl.filter(gmassessment__diagnosis_conclusion='ABNORMAL').distinct()
-    elif pts_type == PtStatus.DX_GMA_NORMAL:
-        return var_ptl.filter(gmassessment__diagnosis_conclusion='NORMAL').distinct()
-    elif pts_type == PtStatus.DX_DA_NORMAL:
-        return var_ptl.filter(developmentalassessment__is_dx_normal=True).distinct()
-    elif pts_type == PtStatus.DX_DA_ABNORMAL:
-        return var_ptl.filter(developmentalassessment__is_dx_normal=False).distinct()
-    elif pts_type == PtStatus.DX_HINE:
-        return var_ptl.filter(Q(hineassessment__score__lt = 73)).distinct()
-    else:
+def getPatientList(pts_type, scope="ever"):
+    """
+    Return the patients in the given PtStatus cohort.
+
+    ``scope`` selects whether a matching record at any time ("ever") or only the
+    patient's most recent record ("latest") puts the patient in the cohort.
+    """
+    from patients.cohorts import get_cohort
+
+    if not isinstance(pts_type, PtStatus):
         return None
+    return get_cohort(pts_type, scope)
 
@@ -0,0 +1,299 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Pages are fetched with ``WHERE (ordering columns) after/before <cursor>``
+instead of ``OFFSET``, so the last page costs the same as the first. The
+ordering is the queryset's own (``-pk`` is appended as a tie-breaker), or
+``(-created_at, -pk)`` when it has none. Cursors are signed, opaque tokens
+that also carry the row position and the total count, so the optional
+total is computed once, on the first page (and comes from the count cache,
+see ``ndas.custom_codes.counts``). ``paginator.count_estimated`` says whether
+it is a planner estimate rather than an exact count.
+
+Ordering must use plain field names (``"-recorded_on"``,
+``"patient__baby_name"``); NULLs always sort last.
+"""
+
+import json
+import math
+from collections.abc import Sequence
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.core import signing
+from django.db.models import F, Q
+from django.http import QueryDict
+
+from ndas.custom_codes.counts import count_with_estimate
+
+CURSOR_PARAM = "cursor"
+DEFAULT_ORDERING = ("-created_at", "-pk")
+_SALT = "ndas.pagination.cursor"
+
+
+class _CursorSerializer:
+    """Compact JSON; keeps full datetime precision, unlike DjangoJSONEncoder"""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":")).encode("latin-1")
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"))
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _value_of(instance, path):
+    value = instance
+    for attr in path.split("__"):
+        if value is None:
+            return None
+        value = getattr(value, attr)
+    return getattr(value, "pk", value)
+
+
+class CursorPage(Sequence):
+    """One page of a CursorPaginator, usable like a Django Page in templates"""
+
+    def __init__(self, object_list, paginator, start, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.start = start
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f"<CursorPage rows {self.start_index()}-{self.end_index()}>"
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def number(self):
+        return self.start // self.paginator.per_page + 1
+
+    def start_index(self):
+        return self.start + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.start + len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page:
+            return None
+        return self.paginator.cursor_for(
+            self.object_list[-1], "next", self.start + len(self.object_list)
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], "previous", self.start)
+
+    def _url(self, cursor):
+        params = self.paginator.query_params.copy()
+        params.pop(CURSOR_PARAM, None)
+        params.pop("page", None)
+        if cursor:
+            params[CURSOR_PARAM] = cursor
+        query = params.urlencode()
+        return f"?{query}" if query else "?"
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next_page else None
+
+    @property
+    def previous_url(self):
+        if not self.has_previous_page:
+            return None
+        # The page before the second page is simply the first page
+        if self.start <= self.paginator.per_page:
+            return self.first_url
+        return self._url(self.previous_cursor)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over a queryset.
+
+    ``count=True`` adds the total (``paginator.count``, an estimate when
+    ``paginator.count_estimated``), computed on the first page and carried in
+    the cursors. ``query_params`` (usually
+    ``request.GET``) are kept in the page links.
+    """
+
+    def __init__(
+        self, queryset, per_page, ordering=None, count=False, query_params=None
+    ):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.with_count = count
+        self.query_params = query_params if query_params is not None else QueryDict()
+        self.ordering = self._ordering(
+            ordering
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+            or DEFAULT_ORDERING
+        )
+        self.count = None
+        self.count_estimated = False
+
+    def _ordering(self, ordering):
+        """((field, descending, nullable), ...) with a primary key tie-breaker"""
+        keys = []
+        for name in ordering:
+            if not isinstance(name, str) or name == "?":
+                raise ValueError(f"Cannot paginate by cursor on ordering {name!r}")
+            field = name.lstrip("-")
+            keys.append((field, name.startswith("-"), self._nullable(field)))
+        if not any(field in ("pk", "id") for field, _desc, _null in keys):
+            keys.append(("pk", True, False))
+        return tuple(keys)
+
+    def _nullable(self, path):
+        model = self.queryset.model
+        nullable = False
+        for attr in path.split("__"):
+            if attr == "pk":
+                return nullable
+            field = model._meta.get_field(attr)
+            nullable = nullable or field.null
+            model = field.related_model or model
+        return nullable
+
+    @property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, math.ceil(self.count / self.per_page))
+
+    # cursor tokens --------------------------------------------------------------
+
+    def cursor_for(self, instance, direction, position):
+        payload = {
+            "k": [_plain(_value_of(instance, key[0])) for key in self.ordering],
+            "d": "p" if direction == "previous" else "n",
+            "s": position,
+            "c": self.count,
+            "e": self.count_estimated,
+        }
+        return signing.dumps(
+            payload, salt=_SALT, serializer=_CursorSerializer, compress=True
+        )
+
+    def _decode(self, token):
+        try:
+            payload = signing.loads(token, salt=_SALT, serializer=_CursorSerializer)
+        except (signing.BadSignature, ValueError):
+            return None
+        if not isinstance(payload, dict) or len(payload.get("k", ())) != len(
+            self.ordering
+        ):
+            return None
+        return payload
+
+    # keyset filtering -----------------------------------------------------------
+
+    def _order_expressions(self, reverse=False):
+        expressions = []
+        for field, desc, nullable in self.ordering:
+            expression = F(field).desc if desc != reverse else F(field).asc
+            if not nullable:
+                # Plain ASC/DESC, so a backward index scan still applies
+                expressions.append(expression())
+            elif reverse:
+                expressions.append(expression(nulls_first=True))
+            else:
+                expressions.append(expression(nulls_last=True))
+        return expressions
+
+    def _beyond(self, values, reverse=False):
+        """Rows strictly after the cursor row (before it when ``reverse``)"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, desc, nullable), value in zip(self.ordering, values):
+            if value is None:
+                # NULLs sort last: nothing comes after them, everything
+                # non-NULL comes before them
+                step = Q(**{f"{field}__isnull": False}) if reverse else Q(pk__in=[])
+                same = Q(**{f"{field}__isnull": True})
+            else:
+                lookup = "lt" if desc != reverse else "gt"
+                step = Q(**{f"{field}__{lookup}": value})
+                if nullable and not reverse:
+                    step |= Q(**{f"{field}__isnull": True})
+                same = Q(**{field: value})
+            condition |= equal & step
+            equal &= same
+        return condition
+
+    def page(self, cursor=None):
+        payload = self._decode(cursor) if cursor else None
+        if payload is None:
+            if self.with_count:
+                self.count, self.count_estimated = count_with_estimate(
+                    self.queryset
+                )
+            rows = list(
+                self.queryset.order_by(*self._order_expressions())[: self.per_page + 1]
+            )
+            return CursorPage(
+                rows[: self.per_page], self, 0, len(rows) > self.per_page, False
+            )
+
+        self.count = payload.get("c") if self.with_count else None
+        self.count_estimated = bool(self.with_count and payload.get("e"))
+        start = max(int(payload.get("s") or 0), 0)
+        if payload["d"] == "p":
+            rows = list(
+                self.queryset.filter(self._beyond(payload["k"], reverse=True)).order_by(
+                    *self._order_expressions(reverse=True)
+                )[: self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            start = max(start - len(rows), 0) if has_previous else 0
+            return CursorPage(rows, self, start, True, has_previous)
+
+        rows = list(
+            self.queryset.filter(self._beyond(payload["k"])).order_by(
+                *self._order_expressions()
+            )[: self.per_page + 1]
+        )
+        return CursorPage(
+            rows[: self.per_page], self, start, len(rows) > self.per_page, True
+        )
+
+
+def paginate(request, queryset, per_page, count=True, ordering=None):
+    """Cursor page for a list view, reading the cursor from ``request.GET``"""
+    paginator = CursorPaginator(
+        queryset, per_page, ordering=ordering, count=count, query_params=request.GET
+    )
+    return paginator.page(request.GET.get(CURSOR_PARAM))
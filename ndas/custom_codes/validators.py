@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.validators import RegexValidator
 from django.utils import timezone
+from ndas.custom_codes.video_probe import InvalidVideo, ProbeError, probe_file
 
 
 def image_extension_validation(value):
@@ -88,45 +89,17 @@ def getFileType(var_uploaded_file):
 
 def validateVideoMetadata(var_uploaded_file):
     """
-    Validate video metadata (requires ffmpeg-python)
-    This is a placeholder for advanced validation
+    Validate video metadata with ffprobe (see video_probe.probe)
     """
     try:
-        # TODO: Implement with ffmpeg-python for production
-        # import ffmpeg
-        # probe = ffmpeg.probe(var_uploaded_file.temporary_file_path())
-        # video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-        #
-        # if not video_stream:
-        #     return False, "No video stream found in file"
-        #
-        # # Check duration
-        # duration = float(video_stream.get('duration', 0))
-        # if duration > 3600:  # 1 hour max
-        #     return False, "Video duration exceeds maximum allowed length (1 hour)"
-        #
-        # return True, "Video metadata is valid"
-        
-        return True, "Metadata validation skipped (ffmpeg not available)"
-        
+        probe_file(var_uploaded_file)
+    except InvalidVideo as e:
+        return False, str(e)
+    except ProbeError as e:
+        return True, f"Metadata validation skipped ({e})"
     except Exception as e:
         return False, f"Metadata validation error: {str(e)}"
-
-
-def estimateCompressionSize(original_size_bytes, target_quality="medium"):
-    """
-    Estimate compressed file size based on target quality
-    """
-    compression_ratios = {
-        "original": 1.0,
-        "high": 0.7,  # 30% compression
-        "medium": 0.5,  # 50% compression
-        "low": 0.3,  # 70% compression
-        "mobile": 0.2,  # 80% compression
-    }
-
-    ratio = compression_ratios.get(target_quality, 0.5)
-    return int(original_size_bytes * ratio)
+    return True, "Video metadata is valid"
 
 
 # Legacy validation functions for backward compatibility
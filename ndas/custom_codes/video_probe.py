@@ -0,0 +1,164 @@
+"""
+Reading video metadata with ffprobe.
+
+``probe`` runs the ffprobe binary (``settings.FFPROBE_BINARY``) on a local
+file and returns the duration and display size of its first video stream
+(``read_streams`` and ``summarize`` are its two halves).
+Two kinds of failure are told apart: ``InvalidVideo`` when the file itself is
+not a usable video, and ``ProbeError`` when it could not be examined at all
+(binary missing, timeout, file not there yet), which may succeed on a retry.
+"""
+
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class ProbeError(Exception):
+    """The file could not be examined; the same probe may succeed later"""
+
+
+class InvalidVideo(Exception):
+    """The file was examined and is not a usable video"""
+
+
+def _video_stream(streams):
+    for stream in streams:
+        if stream.get("codec_type") != "video":
+            continue
+        # Cover art in audio files and MP4s is a one-frame "video" stream
+        if stream.get("disposition", {}).get("attached_pic"):
+            continue
+        return stream
+    return None
+
+
+def _rotation(stream):
+    rotate = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", ()):
+        if "rotation" in side_data:
+            rotate = side_data["rotation"]
+    try:
+        return int(float(rotate or 0)) % 360
+    except ValueError:
+        return 0
+
+
+def _duration(stream, container):
+    for value in (stream.get("duration"), container.get("duration")):
+        try:
+            duration = float(value)
+        except (TypeError, ValueError):
+            continue
+        if duration > 0:
+            return duration
+    return None
+
+
+def read_streams(path):
+    """ffprobe's JSON description (``streams`` and ``format``) of ``path``"""
+    if not os.path.exists(path):
+        raise ProbeError(f"File not found: {path}")
+    command = [
+        settings.FFPROBE_BINARY,
+        "-v", "error",
+        "-show_format",
+        "-show_streams",
+        "-of", "json",
+        path,
+    ]  # fmt: skip
+    try:
+        result = subprocess.run(
+            command, capture_output=True, timeout=settings.FFPROBE_TIMEOUT
+        )
+    except FileNotFoundError:
+        raise ProbeError(f"{settings.FFPROBE_BINARY} is not installed")
+    except subprocess.TimeoutExpired:
+        raise ProbeError(f"ffprobe timed out after {settings.FFPROBE_TIMEOUT}s")
+
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise InvalidVideo(message[-1] if message else "ffprobe could not read the file")
+    try:
+        return json.loads(result.stdout or b"{}")
+    except ValueError:
+        raise ProbeError("ffprobe returned malformed output")
+
+
+def has_audio(data):
+    """Whether ``read_streams`` output has an audio stream"""
+    return any(
+        stream.get("codec_type") == "audio" for stream in data.get("streams", ())
+    )
+
+
+def summarize(data):
+    """
+    ``{"duration", "width", "height"}`` of the first video stream in
+    ``read_streams`` output: duration in whole seconds, size as displayed
+    (rotation applied).
+    """
+    stream = _video_stream(data.get("streams", ()))
+    if stream is None:
+        raise InvalidVideo("No video stream found in file")
+    if not stream.get("codec_name"):
+        raise InvalidVideo("The video stream uses an unknown codec")
+    width, height = stream.get("width"), stream.get("height")
+    if not width or not height:
+        raise InvalidVideo("The video stream has no picture size")
+    duration = _duration(stream, data.get("format", {}))
+    if duration is None:
+        raise InvalidVideo("The video has no duration")
+    if duration > settings.VIDEO_MAX_DURATION_SECONDS:
+        raise InvalidVideo(
+            "Video duration exceeds maximum allowed length "
+            f"({settings.VIDEO_MAX_DURATION_SECONDS // 60} minutes)"
+        )
+
+    if _rotation(stream) in (90, 270):
+        width, height = height, width
+    return {"duration": math.ceil(duration), "width": width, "height": height}
+
+
+def probe(path):
+    """Metadata of the video at ``path``, see ``summarize``"""
+    return summarize(read_streams(path))
+
+
+@contextmanager
+def local_path(file):
+    """
+    A filesystem path for an uploaded or stored file, copying it to a
+    temporary file when its storage is not local
+    """
+    if hasattr(file, "temporary_file_path"):
+        path = file.temporary_file_path()
+    else:
+        try:
+            path = file.path
+        except (NotImplementedError, AttributeError, ValueError):
+            path = None
+    if path is not None:
+        yield path
+        return
+    suffix = os.path.splitext(file.name or "")[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as copy:
+        file.open("rb")
+        try:
+            shutil.copyfileobj(file, copy)
+        finally:
+            file.close()
+        copy.flush()
+        yield copy.name
+
+
+def probe_file(file):
+    """``probe`` for a Django ``File`` (upload or model ``FieldFile``)"""
+    with local_path(file) as path:
+        return probe(path)
@@ -288,6 +288,41 @@ SESSION_SAVE_EVERY_REQUEST = True
 # Video Upload and Processing Settings
 VIDEO_MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
 VIDEO_ALLOWED_FORMATS = ['mp4', 'mov', 'avi', 'mkv', 'webm']
+VIDEO_MAX_DURATION_SECONDS = 4 * 60 * 60  # Video.duration_seconds limit
+FFPROBE_BINARY = env('FFPROBE_BINARY', default='ffprobe')
+FFPROBE_TIMEOUT = 120  # seconds
+VIDEO_PROCESSING_RETRIES = 3
+VIDEO_PROCESSING_RETRY_DELAY = 30  # seconds, doubled on each retry
+VIDEO_PROCESSING_WORKERS = 2  # in-process executor threads (no Celery broker)
+
+# Rendition transcoding: at most VIDEO_TRANSCODE_CONCURRENCY ffmpeg processes
+# at once (in-process), each limited to VIDEO_TRANSCODE_THREADS threads. On
+# Celery the jobs go to VIDEO_TRANSCODE_QUEUE; size that worker's concurrency
+# the same way.
+FFMPEG_BINARY = env('FFMPEG_BINARY', default='ffmpeg')
+VIDEO_TRANSCODE_CONCURRENCY = env.int('VIDEO_TRANSCODE_CONCURRENCY', default=max(1, (os.cpu_count() or 2) // 4))
+VIDEO_TRANSCODE_THREADS = env.int('VIDEO_TRANSCODE_THREADS', default=2)
+VIDEO_TRANSCODE_PRESET = 'veryfast'
+VIDEO_TRANSCODE_TIMEOUT = 2 * 60 * 60  # seconds per rendition
+VIDEO_TRANSCODE_QUEUE = 'transcode'
+VIDEO_HLS_MIN_DURATION = env.int('VIDEO_HLS_MIN_DURATION', default=3 * 60)  # seconds; 0 turns HLS off
+VIDEO_HLS_SEGMENT_SECONDS = 6
+
+# Video streaming (video:stream). Set VIDEO_STREAM_OFFLOAD to 'nginx' to hand
+# the bytes to nginx via X-Accel-Redirect (needs an `internal` location at
+# VIDEO_STREAM_ACCEL_PREFIX aliased to MEDIA_ROOT), or to 'sendfile' for
+# Apache mod_xsendfile / lighttpd X-Sendfile.
+VIDEO_STREAM_CHUNK_SIZE = 512 * 1024
+VIDEO_STREAM_OFFLOAD = env('VIDEO_STREAM_OFFLOAD', default='')
+VIDEO_STREAM_ACCEL_PREFIX = '/protected-media/'
+
+# Celery: background jobs go to the broker when one is configured, otherwise
+# they run in-process (see video.tasks)
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default=env('REDIS_URL', default=None))
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TIMEZONE = TIME_ZONE
 
 # File Upload Security
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
@@ -1,6 +1,8 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
-from . import settings
+from django.urls import path, include, re_path
+from . import views
 from django.conf.urls.static import static
 from django.conf import settings
 
@@ -14,6 +16,8 @@ urlpatterns = [
     path("", include("patients.urls")),
     path("djrichtextfield/", include("djrichtextfield.urls")),
     path("video/", include("video.urls")),
+    # Videos are served by video:stream, which checks access
+    re_path(r"^%svideos/" % re.escape(settings.MEDIA_URL.lstrip("/")), views.protected_media),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 # Custom error handlers
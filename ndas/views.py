@@ -1,3 +1,4 @@
+from django.http import Http404
 from django.shortcuts import render
 
 
@@ -13,3 +14,11 @@ def handler500(request):
     Custom 500 error handler for server errors
     """
     return render(request, '500.html', status=500)
+
+
+def protected_media(request):
+    """
+    Media that must go through an access-checked view (e.g. video:stream)
+    and is never served straight from MEDIA_URL
+    """
+    raise Http404
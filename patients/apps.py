@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PatientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'patients'
+
+    def ready(self):
+        # Register signal handlers that maintain denormalized patient data
+        from . import signals  # noqa: F401
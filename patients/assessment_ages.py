@@ -0,0 +1,90 @@
+"""
+Batch maintenance of the stored age-at-assessment columns.
+
+Records compute their own ages on save (``AssessmentAgeMixin``). This module
+recomputes them in bulk: for the backfill command and migration, and for every
+record of a patient whose date of birth or gestation changed.
+"""
+
+from django.apps import apps
+
+from ndas.custom_codes.ages import assessment_age_days
+from ndas.custom_codes.Custom_abstract_class import ASSESSMENT_AGE_FIELDS
+
+# (app label, model name) -> date field the ages are measured at
+AGE_SOURCES = {
+    ("patients", "GMAssessment"): "date_of_assessment",
+    ("patients", "HINEAssessment"): "date_of_assessment",
+    ("patients", "DevelopmentalAssessment"): "date_of_assessment",
+    ("video", "Video"): "recorded_on",
+}
+
+
+def _refresh_model(model, reference_field, patient_ids, batch_size, using):
+    queryset = model.objects.using(using).order_by()
+    if patient_ids is not None:
+        queryset = queryset.filter(patient_id__in=patient_ids)
+    rows = queryset.values_list(
+        "pk",
+        "patient__dob_tob",
+        "patient__pog_wks",
+        "patient__pog_days",
+        reference_field,
+        *ASSESSMENT_AGE_FIELDS,
+    ).iterator(chunk_size=batch_size)
+
+    updated = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            updated += _write_chunk(model, chunk, using)
+            chunk = []
+    if chunk:
+        updated += _write_chunk(model, chunk, using)
+    return updated
+
+
+def _write_chunk(model, rows, using):
+    pks, dobs, pog_wks, pog_days, assessed_on, stored_ages, stored_corrected = zip(
+        *rows
+    )
+    ages, corrected = assessment_age_days(dobs, pog_wks, pog_days, assessed_on)
+    changed = [
+        model(
+            pk=pk,
+            age_days_at_assessment=age,
+            corrected_age_days_at_assessment=corrected_age,
+        )
+        for pk, age, corrected_age, old_age, old_corrected in zip(
+            pks, ages, corrected, stored_ages, stored_corrected
+        )
+        if (age, corrected_age) != (old_age, old_corrected)
+    ]
+    model.objects.using(using).bulk_update(changed, ASSESSMENT_AGE_FIELDS)
+    return len(changed)
+
+
+def refresh_assessment_ages(
+    patient_ids=None, batch_size=1000, using=None, models=None
+):
+    """
+    Recompute the stored ages of every record (or only of ``patient_ids``'
+    records) and return the number of rows that changed. ``models`` lets
+    migrations pass their historical models.
+    """
+    models = models or apps
+    using = using or "default"
+    if patient_ids is not None:
+        patient_ids = list(patient_ids)
+        if not patient_ids:
+            return 0
+    updated = 0
+    # Each batch is written by its own bulk_update, so a backfill of a large
+    # table never holds one long transaction
+    for (app_label, model_name), reference_field in AGE_SOURCES.items():
+        model = models.get_model(app_label, model_name)
+        updated += _refresh_model(
+            model, reference_field, patient_ids, batch_size, using
+        )
+    return updated
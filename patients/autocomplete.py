@@ -0,0 +1,230 @@
+"""
+Patient autocomplete.
+
+``PatientSearchKey`` holds one lower-cased, accent-free key per word-start of
+the baby's and mother's names ("baby kasun perera", "kasun perera", "perera")
+and per identifier ("b00123"). A typed prefix becomes a key range
+(``key >= prefix AND key < prefix + U+FFFF``), which any B-tree index can
+answer without scanning, on SQLite and PostgreSQL alike.
+
+Suggestions for hot prefixes are kept in a small per-process LRU. Patient
+writes bump a version in the shared cache, so every process drops its LRU on
+its next lookup.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from patients.identifiers import IDENTIFIER_FIELDS, normalize
+
+NAME_FIELDS = ("baby_name", "mother_name")
+KEY_LENGTH = 100
+MIN_PREFIX = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+VERSION_KEY = "patients:autocomplete:version"
+
+_NON_WORD = re.compile(r"[\W_]+")
+_RANGE_END = "\uffff"
+
+
+def name_key(text):
+    """Lower-case, accent-free words separated by single spaces"""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text.casefold()).strip()[:KEY_LENGTH]
+
+
+def identifier_key(text):
+    return normalize(text).casefold()[:KEY_LENGTH]
+
+
+def patient_keys(patient):
+    """Every key a patient can be found under"""
+    keys = set()
+    for field in NAME_FIELDS:
+        words = name_key(getattr(patient, field, None)).split(" ")
+        for start in range(len(words)):
+            suffix = " ".join(words[start:])
+            if suffix:
+                keys.add(suffix)
+    for field in IDENTIFIER_FIELDS:
+        key = identifier_key(getattr(patient, field, None))
+        if key:
+            keys.add(key)
+    return keys
+
+
+def sync_patient(patient):
+    """Bring the patient's key rows in line with its names and identifiers"""
+    PatientSearchKey = apps.get_model("patients", "PatientSearchKey")
+    wanted = patient_keys(patient)
+    existing = dict(
+        PatientSearchKey.objects.filter(patient_id=patient.pk).values_list(
+            "key", "pk"
+        )
+    )
+    stale = [pk for key, pk in existing.items() if key not in wanted]
+    added = wanted - set(existing)
+    if stale or added:
+        with transaction.atomic():
+            PatientSearchKey.objects.filter(pk__in=stale).delete()
+            PatientSearchKey.objects.bulk_create(
+                PatientSearchKey(key=key, patient_id=patient.pk) for key in added
+            )
+
+
+def rebuild_keys(batch_size=2000, using=None, models=None):
+    """
+    Recreate every key row from the patient table. Returns the number of rows
+    written. ``models`` lets migrations pass their historical models.
+    """
+    models = models or apps
+    Patient = models.get_model("patients", "Patient")
+    PatientSearchKey = models.get_model("patients", "PatientSearchKey")
+    using = using or "default"
+
+    fields = NAME_FIELDS + tuple(IDENTIFIER_FIELDS)
+    total = 0
+    with transaction.atomic(using=using):
+        PatientSearchKey.objects.using(using).all().delete()
+        batch = []
+        for patient in (
+            Patient.objects.using(using).only(*fields).iterator(chunk_size=batch_size)
+        ):
+            batch.extend(
+                PatientSearchKey(key=key, patient_id=patient.pk)
+                for key in patient_keys(patient)
+            )
+            if len(batch) >= batch_size:
+                PatientSearchKey.objects.using(using).bulk_create(batch)
+                total += len(batch)
+                batch = []
+        PatientSearchKey.objects.using(using).bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+class PrefixLRU:
+    """Thread-safe, size-bounded LRU of prefix -> suggestions"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+                return None
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, version):
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_lru = PrefixLRU()
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every process drop its cached suggestions"""
+    _lru.clear()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _key_range(prefix):
+    return Q(key__gte=prefix, key__lt=prefix + _RANGE_END)
+
+
+def _suggestion(patient):
+    return {
+        "id": patient.pk,
+        "baby_name": patient.baby_name,
+        "mother_name": patient.mother_name,
+        "bht": patient.bht,
+        "nnc_no": patient.nnc_no,
+        "pin": patient.pin,
+        "dob": (
+            timezone.localtime(patient.dob_tob).date().isoformat()
+            if patient.dob_tob
+            else None
+        ),
+        "url": reverse("view-patient", args=[patient.pk]),
+    }
+
+
+def suggest(text, limit=DEFAULT_LIMIT):
+    """
+    Up to ``limit`` patients with a key starting with the typed text, in key
+    order, as JSON-ready dicts.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    by_name, by_identifier = name_key(text), identifier_key(text)
+    prefixes = {key for key in (by_name, by_identifier) if len(key) >= MIN_PREFIX}
+    if not prefixes:
+        return []
+
+    cache_key = (by_name, by_identifier, limit)
+    version = _version()
+    cached = _lru.get(cache_key, version)
+    if cached is not None:
+        return cached
+
+    PatientSearchKey = apps.get_model("patients", "PatientSearchKey")
+    Patient = apps.get_model("patients", "Patient")
+    # One range per prefix, read in index order so the scan stops at the
+    # limit; a prefix inside another prefix's range adds nothing. A patient
+    # can match under several keys, so read a few spare rows.
+    rows = []
+    for prefix in sorted(prefixes):
+        if any(prefix.startswith(other) for other in prefixes if other != prefix):
+            continue
+        rows.extend(
+            PatientSearchKey.objects.filter(_key_range(prefix))
+            .order_by("key", "patient_id")
+            .values_list("key", "patient_id")[: limit * 4]
+        )
+    rows.sort()
+    patient_ids = list(dict.fromkeys(patient_id for _key, patient_id in rows))[:limit]
+    fields = ("baby_name", "mother_name", "dob_tob") + tuple(IDENTIFIER_FIELDS)
+    patients = Patient.objects.only(*fields).in_bulk(patient_ids)
+    suggestions = [_suggestion(patients[pk]) for pk in patient_ids if pk in patients]
+    _lru.set(cache_key, suggestions, version)
+    return suggestions
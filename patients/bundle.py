@@ -0,0 +1,172 @@
+"""
+Everything the patient detail page shows, loaded in a fixed number of queries.
+
+``PatientBundle.load`` reads the patient with its clinical status, editors
+and GMA indications, plus a version stamp made of the latest ``updated_at``
+of each related table, the counter columns and today's date. The recent
+record lists are loaded lazily, one query each, so when the template finds
+the record tabs in the fragment cache (keyed on that version) they are never
+queried at all.
+"""
+
+import hashlib
+
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from patients.counters import PATIENT_COUNTER_FIELDS
+from patients.models import (
+    Attachment,
+    Bookmark,
+    CDICRecord,
+    DevelopmentalAssessment,
+    GMAssessment,
+    HINEAssessment,
+    Patient,
+)
+from video.models import Video
+
+# Related tables whose edits change what the record tabs show
+VERSION_SOURCES = {
+    "video": Video,
+    "attachment": Attachment,
+    "gma": GMAssessment,
+    "hine": HINEAssessment,
+    "da": DevelopmentalAssessment,
+    "cdic": CDICRecord,
+}
+
+
+def _latest_update(model):
+    return Subquery(
+        model.objects.filter(patient=OuterRef("pk"))
+        .order_by()
+        .values("patient")
+        .annotate(latest=Max("updated_at"))
+        .values("latest")
+    )
+
+
+class PatientBundle:
+    """The patient detail page's data, with derived values computed once"""
+
+    RECENT = 5
+    FRAGMENT_TIMEOUT = 60 * 60
+
+    def __init__(self, patient, user):
+        self.patient = patient
+        self.user = user
+
+    @classmethod
+    def load(cls, pk, user):
+        patient = (
+            Patient.objects.select_related(
+                "clinical_status", "added_by", "last_edit_by"
+            )
+            .prefetch_related("indecation_for_gma")
+            .annotate(
+                **{
+                    f"bundle_{name}_updated": _latest_update(model)
+                    for name, model in VERSION_SOURCES.items()
+                }
+            )
+            .get(pk=pk)
+        )
+        return cls(patient, user)
+
+    @cached_property
+    def version(self):
+        """Changes whenever anything shown in the cached fragments may have"""
+        patient = self.patient
+        status = getattr(patient, "clinical_status", None)
+        parts = [
+            patient.pk,
+            patient.updated_at,
+            status.updated_at if status else None,
+            timezone.localdate(),
+            *(getattr(patient, field) for field in PATIENT_COUNTER_FIELDS),
+            *(getattr(patient, f"bundle_{name}_updated") for name in VERSION_SOURCES),
+        ]
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+    def _recent(self, queryset):
+        records = list(
+            queryset.filter(patient=self.patient).order_by("-id")[: self.RECENT]
+        )
+        for record in records:
+            record.patient = self.patient
+        return records
+
+    # Recent records, one query each -----------------------------------------
+
+    @cached_property
+    def videos(self):
+        return self._recent(Video.objects.select_related("added_by"))
+
+    @cached_property
+    def attachments(self):
+        return self._recent(
+            Bookmark.annotate_bookmark_ids(
+                Attachment.objects.select_related("added_by", "last_edit_by"),
+                "Attachment",
+                self.user,
+            )
+        )
+
+    @cached_property
+    def gm_assessments(self):
+        return self._recent(
+            GMAssessment.objects.select_related(
+                "added_by", "video_file"
+            ).prefetch_related("diagnosis")
+        )
+
+    @cached_property
+    def gm_last_assessment(self):
+        return self.gm_assessments[0] if self.gm_assessments else None
+
+    @cached_property
+    def hine_assessments(self):
+        return self._recent(HINEAssessment.objects.select_related("added_by"))
+
+    @cached_property
+    def da_assessments(self):
+        return self._recent(DevelopmentalAssessment.objects.select_related("added_by"))
+
+    @cached_property
+    def cdic_records(self):
+        return self._recent(CDICRecord.objects.select_related("added_by"))
+
+    # Derived values -----------------------------------------------------------
+
+    @cached_property
+    def bookmark(self):
+        return Bookmark.objects.filter(
+            bookmark_type="Patient", object_id=self.patient.pk
+        ).first()
+
+    @cached_property
+    def recommendations(self):
+        return self.patient.getRC
+
+    @cached_property
+    def diagnosis_list(self):
+        return self.patient.getDiagnosisList
+
+    def context(self):
+        patient = self.patient
+        return {
+            "patient": patient,
+            "bundle": self,
+            "indications": patient.indecation_for_gma,
+            "bookmark": self.bookmark,
+            "file_video_count": patient.video_count,
+            "file_attachment_count": patient.attachment_count,
+            "gm_assessments_count": patient.gma_count,
+            "hine_assessments_count": patient.hine_count,
+            "da_assessments_count": patient.da_count,
+            "cdic_record_count": patient.cdic_count,
+            "gm_assessments_new": "",
+            "gm_assessments_completed": "",
+        }
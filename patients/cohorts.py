@@ -0,0 +1,130 @@
+"""
+Set-based patient cohort filters.
+
+Every ``PtStatus`` cohort is expressed as correlated ``EXISTS`` predicates on the
+patient table instead of JOINs over the assessment tables, so the result never
+needs ``DISTINCT`` and the database can stop at the first matching row for each
+patient.
+
+Two scopes are supported:
+
+* ``EVER``   - the patient has at least one matching record at any time.
+* ``LATEST`` - the patient's most recent record (highest id) matches.
+"""
+
+from django.apps import apps
+from django.db.models import Exists, OuterRef, Q
+
+from ndas.custom_codes.ndas_enums import PtStatus
+
+EVER = "ever"
+LATEST = "latest"
+COHORT_SCOPES = (EVER, LATEST)
+
+# HINE scores below this are treated as a positive (abnormal) finding
+HINE_ABNORMAL_BELOW = 73
+
+
+def _assessment_model(name):
+    return apps.get_model("patients", name)
+
+
+def _record_exists(model, scope, **lookups):
+    """EXISTS predicate for a record of ``model`` belonging to the outer patient"""
+    records = model.objects.filter(patient=OuterRef("pk"), **lookups)
+    if scope == LATEST:
+        # The record is the latest one when no later record exists for the patient
+        records = records.filter(
+            ~Exists(
+                model.objects.filter(
+                    patient=OuterRef("patient"), id__gt=OuterRef("id")
+                )
+            )
+        )
+    return Exists(records)
+
+
+def gma_concluded(conclusion, scope=EVER):
+    """Patients with a GMA assessment concluded as ``conclusion``"""
+    return _record_exists(
+        _assessment_model("GMAssessment"), scope, diagnosis_conclusion=conclusion
+    )
+
+
+def hine_abnormal(scope=EVER):
+    """Patients with a HINE score below the abnormal threshold"""
+    return _record_exists(
+        _assessment_model("HINEAssessment"), scope, score__lt=HINE_ABNORMAL_BELOW
+    )
+
+
+def da_outcome(is_normal, scope=EVER):
+    """Patients with a developmental assessment with the given outcome"""
+    return _record_exists(
+        _assessment_model("DevelopmentalAssessment"), scope, is_dx_normal=is_normal
+    )
+
+
+def discharged(scope=EVER):
+    """Patients with a CDIC record marking them as discharged"""
+    return _record_exists(_assessment_model("CDICRecord"), scope, is_discharged=True)
+
+
+def has_videos():
+    """Patients with at least one uploaded video (from the video_count column)"""
+    return Q(video_count__gt=0)
+
+
+def any_abnormal(scope=EVER):
+    """Patients with an abnormal GMA, HINE or developmental assessment"""
+    return (
+        Q(gma_concluded("ABNORMAL", scope))
+        | Q(hine_abnormal(scope))
+        | Q(da_outcome(False, scope))
+    )
+
+
+def cohort_filter(pts_type, scope=EVER):
+    """
+    Return the filter expression for a cohort, or None when the cohort is the
+    whole patient table.
+    """
+    if scope not in COHORT_SCOPES:
+        raise ValueError(f"Unknown cohort scope: {scope}")
+
+    if pts_type == PtStatus.ALL:
+        return None
+    if pts_type == PtStatus.NEW:
+        return ~Q(has_videos())
+    if pts_type == PtStatus.DISCHARGED:
+        return Q(discharged(scope))
+    if pts_type == PtStatus.DIAGNOSED:
+        return any_abnormal(scope)
+    if pts_type == PtStatus.DX_NORMAL:
+        return Q(has_videos()) & ~any_abnormal(scope)
+    if pts_type == PtStatus.DX_GMA_ABNORMAL:
+        return Q(gma_concluded("ABNORMAL", scope))
+    if pts_type == PtStatus.DX_GMA_NORMAL:
+        return Q(gma_concluded("NORMAL", scope))
+    if pts_type == PtStatus.DX_DA_NORMAL:
+        return Q(da_outcome(True, scope))
+    if pts_type == PtStatus.DX_DA_ABNORMAL:
+        return Q(da_outcome(False, scope))
+    if pts_type == PtStatus.DX_HINE:
+        return Q(hine_abnormal(scope))
+    raise ValueError(f"Unknown patient status: {pts_type}")
+
+
+def get_cohort(pts_type, scope=EVER, queryset=None):
+    """Return the patients in a cohort as a queryset"""
+    if queryset is None:
+        queryset = _assessment_model("Patient").objects.all()
+    predicate = cohort_filter(pts_type, scope)
+    if predicate is None:
+        return queryset
+    return queryset.filter(predicate)
+
+
+def count_cohorts(pts_types, scope=EVER):
+    """Return a {PtStatus: count} mapping for the given cohorts"""
+    return {pts_type: get_cohort(pts_type, scope).count() for pts_type in pts_types}
@@ -0,0 +1,138 @@
+"""
+Counter-cache columns.
+
+Each patient row carries the number of its videos, attachments, GMA, HINE,
+developmental assessments and CDIC records, and each video carries whether it
+has a GMA. The columns are adjusted with ``F()`` updates in the same
+transaction as the write that changes them (see ``patients.signals``), so
+pages read one row instead of counting. Writes that bypass signals (bulk
+operations, raw SQL) can make them drift; ``reconcile_counters`` recounts.
+
+Full saves of an existing patient or video never write these columns back
+(``fields_to_save``), so a stale instance cannot undo a concurrent update.
+"""
+
+from django.apps import apps
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+# (app label, model name) of each counted record -> Patient counter column
+COUNTER_FIELDS = {
+    ("video", "Video"): "video_count",
+    ("patients", "Attachment"): "attachment_count",
+    ("patients", "GMAssessment"): "gma_count",
+    ("patients", "HINEAssessment"): "hine_count",
+    ("patients", "DevelopmentalAssessment"): "da_count",
+    ("patients", "CDICRecord"): "cdic_count",
+}
+PATIENT_COUNTER_FIELDS = tuple(COUNTER_FIELDS.values())
+VIDEO_COUNTER_FIELDS = ("assessed",)
+
+
+def counter_field(model):
+    """The Patient column counting ``model``'s records"""
+    return COUNTER_FIELDS[(model._meta.app_label, model._meta.object_name)]
+
+
+def fields_to_save(instance, maintained):
+    """
+    ``update_fields`` for a full save of an existing row: every concrete
+    field except the ``maintained`` counter columns. None for new rows.
+    """
+    if instance._state.adding:
+        return None
+    return [
+        field.name
+        for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in maintained
+    ]
+
+
+def adjust(patient_id, field, delta):
+    """Add ``delta`` to one patient's counter, never going below zero"""
+    if patient_id is None or not delta:
+        return
+    Patient = apps.get_model("patients", "Patient")
+    value = F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+    Patient.objects.filter(pk=patient_id).update(**{field: value})
+
+
+def set_assessed(video_id, assessed):
+    if video_id is None:
+        return
+    Video = apps.get_model("video", "Video")
+    Video.objects.filter(pk=video_id).update(assessed=assessed)
+
+
+def _real_count(model):
+    counts = (
+        model.objects.filter(patient=OuterRef("pk"))
+        .order_by()
+        .values("patient")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_counters(batch_size=1000, using=None, models=None):
+    """
+    Recount every counter column and fix the rows that drifted. Returns
+    ``(patients fixed, videos fixed)``. ``models`` lets migrations pass their
+    historical models.
+    """
+    models = models or apps
+    using = using or "default"
+    Patient = models.get_model("patients", "Patient")
+    Video = models.get_model("video", "Video")
+    GMAssessment = models.get_model("patients", "GMAssessment")
+
+    real = {
+        f"real_{field}": _real_count(models.get_model(app_label, model_name))
+        for (app_label, model_name), field in COUNTER_FIELDS.items()
+    }
+    drifted = Q()
+    for field in PATIENT_COUNTER_FIELDS:
+        drifted |= ~Q(**{field: F(f"real_{field}")})
+
+    patient_ids = (
+        Patient.objects.using(using)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+    patients_fixed = 0
+    chunk = []
+    for patient_id in patient_ids:
+        chunk.append(patient_id)
+        if len(chunk) >= batch_size:
+            patients_fixed += _fix_patients(Patient, chunk, real, drifted, using)
+            chunk = []
+    if chunk:
+        patients_fixed += _fix_patients(Patient, chunk, real, drifted, using)
+
+    has_gma = Exists(GMAssessment.objects.filter(video_file=OuterRef("pk")))
+    videos = Video.objects.using(using)
+    videos_fixed = videos.filter(assessed=True).filter(~has_gma).update(
+        assessed=False
+    )
+    videos_fixed += videos.filter(assessed=False).filter(has_gma).update(
+        assessed=True
+    )
+    return patients_fixed, videos_fixed
+
+
+def _fix_patients(Patient, patient_ids, real, drifted, using):
+    rows = (
+        Patient.objects.using(using)
+        .filter(pk__in=patient_ids)
+        .annotate(**real)
+        .filter(drifted)
+        .values_list("pk", *real)
+    )
+    fixed = [
+        Patient(pk=pk, **dict(zip(PATIENT_COUNTER_FIELDS, counts)))
+        for pk, *counts in rows
+    ]
+    Patient.objects.using(using).bulk_update(fixed, PATIENT_COUNTER_FIELDS)
+    return len(fixed)
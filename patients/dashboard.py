@@ -0,0 +1,165 @@
+"""
+Cached statistics for the home page dashboard.
+
+All tiles are computed with conditional aggregation, one query per table, and
+the result is cached. Any write to a source table bumps a version key, which
+makes the cached snapshot unreachable. When the snapshot is missing, a
+short-lived lock lets a single worker recompute it while the others keep
+serving the previous snapshot.
+"""
+
+import logging
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from ndas.custom_codes.custom_methods import (
+    get_admissions_data_barchart,
+    get_gma_diagnosis_data,
+    get_userStats,
+)
+from patients.cohorts import HINE_ABNORMAL_BELOW, discharged, has_videos
+from patients.models import (
+    Attachment,
+    Bookmark,
+    CDICRecord,
+    DevelopmentalAssessment,
+    GMAssessment,
+    HINEAssessment,
+    Patient,
+)
+from users.models import CustomUser
+from video.models import Video
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSnapshot:
+    """Compute, cache and invalidate the dashboard statistics"""
+
+    CACHE_PREFIX = "dashboard:snapshot"
+    VERSION_KEY = "dashboard:snapshot:version"
+    LAST_GOOD_KEY = "dashboard:snapshot:last"
+    TIMEOUT = 300
+    LOCK_TIMEOUT = 60
+    WAIT_SECONDS = 5
+    WAIT_INTERVAL = 0.1
+    # Span of the yearly admissions chart
+    TREND_YEARS = 10
+
+    @classmethod
+    def compute(cls):
+        """Build the snapshot from the database"""
+        patients = Patient.objects.aggregate(
+            total=Count("id"),
+            new=Count("id", filter=~Q(has_videos())),
+            discharged=Count("id", filter=Q(discharged())),
+        )
+        videos = Video.objects.aggregate(
+            total=Count("id"),
+            new=Count("id", filter=Q(assessed=False)),
+        )
+        gma = GMAssessment.objects.aggregate(
+            total=Count("id"),
+            not_normal=Count("id", filter=~Q(diagnosis_conclusion="NORMAL")),
+            abnormal=Count("id", filter=Q(diagnosis_conclusion="ABNORMAL")),
+        )
+        hine = HINEAssessment.objects.aggregate(
+            total=Count("id"),
+            abnormal=Count("id", filter=Q(score__lt=HINE_ABNORMAL_BELOW)),
+        )
+        da = DevelopmentalAssessment.objects.aggregate(
+            total=Count("id"),
+            abnormal=Count("id", filter=Q(is_dx_normal=False)),
+        )
+
+        new_patients = list(
+            Patient.objects.filter(~Q(has_videos())).order_by("-created_at")[:5]
+        )
+        new_videos = list(
+            Video.objects.filter(assessed=False).order_by("-created_at")[:5]
+        )
+
+        return {
+            "patients_total_count": patients["total"],
+            "patients_new_count": patients["new"],
+            "patients_discharged_count": patients["discharged"],
+            "Patients_new_list_10": new_patients,
+            "videos_total_count": videos["total"],
+            "new_videos_count": videos["new"],
+            "new_videos": new_videos,
+            "all_gm_assessments_count": gma["total"],
+            "all_hine_assessments_count": hine["total"],
+            "all_da_assessments_count": da["total"],
+            "all_cdic_records_count": CDICRecord.objects.count(),
+            "dx_gm_assessments_count": gma["not_normal"],
+            "dx_hine_assessments_count": hine["abnormal"],
+            "dx_da_assessments_count": da["abnormal"],
+            "attachments_count": Attachment.objects.count(),
+            "bookmark_count": Bookmark.objects.count(),
+            "users_total_count": CustomUser.objects.count(),
+            "bar_chart_monthly_admissions": get_admissions_data_barchart(),
+            "bar_chart_yearly_admissions": get_admissions_data_barchart(
+                years=cls.TREND_YEARS
+            ),
+            "diagnosis_data_gma": get_gma_diagnosis_data(),
+            "diagnosis_data_all": {
+                "GMA": gma["abnormal"],
+                "HINE": hine["abnormal"],
+                "DA": da["abnormal"],
+            },
+            "user_stat": get_userStats(),
+        }
+
+    @classmethod
+    def _version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            # Start from the clock so a lost version key never resurrects an
+            # old snapshot that is still cached under a small version number
+            cache.add(cls.VERSION_KEY, int(time.time() * 1000), None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    def get(cls):
+        """Return the cached snapshot, recomputing it in one worker when stale"""
+        key = f"{cls.CACHE_PREFIX}:{cls._version()}"
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        lock_key = f"{key}:lock"
+        if cache.add(lock_key, True, cls.LOCK_TIMEOUT):
+            try:
+                snapshot = cls.compute()
+                cache.set(key, snapshot, cls.TIMEOUT)
+                cache.set(cls.LAST_GOOD_KEY, snapshot, None)
+            finally:
+                cache.delete(lock_key)
+            return snapshot
+
+        # Another worker is recomputing; serve the previous snapshot meanwhile
+        snapshot = cache.get(cls.LAST_GOOD_KEY)
+        if snapshot is not None:
+            return snapshot
+
+        # Nothing cached yet (cold start): wait briefly for the other worker
+        deadline = time.monotonic() + cls.WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(cls.WAIT_INTERVAL)
+            snapshot = cache.get(key)
+            if snapshot is not None:
+                return snapshot
+
+        logger.warning("Dashboard snapshot lock timed out, computing directly")
+        return cls.compute()
+
+    @classmethod
+    def invalidate(cls):
+        """Make the current snapshot unreachable"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.add(cls.VERSION_KEY, int(time.time() * 1000), None)
@@ -0,0 +1,224 @@
+"""
+Patient identifier resolution.
+
+Every BHT, NNC, PTC, PC and PIN number is copied into ``PatientIdentifier``
+in a normalized form (upper case, no spaces, dashes or dots), so an
+identifier typed in any format, with or without its kind ("bht 12-34",
+"PHN:5678"), resolves with one indexed query. Lookups are cached per
+normalized value for a short time; the cache entries of a patient's values
+are dropped whenever the patient is saved or deleted (see patients.signals).
+"""
+
+import re
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+# Patient field -> identifier kind
+IDENTIFIER_FIELDS = {
+    "bht": "BHT",
+    "nnc_no": "NNC",
+    "ptc_no": "PTC",
+    "pc_no": "PC",
+    "pin": "PIN",
+}
+
+# Prefixes a user may type in front of an identifier
+KIND_PREFIXES = {
+    "BHT": "BHT",
+    "NNC": "NNC",
+    "CLINIC": "NNC",
+    "PTC": "PTC",
+    "PC": "PC",
+    "PIN": "PIN",
+    "PHN": "PIN",
+}
+
+CACHE_PREFIX = "patient-identifier"
+CACHE_TIMEOUT = 60
+MAX_BULK = 1000
+
+_SEPARATORS = re.compile(r"[\s\-.]+")
+_PREFIXED = re.compile(
+    r"^\s*(%s)(?:\s*(?:NO|NUMBER))?\s*[:#]?\s*(.+)$"
+    % "|".join(sorted(KIND_PREFIXES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_LIST_SPLIT = re.compile(r"[\n,;\t]+")
+
+
+def normalize(value):
+    """Canonical form of an identifier: upper case without separators"""
+    return _SEPARATORS.sub("", str(value or "")).upper()
+
+
+def parse(text):
+    """
+    Candidate ``(kind, normalized value)`` readings of a typed identifier.
+
+    The input as a whole is always a candidate for any kind (``kind`` None);
+    a leading kind prefix adds a reading restricted to that kind.
+    """
+    candidates = []
+    value = normalize(text)
+    if value:
+        candidates.append((None, value))
+    match = _PREFIXED.match(text or "")
+    if match:
+        stripped = normalize(match.group(2))
+        if stripped:
+            candidates.append((KIND_PREFIXES[match.group(1).upper()], stripped))
+    return candidates
+
+
+def split_list(text):
+    """Identifiers in pasted text, one per line or separated by commas"""
+    return [item.strip() for item in _LIST_SPLIT.split(text or "") if item.strip()]
+
+
+def patient_identifiers(patient):
+    """{(kind, normalized value)} of a patient instance"""
+    rows = set()
+    for field, kind in IDENTIFIER_FIELDS.items():
+        value = normalize(getattr(patient, field, None))
+        if value:
+            rows.add((kind, value))
+    return rows
+
+
+def _cache_key(value):
+    return f"{CACHE_PREFIX}:{value}"
+
+
+def invalidate(values):
+    """Drop the cached lookups of the given normalized values"""
+    values = set(values)
+    if values:
+        cache.delete_many([_cache_key(value) for value in values])
+
+
+def _lookup(values):
+    """{normalized value: [(kind, patient_id)]}, from the cache where possible"""
+    PatientIdentifier = apps.get_model("patients", "PatientIdentifier")
+    values = set(values)
+    keys = {_cache_key(value): value for value in values}
+    cached = cache.get_many(keys)
+    found = {keys[key]: rows for key, rows in cached.items()}
+
+    missing = values - set(found)
+    if missing:
+        fetched = {value: [] for value in missing}
+        rows = PatientIdentifier.objects.filter(
+            normalized_value__in=missing
+        ).values_list("normalized_value", "kind", "patient_id")
+        for value, kind, patient_id in rows:
+            fetched[value].append((kind, patient_id))
+        # Misses are cached too, so repeated typos do not hit the database
+        cache.set_many(
+            {_cache_key(value): rows for value, rows in fetched.items()},
+            CACHE_TIMEOUT,
+        )
+        found.update(fetched)
+    return found
+
+
+def _matches(candidates, found, kinds):
+    patient_ids = []
+    for candidate_kind, value in candidates:
+        for kind, patient_id in found.get(value, ()):
+            if candidate_kind not in (None, kind):
+                continue
+            if kinds and kind not in kinds:
+                continue
+            if patient_id not in patient_ids:
+                patient_ids.append(patient_id)
+    return patient_ids
+
+
+def resolve(text, kinds=None):
+    """
+    Patient ids matching a typed identifier, optionally only of the given
+    kinds (e.g. ``("BHT",)``). Usually one id; more when different patients
+    share a number across kinds.
+    """
+    candidates = parse(text)
+    if not candidates:
+        return []
+    found = _lookup(value for _kind, value in candidates)
+    return _matches(candidates, found, kinds)
+
+
+def resolve_many(texts, kinds=None):
+    """
+    Resolve a list of typed identifiers with at most one query.
+
+    Returns ``[(text, [patient_id, ...])]`` in input order, duplicates removed.
+    """
+    texts = list(dict.fromkeys(text.strip() for text in texts if text.strip()))
+    texts = texts[:MAX_BULK]
+    parsed = {text: parse(text) for text in texts}
+    found = _lookup(
+        value for candidates in parsed.values() for _kind, value in candidates
+    )
+    return [(text, _matches(parsed[text], found, kinds)) for text in texts]
+
+
+def sync_patient(patient):
+    """Bring the patient's identifier rows in line with its fields"""
+    PatientIdentifier = apps.get_model("patients", "PatientIdentifier")
+    wanted = patient_identifiers(patient)
+    existing = {
+        (kind, value): pk
+        for pk, kind, value in PatientIdentifier.objects.filter(
+            patient_id=patient.pk
+        ).values_list("pk", "kind", "normalized_value")
+    }
+    stale = set(existing) - wanted
+    added = wanted - set(existing)
+    if not stale and not added:
+        return
+    with transaction.atomic():
+        PatientIdentifier.objects.filter(
+            pk__in=[existing[row] for row in stale]
+        ).delete()
+        PatientIdentifier.objects.bulk_create(
+            PatientIdentifier(kind=kind, normalized_value=value, patient_id=patient.pk)
+            for kind, value in added
+        )
+    invalidate(value for _kind, value in stale | added)
+
+
+def rebuild_identifiers(batch_size=1000, using=None, models=None):
+    """
+    Recreate every identifier row from the patient table. Returns the number
+    of rows written. ``models`` lets migrations pass their historical models.
+    """
+    models = models or apps
+    Patient = models.get_model("patients", "Patient")
+    PatientIdentifier = models.get_model("patients", "PatientIdentifier")
+    using = using or "default"
+
+    patients = Patient.objects.using(using).values_list(
+        "pk", *IDENTIFIER_FIELDS
+    )
+    total = 0
+    with transaction.atomic(using=using):
+        PatientIdentifier.objects.using(using).all().delete()
+        batch = []
+        for pk, *values in patients.iterator(chunk_size=batch_size):
+            for kind, value in zip(IDENTIFIER_FIELDS.values(), values):
+                value = normalize(value)
+                if value:
+                    batch.append(
+                        PatientIdentifier(
+                            kind=kind, normalized_value=value, patient_id=pk
+                        )
+                    )
+            if len(batch) >= batch_size:
+                PatientIdentifier.objects.using(using).bulk_create(batch)
+                total += len(batch)
+                batch = []
+        PatientIdentifier.objects.using(using).bulk_create(batch)
+        total += len(batch)
+    return total
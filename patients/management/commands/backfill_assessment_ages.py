@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from patients.assessment_ages import refresh_assessment_ages
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored age-at-assessment columns of GMA, HINE, DA and "
+        "video records. Run after bulk imports that bypass model saves."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk update",
+        )
+        parser.add_argument(
+            "--patient",
+            type=int,
+            action="append",
+            dest="patients",
+            help="Only refresh this patient's records (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        total = refresh_assessment_ages(
+            patient_ids=options["patients"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Updated {total} record(s)"))
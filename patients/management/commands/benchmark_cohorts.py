@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ndas.custom_codes.ndas_enums import PtStatus
+from patients.cohorts import COHORT_SCOPES, EVER, get_cohort
+from patients.counters import reconcile_counters
+from patients.models import (
+    CDICRecord,
+    DevelopmentalAssessment,
+    GMAssessment,
+    HINEAssessment,
+    Patient,
+)
+from video.models import Video
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the dashboard and patient manager cohort counts while loading a "
+        "synthetic dataset. Data is rolled back afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patients",
+            type=int,
+            default=500000,
+            help="Total number of synthetic patients to load (default: 500000)",
+        )
+        parser.add_argument(
+            "--steps",
+            type=int,
+            default=5,
+            help="Number of equal loading steps to time the counts after",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert",
+        )
+        parser.add_argument(
+            "--scope",
+            choices=COHORT_SCOPES,
+            default=EVER,
+            help="Cohort scope to benchmark",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Timed repetitions per cohort; the best run is reported",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1, help="Random seed for the dataset"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic rows instead of rolling them back",
+        )
+
+    def handle(self, *args, **options):
+        if options["patients"] < 1 or options["steps"] < 1:
+            raise CommandError("--patients and --steps must be positive")
+
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.batch_size = options["batch_size"]
+        self.created = 0
+
+        per_step = max(options["patients"] // options["steps"], 1)
+        statuses = [status for status in PtStatus if status != PtStatus.ALL]
+
+        with transaction.atomic():
+            for step in range(options["steps"]):
+                self._load_patients(per_step)
+                self._report(statuses, options["scope"], options["repeat"])
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Synthetic data rolled back")
+
+    def _report(self, statuses, scope, repeat):
+        self.stdout.write(f"\n{Patient.objects.count()} patients")
+        for status in statuses:
+            queryset = get_cohort(status, scope)
+            elapsed, total = self._best_of(repeat, queryset.count)
+            self.stdout.write(
+                f"  {status.value:<16} count={total:<8} {elapsed * 1000:8.1f} ms"
+            )
+
+        first_page = get_cohort(PtStatus.DIAGNOSED, scope).with_clinical_summary()
+        elapsed, _ = self._best_of(
+            repeat, lambda: list(first_page.order_by("-id")[:10])
+        )
+        self.stdout.write(f"  {'manager page':<16} {'':<14} {elapsed * 1000:8.1f} ms")
+
+    def _best_of(self, repeat, func):
+        best = None
+        result = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def _load_patients(self, count):
+        remaining = count
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            self._load_batch(size)
+            remaining -= size
+
+    def _load_batch(self, size):
+        rng = self.rng
+        patients = []
+        for _ in range(size):
+            self.created += 1
+            born = self.now - timedelta(days=rng.randint(1, 700))
+            patients.append(
+                Patient(
+                    baby_name=f"Bench Baby {self.created}",
+                    mother_name=f"Bench Mother {self.created}",
+                    gender=rng.choice(["Male", "Female"]),
+                    dob_tob=born,
+                    birth_weight=rng.randint(800, 4000),
+                    ofc=rng.randint(25, 38),
+                    tp_mobile="0770000000",
+                    do_admission=born,
+                )
+            )
+        patients = Patient.objects.bulk_create(patients, batch_size=self.batch_size)
+
+        videos, hine, da, cdic = [], [], [], []
+        for patient in patients:
+            for index in range(rng.choice([0, 0, 1, 1, 2])):
+                videos.append(
+                    Video(
+                        patient=patient,
+                        title=f"bench {patient.pk} {index}",
+                        video_file=f"videos/bench/{patient.pk}_{index}.mp4",
+                        recorded_on=self.now - timedelta(days=index),
+                    )
+                )
+            if rng.random() < 0.3:
+                hine.append(
+                    HINEAssessment(
+                        patient=patient,
+                        date_of_assessment=self.now,
+                        score=rng.randint(40, 78),
+                        assessment_done_by="bench",
+                    )
+                )
+            if rng.random() < 0.2:
+                da.append(
+                    DevelopmentalAssessment(
+                        patient=patient,
+                        date_of_assessment=self.now,
+                        is_dx_normal=rng.random() < 0.7,
+                        assessment_done_by="bench",
+                    )
+                )
+            if rng.random() < 0.1:
+                cdic.append(
+                    CDICRecord(
+                        patient=patient,
+                        assessment_date=self.now.date(),
+                        is_discharged=rng.random() < 0.3,
+                    )
+                )
+
+        videos = Video.objects.bulk_create(videos, batch_size=self.batch_size)
+        gma = [
+            GMAssessment(
+                patient_id=video.patient_id,
+                video_file=video,
+                date_of_assessment=self.now,
+                diagnosis_conclusion=rng.choice(["NORMAL", "ABNORMAL"]),
+            )
+            for video in videos
+            if rng.random() < 0.5
+        ]
+        GMAssessment.objects.bulk_create(gma, batch_size=self.batch_size)
+        HINEAssessment.objects.bulk_create(hine, batch_size=self.batch_size)
+        DevelopmentalAssessment.objects.bulk_create(da, batch_size=self.batch_size)
+        CDICRecord.objects.bulk_create(cdic, batch_size=self.batch_size)
+        # bulk_create sends no signals; the "new" cohort reads video_count
+        reconcile_counters(batch_size=self.batch_size)
@@ -0,0 +1,144 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from patients import autocomplete
+from patients.models import Patient
+from patients.search import backend, rebuild_index, search_patients
+
+SYLLABLES = (
+    "ka", "ma", "ni", "sa", "ra", "tha", "di", "lu", "pe", "ro",
+    "shi", "ya", "na", "ve", "ku", "dha", "mi", "la", "se", "an",
+)
+AREAS = ("Kandy", "Galle", "Matara", "Jaffna", "Kurunegala", "Badulla", "Ampara")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time full-text patient search against the icontains scan it replaces, "
+        "and the autocomplete prefix lookup, on a synthetic dataset. Data is rolled back afterwards unless --keep is "
+        "given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patients",
+            type=int,
+            default=200000,
+            help="Number of synthetic patients to load (default: 200000)",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=50,
+            help="Number of random name queries to time",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1, help="Random seed for the dataset"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic rows instead of rolling them back",
+        )
+
+    def handle(self, *args, **options):
+        if options["patients"] < 1 or options["queries"] < 1:
+            raise CommandError("--patients and --queries must be positive")
+        if backend() is None:
+            raise CommandError("This database has no full-text search support")
+
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now()
+
+        with transaction.atomic():
+            self._load(options["patients"], options["batch_size"])
+            started = time.perf_counter()
+            rebuild_index()
+            autocomplete.rebuild_keys()
+            autocomplete.invalidate()
+            self.stdout.write(
+                f"Indexed {Patient.objects.count()} patients in "
+                f"{time.perf_counter() - started:.1f} s"
+            )
+
+            queries = [self._name() for _ in range(options["queries"])]
+            self._report("full-text", queries, self._fulltext)
+            self._report("icontains", queries, self._icontains)
+            prefixes = ["ba", "baby"] + [
+                text[: self.rng.randint(2, 5)] for text in queries
+            ]
+            self._report("prefix", prefixes, self._prefix)
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Synthetic data rolled back")
+
+    def _fulltext(self, text):
+        results = search_patients(text)
+        return results.count(), list(results[:10])
+
+    def _icontains(self, text):
+        results = Patient.objects.filter(
+            Q(baby_name__startswith=text) | Q(baby_name__icontains=text)
+        )
+        return results.count(), list(results[:10])
+
+    def _prefix(self, text):
+        # Bypass the LRU so every lookup reaches the database
+        autocomplete.invalidate()
+        return autocomplete.suggest(text)
+
+    def _report(self, label, queries, func):
+        timings = []
+        for text in queries:
+            started = time.perf_counter()
+            func(text)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"  {label:<10} median={statistics.median(timings):8.1f} ms "
+            f"p95={p95:8.1f} ms max={timings[-1]:8.1f} ms"
+        )
+
+    def _name(self):
+        return "".join(
+            self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, 4))
+        ).capitalize()
+
+    def _load(self, count, batch_size):
+        rng = self.rng
+        remaining = count
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            patients = []
+            for _ in range(size):
+                born = self.now - timedelta(days=rng.randint(1, 700))
+                patients.append(
+                    Patient(
+                        baby_name=f"Baby {self._name()} {self._name()}",
+                        mother_name=f"{self._name()} {self._name()}",
+                        gender=rng.choice(["Male", "Female"]),
+                        dob_tob=born,
+                        birth_weight=rng.randint(800, 4000),
+                        ofc=rng.randint(25, 38),
+                        tp_mobile="0770000000",
+                        moh_area=rng.choice(AREAS),
+                        do_admission=born,
+                    )
+                )
+            Patient.objects.bulk_create(patients, batch_size=batch_size)
+            remaining -= size
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from patients.autocomplete import invalidate, rebuild_keys
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the patient autocomplete keys from the patient table. Run after "
+        "bulk imports that bypass model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows per bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_keys(batch_size=options["batch_size"])
+        invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} autocomplete key(s)"))
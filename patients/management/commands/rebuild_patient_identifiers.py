@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from patients.identifiers import rebuild_identifiers
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the normalized BHT/NNC/PTC/PC/PIN lookup rows from the patient "
+        "table. Run after bulk imports that bypass model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_identifiers(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} identifier row(s)"))
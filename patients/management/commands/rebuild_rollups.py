@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.rollups import rebuild_rollups
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily MOH-area activity rollups from the patient and "
+        "assessment tables. Run once after migrating, or for a date range after "
+        "bulk imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        start = _parse_date(options["start"]) if options["start"] else None
+        end = _parse_date(options["end"]) if options["end"] else None
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end")
+
+        total = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} rollup row(s)"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from patients.search_documents import rebuild_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the cross-entity search documents for patients, videos, "
+        "assessments, attachments and bookmarks. Run once after migrating and "
+        "after bulk imports."
+    )
+
+    def handle(self, *args, **options):
+        totals = rebuild_documents()
+        for entity_type, total in totals.items():
+            self.stdout.write(f"  {entity_type:<12} {total}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {sum(totals.values())} record(s)")
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from patients.models import Patient
+from patients.search import backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text patient search index. Run after bulk imports or "
+        "restores that bypass Patient.save."
+    )
+
+    def handle(self, *args, **options):
+        kind = backend()
+        if kind is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    "This database has no full-text support; searches use icontains"
+                )
+            )
+            return
+        rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {Patient.objects.count()} patient(s) using {kind}"
+            )
+        )
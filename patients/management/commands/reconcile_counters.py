@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from patients.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the per-patient record counters and the video assessed flags, "
+        "fixing rows that drifted. Run after bulk imports or deletes that "
+        "bypass model signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Patients recounted per query",
+        )
+
+    def handle(self, *args, **options):
+        patients, videos = reconcile_counters(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Fixed {patients} patient(s) and {videos} video(s)")
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from patients.models import Patient, PatientClinicalStatus
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized PatientClinicalStatus rows from the assessment tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patient",
+            type=int,
+            action="append",
+            dest="patients",
+            help="Only rebuild the given patient id (can be repeated)",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only build rows for patients that do not have one yet",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Patient.objects.order_by("id")
+        if options["patients"]:
+            queryset = queryset.filter(id__in=options["patients"])
+        if options["missing_only"]:
+            queryset = queryset.filter(clinical_status__isnull=True)
+
+        total = 0
+        for patient_id in queryset.values_list("id", flat=True).iterator():
+            PatientClinicalStatus.refresh_for_patient(patient_id)
+            total += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt clinical status for {total} patient(s)")
+        )
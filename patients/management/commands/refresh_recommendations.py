@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from patients.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-evaluate the follow-up recommendation rules for every patient. "
+        "Run daily so the age-driven rules stay current."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--patient",
+            type=int,
+            action="append",
+            dest="patients",
+            help="Only refresh the given patient id (can be repeated)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Patients evaluated per batch",
+        )
+
+    def handle(self, *args, **options):
+        total = refresh_recommendations(
+            options["patients"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed recommendations for {total} patient(s)")
+        )
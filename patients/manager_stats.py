@@ -0,0 +1,58 @@
+"""
+Stats-card buckets of the manager pages.
+
+Each declaration is counted with one conditional aggregation over the
+manager's filtered queryset (see ``ndas.custom_codes.counts.ManagerStats``).
+Date-relative buckets are callables resolved per request, at day precision so
+the cached result stays reusable for the rest of the day.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from ndas.custom_codes.choice import BOOKMARK_TYPE
+from ndas.custom_codes.counts import ManagerStats
+
+ASSESSMENT_BOOKMARK_TYPES = ["GMA", "HINE", "DA", "CDICR"]
+
+
+def _days_ago(days):
+    """Start of the local day ``days`` days ago, as an aware datetime"""
+    day = timezone.localdate() - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+BOOKMARK_STATS = ManagerStats(
+    total=None,
+    patient=Q(bookmark_type="Patient"),
+    video=Q(bookmark_type="Video"),
+    assessment=Q(bookmark_type__in=ASSESSMENT_BOOKMARK_TYPES),
+    public=Q(is_public=True),
+    **{
+        f"type_{value}": Q(bookmark_type=value)
+        for value, _label in BOOKMARK_TYPE
+    },
+)
+
+CDIC_STATS = ManagerStats(
+    total=None,
+    completed=Q(next_appointment_date__isnull=True),
+    pending=lambda: Q(next_appointment_date__gte=_days_ago(0)),
+    this_week=lambda: Q(assessment_date__gte=timezone.localdate() - timedelta(days=7)),
+)
+
+HINE_STATS = ManagerStats(
+    total=None,
+    normal=Q(score__gte=60),
+    moderate=Q(score__gte=40, score__lt=60),
+    significant=Q(score__lt=40),
+)
+
+DA_STATS = ManagerStats(
+    total=None,
+    normal=Q(is_dx_normal=True),
+    delayed=Q(is_dx_normal=False),
+    this_month=lambda: Q(date_of_assessment__gte=_days_ago(30)),
+)
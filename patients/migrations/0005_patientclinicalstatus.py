@@ -0,0 +1,163 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0004_alter_gmassessment_video_file_delete_video"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientClinicalStatus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When this record was created",
+                        verbose_name="Created At",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="When this record was last updated",
+                        verbose_name="Updated At",
+                    ),
+                ),
+                (
+                    "latest_gma_is_normal",
+                    models.BooleanField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Whether the most recent GM assessment concluded normal",
+                        null=True,
+                        verbose_name="Latest GMA Normal",
+                    ),
+                ),
+                (
+                    "latest_gma_diagnoses",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Comma-separated diagnosis titles of the most recent GMA",
+                        verbose_name="Latest GMA Diagnoses",
+                    ),
+                ),
+                (
+                    "latest_hine_score",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="Score of the most recent HINE assessment",
+                        null=True,
+                        verbose_name="Latest HINE Score",
+                    ),
+                ),
+                (
+                    "latest_hine_is_normal",
+                    models.BooleanField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Whether the most recent HINE score is above 73",
+                        null=True,
+                        verbose_name="Latest HINE Normal",
+                    ),
+                ),
+                (
+                    "latest_da_is_normal",
+                    models.BooleanField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Whether the most recent developmental assessment is normal",
+                        null=True,
+                        verbose_name="Latest DA Normal",
+                    ),
+                ),
+                (
+                    "is_discharged",
+                    models.BooleanField(
+                        db_index=True,
+                        default=False,
+                        help_text="Whether the most recent CDIC record discharged the patient",
+                        verbose_name="Is Discharged",
+                    ),
+                ),
+                (
+                    "latest_cdic",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Most recent CDIC record of the patient",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="patients.cdicrecord",
+                        verbose_name="Latest CDIC Record",
+                    ),
+                ),
+                (
+                    "latest_da",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Most recent developmental assessment of the patient",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="patients.developmentalassessment",
+                        verbose_name="Latest DA",
+                    ),
+                ),
+                (
+                    "latest_gma",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Most recent GM assessment of the patient",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="patients.gmassessment",
+                        verbose_name="Latest GMA",
+                    ),
+                ),
+                (
+                    "latest_hine",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Most recent HINE assessment of the patient",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="patients.hineassessment",
+                        verbose_name="Latest HINE",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.OneToOneField(
+                        help_text="Patient this status snapshot belongs to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="clinical_status",
+                        to="patients.patient",
+                        verbose_name="Patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Patient Clinical Status",
+                "verbose_name_plural": "Patient Clinical Statuses",
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0005_patientclinicalstatus"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cdicrecord",
+            index=models.Index(
+                fields=["patient", "is_discharged"], name="cdic_patient_discharge_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="developmentalassessment",
+            index=models.Index(
+                fields=["patient", "is_dx_normal"],
+                name="patients_de_patient_576e25_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gmassessment",
+            index=models.Index(
+                fields=["patient", "diagnosis_conclusion"],
+                name="gma_patient_conclusion_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="hineassessment",
+            index=models.Index(
+                fields=["patient", "score"], name="patients_hi_patient_474a6e_idx"
+            ),
+        ),
+    ]
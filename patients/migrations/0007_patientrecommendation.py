@@ -0,0 +1,106 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0006_cohort_exists_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When this record was created",
+                        verbose_name="Created At",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="When this record was last updated",
+                        verbose_name="Updated At",
+                    ),
+                ),
+                (
+                    "rule_id",
+                    models.CharField(
+                        choices=[
+                            ("GMA_FIRST_WM", "Initial GMA (writhing movements)"),
+                            ("GMA_FIRST_FM", "Initial GMA (fidgety movements)"),
+                            ("GMA_SECOND", "Second GMA"),
+                            ("HINE_DUE", "HINE due"),
+                            ("MDT_REFERRAL", "MDT referral"),
+                        ],
+                        help_text="Recommendation rule that produced this row",
+                        max_length=20,
+                        verbose_name="Rule",
+                    ),
+                ),
+                (
+                    "message",
+                    models.TextField(
+                        help_text="Recommendation shown to the clinician",
+                        verbose_name="Message",
+                    ),
+                ),
+                (
+                    "is_due",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Whether the recommended action is currently due",
+                        verbose_name="Is Due",
+                    ),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(
+                        help_text="When the rule was last evaluated for this patient",
+                        verbose_name="Computed At",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        help_text="Patient this recommendation belongs to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="patients.patient",
+                        verbose_name="Patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Patient Recommendation",
+                "verbose_name_plural": "Patient Recommendations",
+                "indexes": [
+                    models.Index(
+                        fields=["is_due", "rule_id"], name="recommendation_due_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="patientrecommendation",
+            constraint=models.UniqueConstraint(
+                fields=("patient", "rule_id"), name="recommendation_patient_rule_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0007_patientrecommendation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyActivityRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When this record was created",
+                        verbose_name="Created At",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="When this record was last updated",
+                        verbose_name="Updated At",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateField(
+                        help_text="Calendar day the counts belong to",
+                        verbose_name="Day",
+                    ),
+                ),
+                (
+                    "moh_area",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Patient MOH area, empty when not recorded",
+                        max_length=255,
+                        verbose_name="MOH Area",
+                    ),
+                ),
+                (
+                    "births",
+                    models.PositiveIntegerField(default=0, verbose_name="Births"),
+                ),
+                (
+                    "admissions",
+                    models.PositiveIntegerField(default=0, verbose_name="Admissions"),
+                ),
+                (
+                    "gma_normal",
+                    models.PositiveIntegerField(default=0, verbose_name="GMA Normal"),
+                ),
+                (
+                    "gma_abnormal",
+                    models.PositiveIntegerField(default=0, verbose_name="GMA Abnormal"),
+                ),
+                (
+                    "hine_normal",
+                    models.PositiveIntegerField(default=0, verbose_name="HINE Normal"),
+                ),
+                (
+                    "hine_abnormal",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="HINE Abnormal"
+                    ),
+                ),
+                (
+                    "da_normal",
+                    models.PositiveIntegerField(default=0, verbose_name="DA Normal"),
+                ),
+                (
+                    "da_abnormal",
+                    models.PositiveIntegerField(default=0, verbose_name="DA Abnormal"),
+                ),
+                (
+                    "discharges",
+                    models.PositiveIntegerField(default=0, verbose_name="Discharges"),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Activity Rollup",
+                "verbose_name_plural": "Daily Activity Rollups",
+                "ordering": ["day", "moh_area"],
+                "indexes": [
+                    models.Index(fields=["moh_area", "day"], name="rollup_area_day_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyactivityrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "moh_area"), name="rollup_day_area_uniq"
+            ),
+        ),
+    ]
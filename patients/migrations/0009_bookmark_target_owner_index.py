@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0008_dailyactivityrollup"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="bookmark",
+            name="bookmark_type_object_idx",
+        ),
+        migrations.AddIndex(
+            model_name="bookmark",
+            index=models.Index(
+                fields=["bookmark_type", "object_id", "owner"],
+                name="bookmark_type_object_own_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from patients import search
+
+
+def create_search_index(apps, schema_editor):
+    search.rebuild_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0009_bookmark_target_owner_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
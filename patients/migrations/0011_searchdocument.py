@@ -0,0 +1,132 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from patients import search_documents
+
+
+def create_search_index(apps, schema_editor):
+    search_documents.create_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search_documents.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0010_patient_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When this record was created",
+                        verbose_name="Created At",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="When this record was last updated",
+                        verbose_name="Updated At",
+                    ),
+                ),
+                (
+                    "entity_type",
+                    models.CharField(
+                        choices=[
+                            ("Patient", "Patient"),
+                            ("Video", "Video"),
+                            ("GMA", "GMA"),
+                            ("HINE", "HINE"),
+                            ("Attachment", "Attachment"),
+                            ("DA", "DA"),
+                            ("CDICR", "CDICR"),
+                            ("Bookmark", "Bookmark"),
+                        ],
+                        help_text="Kind of record the document describes",
+                        max_length=20,
+                        verbose_name="Entity Type",
+                    ),
+                ),
+                (
+                    "entity_id",
+                    models.PositiveIntegerField(
+                        help_text="ID of the described record", verbose_name="Entity ID"
+                    ),
+                ),
+                (
+                    "title",
+                    models.CharField(
+                        help_text="Headline shown for a search hit",
+                        max_length=255,
+                        verbose_name="Title",
+                    ),
+                ),
+                (
+                    "body",
+                    models.TextField(
+                        blank=True,
+                        help_text="Searchable text of the record",
+                        verbose_name="Body",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Date the record refers to (recording, assessment, birth)",
+                        null=True,
+                        verbose_name="Date",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Patient the record belongs to, if any",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="patients.patient",
+                        verbose_name="Patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Document",
+                "verbose_name_plural": "Search Documents",
+                "indexes": [
+                    models.Index(
+                        fields=["entity_type", "date"], name="searchdoc_type_date_idx"
+                    ),
+                    models.Index(fields=["date"], name="searchdoc_date_idx"),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="searchdocument",
+            constraint=models.UniqueConstraint(
+                fields=("entity_type", "entity_id"), name="searchdoc_entity_uniq"
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from patients.identifiers import rebuild_identifiers
+
+
+def fill_identifiers(apps, schema_editor):
+    rebuild_identifiers(using=schema_editor.connection.alias, models=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0011_searchdocument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientIdentifier",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("BHT", "BHT Number"),
+                            ("NNC", "NNC Number"),
+                            ("PTC", "PTC Number"),
+                            ("PC", "PC Number"),
+                            ("PIN", "PIN / PHN"),
+                        ],
+                        help_text="Which patient number this is",
+                        max_length=3,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "normalized_value",
+                    models.CharField(
+                        help_text="Upper-cased identifier without spaces or separators",
+                        max_length=20,
+                        verbose_name="Normalized Value",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="identifiers",
+                        to="patients.patient",
+                        verbose_name="Patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Patient Identifier",
+                "verbose_name_plural": "Patient Identifiers",
+                "indexes": [
+                    models.Index(
+                        fields=["normalized_value", "kind"],
+                        name="patient_ident_value_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_identifiers, migrations.RunPython.noop),
+    ]
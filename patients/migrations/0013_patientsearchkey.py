@@ -0,0 +1,61 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from patients.autocomplete import rebuild_keys
+
+
+def fill_keys(apps, schema_editor):
+    rebuild_keys(using=schema_editor.connection.alias, models=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0012_patientidentifier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientSearchKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Normalized name suffix or identifier",
+                        max_length=100,
+                        verbose_name="Key",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_keys",
+                        to="patients.patient",
+                        verbose_name="Patient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Patient Search Key",
+                "verbose_name_plural": "Patient Search Keys",
+                "indexes": [
+                    models.Index(
+                        fields=["key", "patient"], name="patient_search_key_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:44
+
+from django.db import migrations, models
+
+from patients.assessment_ages import refresh_assessment_ages
+
+
+def fill_assessment_ages(apps, schema_editor):
+    refresh_assessment_ages(using=schema_editor.connection.alias, models=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0013_patientsearchkey"),
+        ("video", "0004_video_assessment_age_days"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="developmentalassessment",
+            name="age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Chronological age in days on the assessment date",
+                null=True,
+                verbose_name="Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="developmentalassessment",
+            name="corrected_age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Age corrected for prematurity, in days, on the assessment date",
+                null=True,
+                verbose_name="Corrected Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gmassessment",
+            name="age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Chronological age in days on the assessment date",
+                null=True,
+                verbose_name="Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gmassessment",
+            name="corrected_age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Age corrected for prematurity, in days, on the assessment date",
+                null=True,
+                verbose_name="Corrected Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hineassessment",
+            name="age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Chronological age in days on the assessment date",
+                null=True,
+                verbose_name="Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="hineassessment",
+            name="corrected_age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Age corrected for prematurity, in days, on the assessment date",
+                null=True,
+                verbose_name="Corrected Age at Assessment (days)",
+            ),
+        ),
+        migrations.RunPython(fill_assessment_ages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+from patients.counters import reconcile_counters
+
+
+def fill_counters(apps, schema_editor):
+    reconcile_counters(using=schema_editor.connection.alias, models=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0014_assessment_age_days"),
+        ("video", "0005_video_assessed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patient",
+            name="attachment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of attachments of this patient",
+                verbose_name="Attachments",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="cdic_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of CDIC records of this patient",
+                verbose_name="CDIC Records",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="da_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of developmental assessments of this patient",
+                verbose_name="Developmental Assessments",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="gma_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of GM assessments of this patient",
+                verbose_name="GM Assessments",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="hine_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of HINE assessments of this patient",
+                verbose_name="HINE Assessments",
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="video_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Number of videos of this patient",
+                verbose_name="Videos",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(
+                fields=["video_count", "created_at"], name="patient_new_idx"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
+from collections import defaultdict
+
 from django.db import models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from dateutil.relativedelta import relativedelta
-from datetime import timedelta
 from djrichtextfield.models import RichTextField
 
 from ndas.custom_codes.choice import (
@@ -21,9 +23,11 @@ from ndas.custom_codes.choice import (
     SCAN_RESULT_CHOICES,
     FILE_SIZE_LIMITS,
     ALLOWED_EXTENSIONS,
+    RECOMMENDATION_RULES,
+    SEARCH_ENTITY_TYPE,
+    IDENTIFIER_KIND,
 )
 from ndas.custom_codes.custom_methods import (
-    getCountZeroIfNone,
     get_attachment_path_file_name,
     checkRCState,
 )
@@ -35,15 +39,65 @@ from ndas.custom_codes.validators import (
     validate_pog_days,
     validate_attachment_file,
 )
+from ndas.custom_codes.ages import age_ymd, display_ages, format_ymd
 from ndas.custom_codes.Custom_abstract_class import (
+    AssessmentAgeMixin,
+    CountedRecordMixin,
     TimeStampedModel,
     UserTrackingMixin,
 )
 
+from patients.counters import PATIENT_COUNTER_FIELDS, fields_to_save
+from patients.manager_stats import BOOKMARK_STATS
+from patients.recommendations import (
+    RULE_IDS,
+    RULE_MESSAGES,
+    age_in_months,
+    evaluate_rules,
+)
+
 # Import Video model to avoid circular import issues
 from django.apps import apps
 
 
+class PatientQuerySet(models.QuerySet):
+    def with_clinical_summary(self):
+        """
+        Annotate each patient with its latest assessment outcomes.
+
+        Everything is computed with correlated subqueries in the same SELECT that
+        loads the patients, so rendering a page of patients costs a constant
+        number of queries regardless of how many assessments each one has.
+        """
+        patient_ref = OuterRef("pk")
+
+        return self.annotate(
+            summary_latest_gma_conclusion=Subquery(
+                GMAssessment.objects.filter(patient=patient_ref)
+                .order_by("-id")
+                .values("diagnosis_conclusion")[:1]
+            ),
+            summary_latest_hine_score=Subquery(
+                HINEAssessment.objects.filter(patient=patient_ref)
+                .order_by("-id")
+                .values("score")[:1]
+            ),
+            summary_latest_da_normal=Subquery(
+                DevelopmentalAssessment.objects.filter(patient=patient_ref)
+                .order_by("-id")
+                .values("is_dx_normal")[:1]
+            ),
+            summary_is_discharged=Coalesce(
+                Subquery(
+                    CDICRecord.objects.filter(patient=patient_ref)
+                    .order_by("-id")
+                    .values("is_discharged")[:1]
+                ),
+                Value(False),
+            ),
+        )
+
+
 class Patient(TimeStampedModel, UserTrackingMixin):
     bht = models.CharField(
         max_length=20,
@@ -302,6 +356,46 @@ class Patient(TimeStampedModel, UserTrackingMixin):
         help_text=_("Any additional medical or social information"),
     )
 
+    # Counter-cache columns, maintained in SQL (see patients.counters)
+    video_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Videos"),
+        help_text=_("Number of videos of this patient"),
+    )
+    attachment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Attachments"),
+        help_text=_("Number of attachments of this patient"),
+    )
+    gma_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("GM Assessments"),
+        help_text=_("Number of GM assessments of this patient"),
+    )
+    hine_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("HINE Assessments"),
+        help_text=_("Number of HINE assessments of this patient"),
+    )
+    da_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Developmental Assessments"),
+        help_text=_("Number of developmental assessments of this patient"),
+    )
+    cdic_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("CDIC Records"),
+        help_text=_("Number of CDIC records of this patient"),
+    )
+
+    objects = PatientQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Patient")
         verbose_name_plural = _("Patients")
@@ -317,6 +411,7 @@ class Patient(TimeStampedModel, UserTrackingMixin):
             models.Index(
                 fields=["resuscitated", "birth_weight"], name="patient_risk_idx"
             ),
+            models.Index(fields=["video_count", "created_at"], name="patient_new_idx"),
         ]
 
     def __str__(self):
@@ -347,22 +442,23 @@ class Patient(TimeStampedModel, UserTrackingMixin):
     def save(self, *args, **kwargs):
         """Override save to perform additional validation"""
         self.full_clean()
+        if kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = fields_to_save(self, PATIENT_COUNTER_FIELDS)
         super().save(*args, **kwargs)
 
     # Optimized properties with caching where appropriate
     @property
     def isNewPatient(self):
         """Check if patient has any video records"""
-        if hasattr(self, "pk") and self.pk:
-            Video = apps.get_model('video', 'Video')
-            return not Video.objects.filter(patient=self.pk).exists()
-        return True
+        return not self.video_count
 
     @property
     def isDischarged(self):
         """Check if patient is discharged"""
-        latest_record = CDICRecord.objects.filter(patient=self).order_by("-id").first()
-        return latest_record.is_discharged if latest_record else False
+        if hasattr(self, "summary_is_discharged"):
+            return self.summary_is_discharged
+        status = self.get_clinical_status()
+        return status.is_discharged if status else False
 
     @property
     def getAPGAR(self):
@@ -372,26 +468,19 @@ class Patient(TimeStampedModel, UserTrackingMixin):
     @property
     def isScreeningPositive(self):
         """Check if patient has positive screening results"""
-        if not hasattr(self, "pk") or not self.pk:
-            return False
-
-        var_gma_record = (
-            GMAssessment.objects.filter(patient=self).order_by("-id").first()
-        )
-        if var_gma_record is not None:
-            latest_gma_assessment = var_gma_record.is_diagnosis_normal
+        if hasattr(self, "summary_latest_hine_score"):
+            last_hine_score = self.summary_latest_hine_score
         else:
-            latest_gma_assessment = True
+            status = self.get_clinical_status()
+            if status is None:
+                return False
+            last_hine_score = status.latest_hine_score
 
-        hine_records = HINEAssessment.objects.filter(patient=self)
-        hine_record_count = getCountZeroIfNone(hine_records)
+        latest_gma_assessment = self.isLastGMANormal
 
-        if hine_record_count == 0 and latest_gma_assessment == True:
+        if last_hine_score is None and latest_gma_assessment == True:
             return False
-        if hine_record_count > 0:
-
-            last_hine_record = hine_records.order_by("-id").first()
-            last_hine_score = last_hine_record.score if last_hine_record else 0
+        if last_hine_score is not None:
 
             if latest_gma_assessment == True and last_hine_score > 73:
                 return False
@@ -417,37 +506,35 @@ class Patient(TimeStampedModel, UserTrackingMixin):
     @property
     def isLastGMANormal(self):
         """Check if last GMA assessment is normal"""
-        if not hasattr(self, "pk") or not self.pk:
-            return True
-
-        if GMAssessment.objects.filter(patient=self).exists():
-            try:
-                latest = (
-                    GMAssessment.objects.filter(patient=self).order_by("-id").first()
-                )
-                return latest.is_diagnosis_normal if latest else False
-            except:
-                return False
-        else:
+        if hasattr(self, "summary_latest_gma_conclusion"):
+            conclusion = self.summary_latest_gma_conclusion
+            return conclusion is None or conclusion == "NORMAL"
+        status = self.get_clinical_status()
+        if status is None or status.latest_gma_is_normal is None:
             return True
+        return status.latest_gma_is_normal
 
     @property
     def isLastHINENormal(self):
         """Check if last HINE assessment is normal"""
-        if not hasattr(self, "pk") or not self.pk:
+        if hasattr(self, "summary_latest_hine_score"):
+            score = self.summary_latest_hine_score
+            return score is None or score > 73
+        status = self.get_clinical_status()
+        if status is None or status.latest_hine_is_normal is None:
             return True
-        latest = HINEAssessment.objects.filter(patient=self).order_by("-id").first()
-        return latest.is_normal if latest else True
+        return status.latest_hine_is_normal
 
     @property
     def isLastDANormal(self):
         """Check if last DA assessment is normal"""
-        if not hasattr(self, "pk") or not self.pk:
+        if hasattr(self, "summary_latest_da_normal"):
+            is_normal = self.summary_latest_da_normal
+            return is_normal is None or is_normal
+        status = self.get_clinical_status()
+        if status is None or status.latest_da_is_normal is None:
             return True
-        latest = (
-            DevelopmentalAssessment.objects.filter(patient=self).order_by("-id").first()
-        )
-        return latest.is_dx_normal if latest else True
+        return status.latest_da_is_normal
 
     @property
     def isDiagnosisNormal(self):
@@ -459,6 +546,8 @@ class Patient(TimeStampedModel, UserTrackingMixin):
         """Check if patient is bookmarked"""
         if not hasattr(self, "pk") or not self.pk:
             return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "Patient")
         try:
             return Bookmark.objects.get(bookmark_type="Patient", object_id=self.pk)
         except Bookmark.DoesNotExist:
@@ -476,112 +565,61 @@ class Patient(TimeStampedModel, UserTrackingMixin):
     @property
     def getDiagnosisList(self):
         """Get comprehensive diagnosis list from all assessments"""
-        if not hasattr(self, "pk") or not self.pk:
+        status = self.get_clinical_status()
+        if status is None:
             return "No assessments", "No assessments", "No assessments"
 
-        try:
-            latest_gma = (
-                GMAssessment.objects.filter(patient=self).order_by("-id").first()
-            )
-            var_gma_dx_list = (
-                ", ".join(
-                    map(
-                        str,
-                        list(
-                            latest_gma.diagnosis.all().values_list("title", flat=True)
-                        ),
-                    )
-                )
-                if latest_gma
-                else "No GM assessments"
-            )
-        except:
-            var_gma_dx_list = "No GM assessments"
-
-        var_dx_hine = (
-            HINEAssessment.objects.filter(patient=self).order_by("-id").first()
-        )
-        var_dx_da = (
-            DevelopmentalAssessment.objects.filter(patient=self).order_by("-id").first()
+        dx_gma = (
+            status.latest_gma_diagnoses
+            if status.latest_gma_id is not None
+            else "No GM assessments"
         )
-
-        dx_gma = var_gma_dx_list
         dx_hine = (
-            f"Score - {var_dx_hine.score}"
-            if var_dx_hine is not None
+            f"Score - {status.latest_hine_score}"
+            if status.latest_hine_id is not None
             else "No HINE records"
         )
-        dx_da = var_dx_da.is_dx_normal if var_dx_da is not None else "No DA records"
+        dx_da = (
+            status.latest_da_is_normal
+            if status.latest_da_id is not None
+            else "No DA records"
+        )
 
         return dx_gma, dx_hine, dx_da
 
+    @staticmethod
+    def prime_ages(patients, reference=None):
+        """Compute the display ages of a list of patients in one batch"""
+        patients = [patient for patient in patients if patient is not None]
+        for patient, ages in zip(patients, display_ages(patients, reference)):
+            patient.age_cache = ages
+
+    def get_display_ages(self):
+        """Age strings for this patient, from prime_ages when it was used"""
+        if getattr(self, "age_cache", None) is None:
+            self.age_cache = display_ages([self])[0]
+        return self.age_cache
+
     @property
     def getCurrentAge(self):
         """Calculate current age from birth date"""
         if not self.dob_tob:
             return "Unknown"
-
-        var_results = relativedelta(timezone.now().date(), self.dob_tob.date())
-        return f"{var_results.years} Years {var_results.months} Months {var_results.days} Days"
+        return self.get_display_ages()["current"]
 
     @property
     def getCorrectedAge(self):
         """Calculate corrected age based on gestational age"""
         if not self.dob_tob:
             return "Unknown"
-
-        gestational_age = (
-            self.pog_wks * 7 + self.pog_days
-        )  # Calculate gestational age in days
-        term_age = 40 * 7  # Term age in days
-
-        if gestational_age < term_age:
-            days_till_term = term_age - gestational_age
-            var_results = relativedelta(
-                (timezone.now().date() - timedelta(days=days_till_term)),
-                self.dob_tob.date(),
-            )
-        else:
-            var_results = relativedelta(timezone.now().date(), self.dob_tob.date())
-        age_yrs = var_results.years
-        age_mnths = var_results.months
-        age_days = var_results.days
-        return f"{age_yrs} Years {age_mnths} Months {age_days} Days"
+        return self.get_display_ages()["corrected"]
 
     @property
     def getCorrectedGestationalAge(self):
         """Calculate corrected gestational age"""
         if not self.dob_tob:
             return "Unknown"
-
-        final_corr_age_wks = 0
-        final_corr_age_ds = 0
-
-        born = self.dob_tob.date()
-        today = timezone.now().date()
-        ageindays = (today - born).days
-
-        # get current age in wks and days
-        ageindays_wks, ageindays_days = divmod(ageindays, 7)
-
-        corr_age_wks = self.pog_wks + ageindays_wks
-        corr_age_days = self.pog_days + ageindays_days
-
-        if corr_age_days < 7:
-            final_corr_age_wks = corr_age_wks
-            final_corr_age_ds = corr_age_days
-        elif corr_age_days > 7:
-            final_corr_age_wks = corr_age_wks + int(corr_age_days / 7)
-            final_corr_age_ds = corr_age_days % 7
-        elif corr_age_days == 7:
-            final_corr_age_wks = corr_age_wks + int(corr_age_days / 7) + 1
-            final_corr_age_ds = 0
-
-        # returning final values
-        if final_corr_age_wks < 40:
-            return f"{final_corr_age_wks} + {final_corr_age_ds}"
-        else:
-            return f"Term +"
+        return self.get_display_ages()["gestational"]
 
     @property
     def getRC(self):
@@ -589,92 +627,37 @@ class Patient(TimeStampedModel, UserTrackingMixin):
         if not hasattr(self, "pk") or not self.pk:
             return False
 
-        gma_count = GMAssessment.objects.filter(patient=self).count()
-        current_age = int((timezone.now().date() - self.dob_tob.date()).days / 30)
+        current_age = age_in_months(self.dob_tob)
 
-        try:
-            last_hine_record = HINEAssessment.objects.filter(patient=self).last()
-            last_hine_score = last_hine_record.score if last_hine_record else 0
-        except AttributeError:
-            last_hine_score = 0
-
-        rc_state = False
-
-        # check 1st GMA assessment
-        if gma_count == 0 and current_age <= 2:
-            check_1st_gma_wm = {
-                "msg": "Please perform the initial General Movement Assessment (GMA) to assess writhing movements.",
-                "display": True,
-            }
-        else:
-            check_1st_gma_wm = {"msg": "", "display": False}
-
-        # check 1st GMA assessment
-        if gma_count == 0 and current_age > 2:
-            check_1st_gma_fm = {
-                "msg": "Please perform the initial General Movement Assessment (GMA) to assess and identify fidget movements.",
-                "display": True,
-            }
-        else:
-            check_1st_gma_fm = {"msg": "", "display": False}
-
-        # check 2nd GMA assessment
-        if gma_count == 1 and current_age > 2:
-            check_2nd_gma = {
-                "msg": "Please perform the second (2nd) General Movement Assessment (GMA) to assess and identify fidget movements.",
-                "display": True,
-            }
-        else:
-            check_2nd_gma = {"msg": "", "display": False}
-
-        # check HINE time
-        if 4 <= current_age <= 6 and current_age > 2 and gma_count == 2:
-            check_HINE_time = {
-                "msg": "It is time to perform the HINE (Hammersmith Infant Neurological Examination).",
-                "display": True,
-            }
-        else:
-            check_HINE_time = {"msg": "", "display": False}
-
-        # check physiotheraphy indication
-        if self.isLastGMANormal == False and last_hine_score < 73:
-            is_pt_indicated = {
-                "msg": "Screening positive. Please refer baby to the Multidisciplinary Team (MDT) at the Child Development and Intervention Center/ Clinic (CDIC)",
-                "display": True,
-            }
-        else:
-            is_pt_indicated = {"msg": "", "display": False}
+        status = self.get_clinical_status()
+        last_hine_score = (status.latest_hine_score if status else None) or 0
 
-        if (
-            checkRCState(check_1st_gma_wm)
-            or checkRCState(check_1st_gma_fm)
-            or checkRCState(check_2nd_gma)
-            or checkRCState(check_HINE_time)
-            or checkRCState(is_pt_indicated)
-        ):
-            rc_state = True
-        else:
-            rc_state = False
+        due = evaluate_rules(
+            self.gma_count, current_age, self.isLastGMANormal, last_hine_score
+        )
+        checks = [
+            {"msg": RULE_MESSAGES[rule_id], "display": True}
+            if due[rule_id]
+            else {"msg": "", "display": False}
+            for rule_id in RULE_IDS
+        ]
+        rc_state = any(checkRCState(check) for check in checks)
 
         # check discharge state
-        cdic_record = CDICRecord.objects.filter(patient=self).order_by("-id").first()
-
-        if cdic_record is not None:
-            discharge_state = cdic_record.is_discharged
-        else:
-            discharge_state = False
-
-        if discharge_state:
+        if self.isDischarged:
             return False
         else:
-            return [
-                rc_state,
-                check_1st_gma_wm,
-                check_1st_gma_fm,
-                check_2nd_gma,
-                check_HINE_time,
-                is_pt_indicated,
-            ]
+            return [rc_state, *checks]
+
+    def get_clinical_status(self):
+        """Get the denormalized clinical status row, building it on first use"""
+        if not hasattr(self, "pk") or not self.pk:
+            return None
+        try:
+            return self.clinical_status
+        except ObjectDoesNotExist:
+            self.clinical_status = PatientClinicalStatus.refresh_for_patient(self.pk)
+            return self.clinical_status
 
     # Method to get related assessments efficiently
     def get_latest_gma_assessment(self):
@@ -709,7 +692,9 @@ class Patient(TimeStampedModel, UserTrackingMixin):
         )
 
 
-class GMAssessment(TimeStampedModel, UserTrackingMixin):
+class GMAssessment(
+    TimeStampedModel, UserTrackingMixin, AssessmentAgeMixin, CountedRecordMixin
+):
     # Core assessment fields with proper validation and indexing
     patient = models.ForeignKey(
         Patient,
@@ -782,6 +767,10 @@ class GMAssessment(TimeStampedModel, UserTrackingMixin):
             models.Index(
                 fields=["patient", "date_of_assessment"], name="gma_patient_date_idx"
             ),
+            models.Index(
+                fields=["patient", "diagnosis_conclusion"],
+                name="gma_patient_conclusion_idx",
+            ),
             models.Index(
                 fields=["diagnosis_conclusion", "date_of_assessment"],
                 name="gma_conclusion_date_idx",
@@ -839,6 +828,8 @@ class GMAssessment(TimeStampedModel, UserTrackingMixin):
         """Check if assessment is bookmarked - optimized version"""
         if not self.pk:
             return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "GMA")
 
         # Use select_related to avoid additional queries
         try:
@@ -946,7 +937,7 @@ class GMAssessment(TimeStampedModel, UserTrackingMixin):
         return self.assessment_age
 
 
-class CDICRecord(TimeStampedModel, UserTrackingMixin):
+class CDICRecord(TimeStampedModel, UserTrackingMixin, CountedRecordMixin):
     # Core fields with proper validation and indexing
     patient = models.ForeignKey(
         Patient,
@@ -1043,6 +1034,9 @@ class CDICRecord(TimeStampedModel, UserTrackingMixin):
             models.Index(
                 fields=["patient", "assessment_date"], name="cdic_patient_date_idx"
             ),
+            models.Index(
+                fields=["patient", "is_discharged"], name="cdic_patient_discharge_idx"
+            ),
             models.Index(
                 fields=["is_discharged", "assessment_date"], name="cdic_discharge_idx"
             ),
@@ -1124,6 +1118,8 @@ class CDICRecord(TimeStampedModel, UserTrackingMixin):
         """Check if CDIC record is bookmarked - optimized version"""
         if not self.pk:
             return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "CDICR")
 
         try:
             return Bookmark.objects.select_related("owner").get(
@@ -1167,10 +1163,7 @@ class CDICRecord(TimeStampedModel, UserTrackingMixin):
         if not self.assessment_date or not self.patient.dob_tob:
             return "Unknown"
 
-        age_delta = relativedelta(self.assessment_date, self.patient.dob_tob.date())
-        return (
-            f"{age_delta.years} Years {age_delta.months} Months {age_delta.days} Days"
-        )
+        return format_ymd(*age_ymd(self.patient.dob_tob, self.assessment_date))
 
     # Class methods for efficient queries
     @classmethod
@@ -1205,7 +1198,7 @@ class CDICRecord(TimeStampedModel, UserTrackingMixin):
         ).select_related("patient")
 
 
-class Attachment(TimeStampedModel, UserTrackingMixin):
+class Attachment(TimeStampedModel, UserTrackingMixin, CountedRecordMixin):
 
     # Core fields with proper validation and indexing
     patient = models.ForeignKey(
@@ -1516,6 +1509,8 @@ class Attachment(TimeStampedModel, UserTrackingMixin):
         """Check if attachment is bookmarked - optimized version"""
         if not self.pk:
             return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "Attachment")
 
         try:
             return Bookmark.objects.select_related("owner").get(
@@ -1691,6 +1686,17 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
         help_text=_("Priority level of this bookmark"),
     )
 
+    # bookmark_type -> (app_label, model_name) of the bookmarked object
+    TARGET_MODELS = {
+        "Patient": ("patients", "Patient"),
+        "Video": ("video", "Video"),
+        "GMA": ("patients", "GMAssessment"),
+        "HINE": ("patients", "HINEAssessment"),
+        "Attachment": ("patients", "Attachment"),
+        "DA": ("patients", "DevelopmentalAssessment"),
+        "CDICR": ("patients", "CDICRecord"),
+    }
+
     class Meta:
         verbose_name = _("Bookmark")
         verbose_name_plural = _("Bookmarks")
@@ -1702,7 +1708,8 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
                 fields=["owner", "-created_at"], name="bookmark_owner_date_idx"
             ),
             models.Index(
-                fields=["bookmark_type", "object_id"], name="bookmark_type_object_idx"
+                fields=["bookmark_type", "object_id", "owner"],
+                name="bookmark_type_object_own_idx",
             ),
             models.Index(
                 fields=["is_public", "priority"], name="bookmark_public_priority_idx"
@@ -1738,23 +1745,8 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
             return
 
         try:
-            # Import models dynamically to avoid circular imports
-            from django.apps import apps
-
-            model_mapping = {
-                "Patient": ("patients", "Patient"),
-                "Video": ("patients", "Video"),
-                "GMA": ("patients", "GMAssessment"),
-                "HINE": ("patients", "HINEAssessment"),
-                "Attachment": ("patients", "Attachment"),
-                "DA": ("patients", "DevelopmentalAssessment"),
-                "CDICR": ("patients", "CDICRecord"),
-            }
-
-            if self.bookmark_type in model_mapping:
-                app_label, model_name = model_mapping[self.bookmark_type]
-                model_class = apps.get_model(app_label, model_name)
-
+            model_class = self.target_model(self.bookmark_type)
+            if model_class is not None:
                 if not model_class.objects.filter(pk=self.object_id).exists():
                     raise ValidationError(
                         {
@@ -1782,21 +1774,8 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
     def _get_bookmarked_object(self):
         """Helper method to retrieve the bookmarked object"""
         try:
-            from django.apps import apps
-
-            model_mapping = {
-                "Patient": ("patients", "Patient"),
-                "Video": ("patients", "Video"),
-                "GMA": ("patients", "GMAssessment"),
-                "HINE": ("patients", "HINEAssessment"),
-                "Attachment": ("patients", "Attachment"),
-                "DA": ("patients", "DevelopmentalAssessment"),
-                "CDICR": ("patients", "CDICRecord"),
-            }
-
-            if self.bookmark_type in model_mapping:
-                app_label, model_name = model_mapping[self.bookmark_type]
-                model_class = apps.get_model(app_label, model_name)
+            model_class = self.target_model(self.bookmark_type)
+            if model_class is not None:
                 return model_class.objects.get(pk=self.object_id)
 
         except Exception:
@@ -1892,6 +1871,71 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
         return None
 
     # Class methods for efficient queries
+    @classmethod
+    def target_model(cls, bookmark_type):
+        """Model class a bookmark type points at, or None"""
+        from django.apps import apps
+
+        if bookmark_type not in cls.TARGET_MODELS:
+            return None
+        return apps.get_model(*cls.TARGET_MODELS[bookmark_type])
+
+    @classmethod
+    def resolve_objects(cls, bookmarks):
+        """
+        Load the bookmarked objects for many bookmarks at once, with one
+        in_bulk query per bookmark type, and cache them on each bookmark.
+        """
+        bookmarks = list(bookmarks)
+        ids_by_type = defaultdict(set)
+        for bookmark in bookmarks:
+            if bookmark.bookmark_type in cls.TARGET_MODELS:
+                ids_by_type[bookmark.bookmark_type].add(bookmark.object_id)
+
+        objects = {}
+        for bookmark_type, ids in ids_by_type.items():
+            model_class = cls.target_model(bookmark_type)
+            queryset = model_class.objects.all()
+            # Assessment titles include the patient name
+            if any(field.name == "patient" for field in model_class._meta.fields):
+                queryset = queryset.select_related("patient")
+            objects[bookmark_type] = queryset.in_bulk(ids)
+        for bookmark in bookmarks:
+            bookmark._bookmarked_object = objects.get(bookmark.bookmark_type, {}).get(
+                bookmark.object_id
+            )
+        return bookmarks
+
+    @classmethod
+    def annotate_bookmark_ids(cls, queryset, bookmark_type, user=None):
+        """
+        Annotate a queryset of bookmarkable objects with ``bookmark_pk``, the id
+        of the latest matching bookmark (of ``user`` when given) or None.
+
+        The ``is_bookmarked``/``isBookmarked`` properties read the annotation
+        instead of querying once per row.
+        """
+        bookmarks = cls.objects.filter(
+            bookmark_type=bookmark_type, object_id=OuterRef("pk")
+        )
+        if user is not None:
+            bookmarks = bookmarks.filter(owner=user)
+        return queryset.annotate(
+            bookmark_pk=Subquery(bookmarks.order_by("-id").values("id")[:1])
+        )
+
+    @classmethod
+    def from_annotation(cls, instance, bookmark_type):
+        """
+        Bookmark for a row loaded through annotate_bookmark_ids. Only the id
+        is loaded, which is all list pages need to link to the bookmark.
+        """
+        if instance.bookmark_pk is None:
+            return None
+        return cls(
+            pk=instance.bookmark_pk, bookmark_type=bookmark_type, object_id=instance.pk
+        )
+
     @classmethod
     def get_by_user(cls, user, bookmark_type=None):
         """Get bookmarks for a specific user"""
@@ -1962,22 +2006,22 @@ class Bookmark(TimeStampedModel, UserTrackingMixin):
     @classmethod
     def get_bookmark_stats(cls, user=None):
         """Get bookmark statistics"""
-        from django.db.models import Count
-
         queryset = cls.objects.all()
         if user:
             queryset = queryset.filter(owner=user)
 
-        stats = (
-            queryset.values("bookmark_type")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-        )
+        stats = BOOKMARK_STATS.compute(queryset)
+        by_type = [
+            {"bookmark_type": value, "count": stats[f"type_{value}"]}
+            for value, _label in BOOKMARK_TYPE
+            if stats[f"type_{value}"]
+        ]
+        by_type.sort(key=lambda row: -row["count"])
 
         return {
-            "total": queryset.count(),
-            "by_type": list(stats),
-            "public_count": queryset.filter(is_public=True).count(),
+            "total": stats["total"],
+            "by_type": by_type,
+            "public_count": stats["public"],
         }
 
 
@@ -2071,7 +2115,9 @@ class Help(TimeStampedModel, UserTrackingMixin):
             )
 
 
-class HINEAssessment(TimeStampedModel, UserTrackingMixin):
+class HINEAssessment(
+    TimeStampedModel, UserTrackingMixin, AssessmentAgeMixin, CountedRecordMixin
+):
 
     patient = models.ForeignKey(
         Patient,
@@ -2113,6 +2159,7 @@ class HINEAssessment(TimeStampedModel, UserTrackingMixin):
         verbose_name_plural = _("HINE Assessments")
         indexes = [
             models.Index(fields=["patient", "-date_of_assessment"]),
+            models.Index(fields=["patient", "score"]),
             models.Index(fields=["score", "date_of_assessment"]),
             models.Index(fields=["assessment_done_by"]),
         ]
@@ -2151,23 +2198,17 @@ class HINEAssessment(TimeStampedModel, UserTrackingMixin):
         if not self.date_of_assessment or not self.patient.dob_tob:
             return "Unknown"
 
-        age_in_days = (self.date_of_assessment - self.patient.dob_tob).days
-        months, days = divmod(age_in_days, 30)
-        return f"{months} months and {days} days"
+        years, months, days = age_ymd(self.patient.dob_tob, self.date_of_assessment)
+        return f"{int(years * 12 + months)} months and {int(days)} days"
 
     @property
     def is_bookmarked(self):
-        """Check if this assessment is bookmarked"""
+        """The bookmark of this assessment, if any"""
         if not hasattr(self, "pk") or not self.pk:
-            return False
-        try:
-            from .models import Bookmark  # Avoid circular import
-
-            return Bookmark.objects.filter(
-                bookmark_type="HINE", object_id=self.pk
-            ).exists()
-        except ImportError:
-            return False
+            return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "HINE")
+        return Bookmark.objects.filter(bookmark_type="HINE", object_id=self.pk).first()
 
     @property
     def is_normal(self):
@@ -2187,7 +2228,9 @@ class HINEAssessment(TimeStampedModel, UserTrackingMixin):
             return "Severe Abnormality"
 
 
-class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
+class DevelopmentalAssessment(
+    TimeStampedModel, UserTrackingMixin, AssessmentAgeMixin, CountedRecordMixin
+):
 
     patient = models.ForeignKey(
         Patient,
@@ -2331,6 +2374,7 @@ class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
         verbose_name_plural = _("Developmental Assessments")
         indexes = [
             models.Index(fields=["patient", "-date_of_assessment"]),
+            models.Index(fields=["patient", "is_dx_normal"]),
             models.Index(fields=["is_dx_normal", "date_of_assessment"]),
             models.Index(fields=["assessment_done_by"]),
         ]
@@ -2392,9 +2436,8 @@ class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
         if not self.date_of_assessment or not self.patient.dob_tob:
             return "Unknown"
 
-        age_in_days = (self.date_of_assessment - self.patient.dob_tob).days
-        months, days = divmod(age_in_days, 30)
-        return f"{months} months and {days} days"
+        years, months, days = age_ymd(self.patient.dob_tob, self.date_of_assessment)
+        return f"{int(years * 12 + months)} months and {int(days)} days"
 
     @property
     def is_normal(self):
@@ -2402,8 +2445,8 @@ class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
         if not self.date_of_assessment or not self.patient.dob_tob:
             return False
 
-        age_in_days = (self.date_of_assessment - self.patient.dob_tob).days
-        age_in_months, _ = divmod(age_in_days, 30)
+        years, months, _days = age_ymd(self.patient.dob_tob, self.date_of_assessment)
+        age_in_months = years * 12 + months
 
         # Check each domain against patient's actual age
         domains = [
@@ -2422,17 +2465,12 @@ class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
 
     @property
     def is_bookmarked(self):
-        """Check if this assessment is bookmarked"""
+        """The bookmark of this assessment, if any"""
         if not hasattr(self, "pk") or not self.pk:
-            return False
-        try:
-            from .models import Bookmark  # Avoid circular import
-
-            return Bookmark.objects.filter(
-                bookmark_type="DA", object_id=self.pk
-            ).exists()
-        except ImportError:
-            return False
+            return None
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "DA")
+        return Bookmark.objects.filter(bookmark_type="DA", object_id=self.pk).first()
 
     @property
     def developmental_summary(self):
@@ -2469,3 +2507,407 @@ class DevelopmentalAssessment(TimeStampedModel, UserTrackingMixin):
         """Override save to automatically update is_dx_normal"""
         self.is_dx_normal = self.is_normal
         super().save(*args, **kwargs)
+
+
+class PatientClinicalStatus(TimeStampedModel):
+    """
+    Denormalized snapshot of a patient's latest assessment outcomes.
+
+    One row per patient, rebuilt from the GMA, HINE, DA and CDIC tables whenever
+    one of those records is written (see patients.signals), so list and detail
+    pages can read the patient's status without querying every assessment table.
+    """
+
+    patient = models.OneToOneField(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="clinical_status",
+        verbose_name=_("Patient"),
+        help_text=_("Patient this status snapshot belongs to"),
+    )
+
+    # Latest General Movement Assessment
+    latest_gma = models.ForeignKey(
+        GMAssessment,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        verbose_name=_("Latest GMA"),
+        help_text=_("Most recent GM assessment of the patient"),
+    )
+    latest_gma_is_normal = models.BooleanField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_("Latest GMA Normal"),
+        help_text=_("Whether the most recent GM assessment concluded normal"),
+    )
+    latest_gma_diagnoses = models.TextField(
+        blank=True,
+        default="",
+        verbose_name=_("Latest GMA Diagnoses"),
+        help_text=_("Comma-separated diagnosis titles of the most recent GMA"),
+    )
+
+    # Latest HINE assessment
+    latest_hine = models.ForeignKey(
+        HINEAssessment,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        verbose_name=_("Latest HINE"),
+        help_text=_("Most recent HINE assessment of the patient"),
+    )
+    latest_hine_score = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Latest HINE Score"),
+        help_text=_("Score of the most recent HINE assessment"),
+    )
+    latest_hine_is_normal = models.BooleanField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_("Latest HINE Normal"),
+        help_text=_("Whether the most recent HINE score is above 73"),
+    )
+
+    # Latest developmental assessment
+    latest_da = models.ForeignKey(
+        DevelopmentalAssessment,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        verbose_name=_("Latest DA"),
+        help_text=_("Most recent developmental assessment of the patient"),
+    )
+    latest_da_is_normal = models.BooleanField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_("Latest DA Normal"),
+        help_text=_("Whether the most recent developmental assessment is normal"),
+    )
+
+    # Latest CDIC record and discharge state
+    latest_cdic = models.ForeignKey(
+        CDICRecord,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        verbose_name=_("Latest CDIC Record"),
+        help_text=_("Most recent CDIC record of the patient"),
+    )
+    is_discharged = models.BooleanField(
+        default=False,
+        db_index=True,
+        verbose_name=_("Is Discharged"),
+        help_text=_("Whether the most recent CDIC record discharged the patient"),
+    )
+
+    class Meta:
+        verbose_name = _("Patient Clinical Status")
+        verbose_name_plural = _("Patient Clinical Statuses")
+
+    def __str__(self):
+        return f"Clinical status | {self.patient_id}"
+
+    @classmethod
+    def compute_for_patient(cls, patient_id):
+        """Compute the status field values from the assessment tables"""
+        latest_gma = (
+            GMAssessment.objects.filter(patient_id=patient_id)
+            .only("id", "diagnosis_conclusion")
+            .order_by("-id")
+            .first()
+        )
+        latest_hine = (
+            HINEAssessment.objects.filter(patient_id=patient_id)
+            .only("id", "score")
+            .order_by("-id")
+            .first()
+        )
+        latest_da = (
+            DevelopmentalAssessment.objects.filter(patient_id=patient_id)
+            .only("id", "is_dx_normal")
+            .order_by("-id")
+            .first()
+        )
+        latest_cdic = (
+            CDICRecord.objects.filter(patient_id=patient_id)
+            .only("id", "is_discharged")
+            .order_by("-id")
+            .first()
+        )
+
+        gma_diagnoses = ""
+        if latest_gma is not None:
+            gma_diagnoses = ", ".join(
+                latest_gma.diagnosis.values_list("title", flat=True)
+            )
+
+        return {
+            "latest_gma": latest_gma,
+            "latest_gma_is_normal": (
+                latest_gma.is_diagnosis_normal if latest_gma else None
+            ),
+            "latest_gma_diagnoses": gma_diagnoses,
+            "latest_hine": latest_hine,
+            "latest_hine_score": latest_hine.score if latest_hine else None,
+            "latest_hine_is_normal": latest_hine.is_normal if latest_hine else None,
+            "latest_da": latest_da,
+            "latest_da_is_normal": latest_da.is_dx_normal if latest_da else None,
+            "latest_cdic": latest_cdic,
+            "is_discharged": latest_cdic.is_discharged if latest_cdic else False,
+        }
+
+    @classmethod
+    def refresh_for_patient(cls, patient_id, create=True):
+        """
+        Rebuild the status row of a patient.
+
+        With create=False only an existing row is updated; this is used from
+        delete hooks, where the patient itself may be in the middle of a
+        cascading delete and must not get a new row.
+        """
+        values = cls.compute_for_patient(patient_id)
+        if not create:
+            values["updated_at"] = timezone.now()
+            cls.objects.filter(patient_id=patient_id).update(**values)
+            return None
+
+        status, _created = cls.objects.update_or_create(
+            patient_id=patient_id, defaults=values
+        )
+        return status
+
+
+class PatientRecommendation(TimeStampedModel):
+    """
+    Stored result of one follow-up rule for one patient.
+
+    Rows are kept up to date by patients.recommendations.refresh_recommendations,
+    which runs on assessment writes and nightly for the age-driven rules.
+    """
+
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        verbose_name=_("Patient"),
+        help_text=_("Patient this recommendation belongs to"),
+    )
+    rule_id = models.CharField(
+        max_length=20,
+        choices=RECOMMENDATION_RULES,
+        verbose_name=_("Rule"),
+        help_text=_("Recommendation rule that produced this row"),
+    )
+    message = models.TextField(
+        verbose_name=_("Message"),
+        help_text=_("Recommendation shown to the clinician"),
+    )
+    is_due = models.BooleanField(
+        default=False,
+        verbose_name=_("Is Due"),
+        help_text=_("Whether the recommended action is currently due"),
+    )
+    computed_at = models.DateTimeField(
+        verbose_name=_("Computed At"),
+        help_text=_("When the rule was last evaluated for this patient"),
+    )
+
+    class Meta:
+        verbose_name = _("Patient Recommendation")
+        verbose_name_plural = _("Patient Recommendations")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["patient", "rule_id"], name="recommendation_patient_rule_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["is_due", "rule_id"], name="recommendation_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.rule_id} | {self.patient_id}"
+
+
+class DailyActivityRollup(TimeStampedModel):
+    """
+    Pre-aggregated daily counts per MOH area for trend charts and reports.
+
+    Rows are maintained from write hooks (see patients.rollups) and can be
+    rebuilt from the fact tables with the rebuild_rollups command.
+    """
+
+    day = models.DateField(
+        verbose_name=_("Day"),
+        help_text=_("Calendar day the counts belong to"),
+    )
+    moh_area = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        verbose_name=_("MOH Area"),
+        help_text=_("Patient MOH area, empty when not recorded"),
+    )
+    births = models.PositiveIntegerField(default=0, verbose_name=_("Births"))
+    admissions = models.PositiveIntegerField(default=0, verbose_name=_("Admissions"))
+    gma_normal = models.PositiveIntegerField(default=0, verbose_name=_("GMA Normal"))
+    gma_abnormal = models.PositiveIntegerField(
+        default=0, verbose_name=_("GMA Abnormal")
+    )
+    hine_normal = models.PositiveIntegerField(default=0, verbose_name=_("HINE Normal"))
+    hine_abnormal = models.PositiveIntegerField(
+        default=0, verbose_name=_("HINE Abnormal")
+    )
+    da_normal = models.PositiveIntegerField(default=0, verbose_name=_("DA Normal"))
+    da_abnormal = models.PositiveIntegerField(default=0, verbose_name=_("DA Abnormal"))
+    discharges = models.PositiveIntegerField(default=0, verbose_name=_("Discharges"))
+
+    class Meta:
+        verbose_name = _("Daily Activity Rollup")
+        verbose_name_plural = _("Daily Activity Rollups")
+        ordering = ["day", "moh_area"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "moh_area"], name="rollup_day_area_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["moh_area", "day"], name="rollup_area_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} | {self.moh_area or '-'}"
+
+
+class SearchDocument(TimeStampedModel):
+    """
+    One searchable document per patient, video, assessment, attachment or
+    bookmark, filled from the model signals (see patients.search_documents).
+    """
+
+    entity_type = models.CharField(
+        max_length=20,
+        choices=SEARCH_ENTITY_TYPE,
+        verbose_name=_("Entity Type"),
+        help_text=_("Kind of record the document describes"),
+    )
+    entity_id = models.PositiveIntegerField(
+        verbose_name=_("Entity ID"),
+        help_text=_("ID of the described record"),
+    )
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="search_documents",
+        null=True,
+        blank=True,
+        verbose_name=_("Patient"),
+        help_text=_("Patient the record belongs to, if any"),
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name=_("Title"),
+        help_text=_("Headline shown for a search hit"),
+    )
+    body = models.TextField(
+        blank=True,
+        verbose_name=_("Body"),
+        help_text=_("Searchable text of the record"),
+    )
+    date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Date"),
+        help_text=_("Date the record refers to (recording, assessment, birth)"),
+    )
+
+    class Meta:
+        verbose_name = _("Search Document")
+        verbose_name_plural = _("Search Documents")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["entity_type", "entity_id"], name="searchdoc_entity_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["entity_type", "date"], name="searchdoc_type_date_idx"),
+            models.Index(fields=["date"], name="searchdoc_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type} #{self.entity_id} | {self.title}"
+
+
+class PatientIdentifier(models.Model):
+    """
+    Normalized copy of a patient's BHT/NNC/PTC/PC/PIN numbers, so any typed
+    identifier resolves with one indexed lookup (see patients.identifiers).
+    """
+
+    kind = models.CharField(
+        max_length=3,
+        choices=IDENTIFIER_KIND,
+        verbose_name=_("Kind"),
+        help_text=_("Which patient number this is"),
+    )
+    normalized_value = models.CharField(
+        max_length=20,
+        verbose_name=_("Normalized Value"),
+        help_text=_("Upper-cased identifier without spaces or separators"),
+    )
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="identifiers",
+        verbose_name=_("Patient"),
+    )
+
+    class Meta:
+        verbose_name = _("Patient Identifier")
+        verbose_name_plural = _("Patient Identifiers")
+        indexes = [
+            models.Index(
+                fields=["normalized_value", "kind"], name="patient_ident_value_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.normalized_value}"
+
+
+class PatientSearchKey(models.Model):
+    """
+    Normalized prefix keys for patient autocomplete: every word-start of the
+    baby's and mother's names plus each identifier, lower-cased and without
+    accents (see patients.autocomplete).
+    """
+
+    key = models.CharField(
+        max_length=100,
+        verbose_name=_("Key"),
+        help_text=_("Normalized name suffix or identifier"),
+    )
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name="search_keys",
+        verbose_name=_("Patient"),
+    )
+
+    class Meta:
+        verbose_name = _("Patient Search Key")
+        verbose_name_plural = _("Patient Search Keys")
+        indexes = [
+            models.Index(fields=["key", "patient"], name="patient_search_key_idx"),
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,182 @@
+"""
+Follow-up recommendation rules and the batch engine that stores them.
+
+The rules are the ones shown on the patient summary (``Patient.getRC``). The
+batch engine evaluates them for many patients with a handful of set-based
+queries per chunk and keeps the results in ``PatientRecommendation`` so the
+clinic worklist can be served without recomputing anything.
+"""
+
+from django.apps import apps
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ndas.custom_codes.ages import age_ymd, completed_months
+from patients.cohorts import HINE_ABNORMAL_BELOW, LATEST, discharged
+
+GMA_FIRST_WRITHING = "GMA_FIRST_WM"
+GMA_FIRST_FIDGETY = "GMA_FIRST_FM"
+GMA_SECOND = "GMA_SECOND"
+HINE_DUE = "HINE_DUE"
+MDT_REFERRAL = "MDT_REFERRAL"
+
+# Rules in the order they are displayed
+RULE_IDS = (
+    GMA_FIRST_WRITHING,
+    GMA_FIRST_FIDGETY,
+    GMA_SECOND,
+    HINE_DUE,
+    MDT_REFERRAL,
+)
+
+RULE_MESSAGES = {
+    GMA_FIRST_WRITHING: "Please perform the initial General Movement Assessment (GMA) to assess writhing movements.",
+    GMA_FIRST_FIDGETY: "Please perform the initial General Movement Assessment (GMA) to assess and identify fidget movements.",
+    GMA_SECOND: "Please perform the second (2nd) General Movement Assessment (GMA) to assess and identify fidget movements.",
+    HINE_DUE: "It is time to perform the HINE (Hammersmith Infant Neurological Examination).",
+    MDT_REFERRAL: "Screening positive. Please refer baby to the Multidisciplinary Team (MDT) at the Child Development and Intervention Center/ Clinic (CDIC)",
+}
+
+
+def age_in_months(dob, today=None):
+    """Completed calendar months between the date of birth and today"""
+    years, months, _days = age_ymd(dob, today)
+    return int(years * 12 + months)
+
+
+def evaluate_rules(gma_count, age_months, last_gma_normal, last_hine_score):
+    """
+    Return a {rule_id: due} mapping.
+
+    ``last_hine_score`` is 0 when the patient has no HINE assessment, matching
+    the behaviour of the patient summary.
+    """
+    return {
+        GMA_FIRST_WRITHING: gma_count == 0 and age_months <= 2,
+        GMA_FIRST_FIDGETY: gma_count == 0 and age_months > 2,
+        GMA_SECOND: gma_count == 1 and age_months > 2,
+        HINE_DUE: 4 <= age_months <= 6 and gma_count == 2,
+        MDT_REFERRAL: last_gma_normal is False
+        and last_hine_score < HINE_ABNORMAL_BELOW,
+    }
+
+
+def _patient_rule_inputs(patient_ids=None):
+    """Patients annotated with everything the rules need, in a single query"""
+    Patient = apps.get_model("patients", "Patient")
+    GMAssessment = apps.get_model("patients", "GMAssessment")
+    HINEAssessment = apps.get_model("patients", "HINEAssessment")
+
+    gma_count = (
+        GMAssessment.objects.filter(patient=OuterRef("pk"))
+        .order_by()
+        .values("patient")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+
+    patients = Patient.objects.order_by("id")
+    if patient_ids is not None:
+        patients = patients.filter(id__in=patient_ids)
+
+    return patients.annotate(
+        rc_gma_count=Coalesce(Subquery(gma_count), 0),
+        rc_latest_gma_conclusion=Subquery(
+            GMAssessment.objects.filter(patient=OuterRef("pk"))
+            .order_by("-id")
+            .values("diagnosis_conclusion")[:1]
+        ),
+        rc_latest_hine_score=Subquery(
+            HINEAssessment.objects.filter(patient=OuterRef("pk"))
+            .order_by("-id")
+            .values("score")[:1]
+        ),
+        rc_is_discharged=discharged(LATEST),
+    ).values_list(
+        "id",
+        "dob_tob",
+        "rc_gma_count",
+        "rc_latest_gma_conclusion",
+        "rc_latest_hine_score",
+        "rc_is_discharged",
+    )
+
+
+def _store_chunk(rows, computed_at, create):
+    PatientRecommendation = apps.get_model("patients", "PatientRecommendation")
+    today = computed_at.date()
+
+    existing = {
+        (rec.patient_id, rec.rule_id): rec
+        for rec in PatientRecommendation.objects.filter(
+            patient_id__in=[row[0] for row in rows]
+        )
+    }
+
+    ages = completed_months([row[1] for row in rows], [today] * len(rows))
+
+    to_update, to_create = [], []
+    for row, age_months in zip(rows, ages):
+        patient_id, _dob, gma_count, gma_conclusion, hine_score, is_discharged = row
+        if is_discharged:
+            due = dict.fromkeys(RULE_IDS, False)
+        else:
+            due = evaluate_rules(
+                gma_count,
+                int(age_months),
+                None if gma_conclusion is None else gma_conclusion == "NORMAL",
+                hine_score or 0,
+            )
+
+        for rule_id in RULE_IDS:
+            rec = existing.get((patient_id, rule_id))
+            if rec is None:
+                if create:
+                    to_create.append(
+                        PatientRecommendation(
+                            patient_id=patient_id,
+                            rule_id=rule_id,
+                            message=RULE_MESSAGES[rule_id],
+                            is_due=due[rule_id],
+                            computed_at=computed_at,
+                        )
+                    )
+                continue
+            rec.message = RULE_MESSAGES[rule_id]
+            rec.is_due = due[rule_id]
+            rec.computed_at = computed_at
+            rec.updated_at = computed_at
+            to_update.append(rec)
+
+    if to_update:
+        PatientRecommendation.objects.bulk_update(
+            to_update, ["message", "is_due", "computed_at", "updated_at"]
+        )
+    if to_create:
+        PatientRecommendation.objects.bulk_create(to_create)
+
+
+def refresh_recommendations(patient_ids=None, create=True, chunk_size=1000):
+    """
+    Re-evaluate the rules and store the results.
+
+    Pass ``patient_ids`` to refresh only those patients. With create=False
+    only existing rows are updated; this is used from delete hooks, where the
+    patient may be in the middle of a cascading delete.
+
+    Returns the number of patients processed.
+    """
+    computed_at = timezone.now()
+    total = 0
+    chunk = []
+    for row in _patient_rule_inputs(patient_ids).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _store_chunk(chunk, computed_at, create)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        _store_chunk(chunk, computed_at, create)
+        total += len(chunk)
+    return total
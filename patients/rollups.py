@@ -0,0 +1,265 @@
+"""
+Daily activity rollups by MOH area.
+
+``DailyActivityRollup`` holds one row per (day, MOH area) with the number of
+births, admissions, assessment outcomes and discharges. Charts and period
+reports read these rows instead of scanning the fact tables.
+
+Rows are kept current by recomputing only the (day, area) buckets touched by a
+write (see patients.signals), and the whole table, or a date range of it, can be
+rebuilt with ``rebuild_rollups``.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncYear
+from django.utils import timezone
+
+from patients.cohorts import HINE_ABNORMAL_BELOW
+
+MEASURES = (
+    "births",
+    "admissions",
+    "gma_normal",
+    "gma_abnormal",
+    "hine_normal",
+    "hine_abnormal",
+    "da_normal",
+    "da_abnormal",
+    "discharges",
+)
+
+
+def _model(name):
+    return apps.get_model("patients", name)
+
+
+def _day_of(value):
+    """Calendar day of a date or datetime, in the current time zone"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min)
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    return start, start + timedelta(days=1)
+
+
+def _datetime_days_q(field, days):
+    query = Q()
+    for day in days:
+        start, end = _day_bounds(day)
+        query |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return query
+
+
+def _sources():
+    """
+    (queryset, day expression, area expression, days filter, measures) for
+    every fact table that feeds the rollup.
+    """
+    Patient = _model("Patient")
+    patient_area = Coalesce("moh_area", Value(""))
+    assessment_area = Coalesce("patient__moh_area", Value(""))
+
+    return (
+        (
+            Patient.objects.all(),
+            TruncDate("dob_tob"),
+            patient_area,
+            lambda days: _datetime_days_q("dob_tob", days),
+            {"births": Count("id")},
+        ),
+        (
+            Patient.objects.filter(do_admission__isnull=False),
+            TruncDate("do_admission"),
+            patient_area,
+            lambda days: _datetime_days_q("do_admission", days),
+            {"admissions": Count("id")},
+        ),
+        (
+            _model("GMAssessment").objects.all(),
+            TruncDate("date_of_assessment"),
+            assessment_area,
+            lambda days: _datetime_days_q("date_of_assessment", days),
+            {
+                "gma_normal": Count("id", filter=Q(diagnosis_conclusion="NORMAL")),
+                "gma_abnormal": Count("id", filter=Q(diagnosis_conclusion="ABNORMAL")),
+            },
+        ),
+        (
+            _model("HINEAssessment").objects.all(),
+            TruncDate("date_of_assessment"),
+            assessment_area,
+            lambda days: _datetime_days_q("date_of_assessment", days),
+            {
+                "hine_normal": Count("id", filter=Q(score__gte=HINE_ABNORMAL_BELOW)),
+                "hine_abnormal": Count("id", filter=Q(score__lt=HINE_ABNORMAL_BELOW)),
+            },
+        ),
+        (
+            _model("DevelopmentalAssessment").objects.all(),
+            TruncDate("date_of_assessment"),
+            assessment_area,
+            lambda days: _datetime_days_q("date_of_assessment", days),
+            {
+                "da_normal": Count("id", filter=Q(is_dx_normal=True)),
+                "da_abnormal": Count("id", filter=Q(is_dx_normal=False)),
+            },
+        ),
+        (
+            _model("CDICRecord").objects.filter(is_discharged=True),
+            Coalesce("discharge_date", "assessment_date"),
+            assessment_area,
+            lambda days: Q(discharge_date__in=days)
+            | Q(discharge_date__isnull=True, assessment_date__in=days),
+            {"discharges": Count("id")},
+        ),
+    )
+
+
+def _collect(days=None, start=None, end=None):
+    """Aggregate all sources into {(day, area): {measure: count}}"""
+    buckets = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for queryset, day_expr, area_expr, days_q, measures in _sources():
+        if days is not None:
+            queryset = queryset.filter(days_q(days))
+        rows = queryset.annotate(rollup_day=day_expr, rollup_area=area_expr)
+        if start is not None:
+            rows = rows.filter(rollup_day__gte=start)
+        if end is not None:
+            rows = rows.filter(rollup_day__lte=end)
+        rows = (
+            rows.order_by()
+            .values("rollup_day", "rollup_area")
+            .annotate(**measures)
+        )
+        for row in rows:
+            if row["rollup_day"] is None:
+                continue
+            bucket = buckets[(row["rollup_day"], row["rollup_area"])]
+            for measure in measures:
+                bucket[measure] += row[measure]
+    return buckets
+
+
+def rebuild_rollups(start=None, end=None):
+    """
+    Recompute the rollup rows between two dates (inclusive), or the whole
+    table when no dates are given. Returns the number of rows written.
+    """
+    DailyActivityRollup = _model("DailyActivityRollup")
+    buckets = _collect(start=start, end=end)
+
+    existing = DailyActivityRollup.objects.all()
+    if start is not None:
+        existing = existing.filter(day__gte=start)
+    if end is not None:
+        existing = existing.filter(day__lte=end)
+
+    rows = [
+        DailyActivityRollup(day=day, moh_area=area, **counts)
+        for (day, area), counts in buckets.items()
+        if any(counts.values())
+    ]
+    with transaction.atomic():
+        existing.delete()
+        DailyActivityRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_buckets(buckets):
+    """Recompute the given (day, moh_area) rollup rows from the fact tables"""
+    buckets = {(day, area or "") for day, area in buckets if day is not None}
+    if not buckets:
+        return
+    DailyActivityRollup = _model("DailyActivityRollup")
+    counts = _collect(days=sorted({day for day, _area in buckets}))
+
+    with transaction.atomic():
+        for day, area in buckets:
+            values = counts.get((day, area))
+            if values and any(values.values()):
+                DailyActivityRollup.objects.update_or_create(
+                    day=day, moh_area=area, defaults=values
+                )
+            else:
+                DailyActivityRollup.objects.filter(day=day, moh_area=area).delete()
+
+
+def patient_buckets(patient, area=None):
+    """Buckets fed by the patient row itself (birth and admission days)"""
+    area = patient.moh_area if area is None else area
+    return {
+        (_day_of(patient.dob_tob), area or ""),
+        (_day_of(patient.do_admission), area or ""),
+    }
+
+
+def patient_activity_buckets(patient_id, areas):
+    """Every bucket that any record of the patient falls in, for each area"""
+    Patient = _model("Patient")
+    days = set()
+    patient = Patient.objects.filter(pk=patient_id).values("dob_tob", "do_admission")
+    for row in patient:
+        days.update({_day_of(row["dob_tob"]), _day_of(row["do_admission"])})
+    for name in ("GMAssessment", "HINEAssessment", "DevelopmentalAssessment"):
+        days.update(
+            _day_of(value)
+            for value in _model(name)
+            .objects.filter(patient_id=patient_id)
+            .values_list("date_of_assessment", flat=True)
+        )
+    for discharge_date, assessment_date in (
+        _model("CDICRecord")
+        .objects.filter(patient_id=patient_id, is_discharged=True)
+        .values_list("discharge_date", "assessment_date")
+    ):
+        days.add(discharge_date or assessment_date)
+    return {(day, area or "") for day in days if day for area in areas}
+
+
+def record_buckets(record, area):
+    """Bucket fed by an assessment or CDIC record"""
+    if hasattr(record, "is_discharged"):
+        if not record.is_discharged:
+            return set()
+        return {(record.discharge_date or record.assessment_date, area or "")}
+    return {(_day_of(record.date_of_assessment), area or "")}
+
+
+def _period_rollups(trunc, start, end, moh_area):
+    rows = _model("DailyActivityRollup").objects.all()
+    if start is not None:
+        rows = rows.filter(day__gte=start)
+    if end is not None:
+        rows = rows.filter(day__lte=end)
+    if moh_area is not None:
+        rows = rows.filter(moh_area=moh_area)
+    return (
+        rows.annotate(period=trunc("day"))
+        .values("period")
+        .annotate(**{measure: Sum(measure) for measure in MEASURES})
+        .order_by("period")
+    )
+
+
+def monthly_rollups(start=None, end=None, moh_area=None):
+    """Rollup totals per month (``period``), oldest first"""
+    return _period_rollups(TruncMonth, start, end, moh_area)
+
+
+def yearly_rollups(start=None, end=None, moh_area=None):
+    """Rollup totals per year (``period``), oldest first, for multi-year trends"""
+    return _period_rollups(TruncYear, start, end, moh_area)
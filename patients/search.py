@@ -0,0 +1,302 @@
+"""
+Full-text patient search.
+
+Patient names, identifiers, areas, address and problems are kept in a
+full-text index next to the patient table:
+
+* SQLite: an FTS5 virtual table (``patients_patient_fts``) keyed by the
+  patient id, ranked with bm25.
+* PostgreSQL: ``patients_patient_search`` with a generated, weighted
+  ``tsvector`` column and a GIN index, ranked with ts_rank.
+
+The index is created by migration, kept in sync from the Patient save/delete
+signals and can be rebuilt with the ``rebuild_search_index`` command. On other
+databases, or when SQLite lacks FTS5, searches fall back to ``icontains``.
+"""
+
+import re
+
+from django.apps import apps
+from django.db import connection as default_connection
+from django.db.models import Q
+
+FTS_TABLE = "patients_patient_fts"
+PG_TABLE = "patients_patient_search"
+
+# Index column -> patient fields it is built from
+INDEX_COLUMNS = {
+    "baby_name": ("baby_name",),
+    "mother_name": ("mother_name",),
+    "identifiers": ("bht", "nnc_no", "ptc_no", "pc_no", "pin", "disk_no"),
+    "areas": ("moh_area", "phm_area"),
+    "address": ("address",),
+    "problems": ("problems",),
+}
+
+# bm25 weights (SQLite) and tsvector weights (PostgreSQL) per index column
+FTS_WEIGHTS = {
+    "baby_name": 10.0,
+    "mother_name": 8.0,
+    "identifiers": 6.0,
+    "areas": 2.0,
+    "address": 1.0,
+    "problems": 1.0,
+}
+PG_WEIGHTS = {
+    "baby_name": "A",
+    "mother_name": "A",
+    "identifiers": "B",
+    "areas": "C",
+    "address": "D",
+    "problems": "D",
+}
+
+MAX_TERMS = 8
+
+
+_fts5_support = {}
+
+
+def backend(connection=None):
+    """'fts5', 'postgresql' or None when full-text search is unavailable"""
+    connection = connection or default_connection
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite":
+        if connection.alias not in _fts5_support:
+            _fts5_support[connection.alias] = _sqlite_has_fts5(connection)
+        if _fts5_support[connection.alias]:
+            return "fts5"
+    return None
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Builds that load FTS5 as an extension do not report the option
+        cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+        return cursor.fetchone() is not None
+
+
+def _source_columns():
+    """SELECT list that builds every index column from patients_patient"""
+    columns = []
+    for fields in INDEX_COLUMNS.values():
+        parts = [f"COALESCE({field}, '')" for field in fields]
+        columns.append(" || ' ' || ".join(parts))
+    return ", ".join(columns)
+
+
+def create_index(connection=None):
+    """Create the index table for the current database, if supported"""
+    connection = connection or default_connection
+    kind = backend(connection)
+    column_names = ", ".join(INDEX_COLUMNS)
+    with connection.cursor() as cursor:
+        if kind == "fts5":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{column_names}, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif kind == "postgresql":
+            columns = ", ".join(f"{name} text NOT NULL" for name in INDEX_COLUMNS)
+            document = " || ".join(
+                f"setweight(to_tsvector('simple'::regconfig, {name}), "
+                f"'{PG_WEIGHTS[name]}')"
+                for name in INDEX_COLUMNS
+            )
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                f"patient_id bigint PRIMARY KEY, {columns}, "
+                f"document tsvector GENERATED ALWAYS AS ({document}) STORED)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_idx "
+                f"ON {PG_TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(connection=None):
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+
+def _write(patient_ids=None, connection=None):
+    connection = connection or default_connection
+    kind = backend(connection)
+    if kind is None:
+        return
+    table, key = (FTS_TABLE, "rowid") if kind == "fts5" else (PG_TABLE, "patient_id")
+    column_names = ", ".join(INDEX_COLUMNS)
+
+    delete, where, params = f"DELETE FROM {table}", "", []
+    if patient_ids is not None:
+        placeholders = ", ".join(["%s"] * len(patient_ids))
+        delete += f" WHERE {key} IN ({placeholders})"
+        where = f" WHERE id IN ({placeholders})"
+        params = list(patient_ids)
+
+    with connection.cursor() as cursor:
+        cursor.execute(delete, params)
+        cursor.execute(
+            f"INSERT INTO {table} ({key}, {column_names}) "
+            f"SELECT id, {_source_columns()} FROM patients_patient{where}",
+            params,
+        )
+
+
+def index_patients(patient_ids):
+    """Re-index the given patients (deleted ids are just removed)"""
+    patient_ids = list(patient_ids)
+    if patient_ids:
+        _write(patient_ids)
+
+
+def rebuild_index(connection=None):
+    """Create the index if needed and re-index every patient"""
+    create_index(connection)
+    _write(connection=connection)
+
+
+def search_terms(text):
+    """Lower-cased word tokens of a query, at most MAX_TERMS of them"""
+    return re.findall(r"\w+", (text or "").lower())[:MAX_TERMS]
+
+
+def fts5_query(terms, columns=None):
+    """FTS5 MATCH expression: every term as a prefix, optionally per column"""
+    query = " ".join(f'"{term}"*' for term in terms)
+    if columns:
+        query = "{" + " ".join(columns) + "} : (" + query + ")"
+    return query
+
+
+def tsquery_text(terms):
+    """to_tsquery() input: every term as a prefix"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+class PatientSearchResults:
+    """
+    Ranked full-text matches, best first. Supports ``count()`` and slicing, so
+    it can be handed straight to the Django Paginator; only the requested page
+    of patients is loaded. A filtered ``queryset`` restricts the matches in
+    SQL, so counts and pages agree with the rows returned.
+    """
+
+    def __init__(self, kind, terms, columns=None, queryset=None):
+        Patient = apps.get_model("patients", "Patient")
+        self.kind = kind
+        self.terms = terms
+        self.columns = tuple(columns or ())
+        self.queryset = queryset if queryset is not None else Patient.objects.all()
+        self._count = None
+
+    def _restrict(self, sql, params, id_column):
+        """Limit the matches to ``self.queryset`` when it is filtered"""
+        query = self.queryset.query
+        if not (query.where or query.low_mark or query.high_mark is not None):
+            return sql, params
+        ids = self.queryset.order_by().values("pk")
+        subquery, subparams = ids.query.sql_with_params()
+        return f"{sql} AND {id_column} IN ({subquery})", params + list(subparams)
+
+    def _match_sql(self):
+        if self.kind == "fts5":
+            weights = ", ".join(str(FTS_WEIGHTS[name]) for name in INDEX_COLUMNS)
+            sql, params = self._restrict(
+                f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [fts5_query(self.terms, self.columns)],
+                "rowid",
+            )
+            return sql, params, "score ASC, rowid DESC"
+
+        query = tsquery_text(self.terms)
+        sql = (
+            f"SELECT patient_id, ts_rank(document, to_tsquery('simple', %s)) AS score "
+            f"FROM {PG_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+        )
+        params = [query, query]
+        if self.columns:
+            restrict = " || ' ' || ".join(self.columns)
+            sql += f" AND to_tsvector('simple', {restrict}) @@ to_tsquery('simple', %s)"
+            params.append(query)
+        sql, params = self._restrict(sql, params, "patient_id")
+        return sql, params, "score DESC, patient_id DESC"
+
+    def count(self):
+        if self._count is None and self.queryset.query.is_empty():
+            self._count = 0
+        if self._count is None:
+            sql, params, _order = self._match_sql()
+            with default_connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM ({sql}) matches", params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def ranked_ids(self, offset=0, limit=None):
+        if self.queryset.query.is_empty():
+            return []
+        sql, params, order = self._match_sql()
+        if limit is None:
+            # "No limit" is LIMIT -1 on SQLite and LIMIT NULL on PostgreSQL
+            limit = -1 if self.kind == "fts5" else None
+        sql = f"{sql} ORDER BY {order} LIMIT %s OFFSET %s"
+        params = params + [limit, offset]
+        with default_connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            limit = None if key.stop is None else max(key.stop - start, 0)
+            ids = self.ranked_ids(start, limit)
+            patients = self.queryset.in_bulk(ids)
+            return [patients[pk] for pk in ids if pk in patients]
+        results = self[key : key + 1]
+        if not results:
+            raise IndexError(key)
+        return results[0]
+
+
+def search_patients(text, fields=None, queryset=None):
+    """
+    Search patients by free text.
+
+    ``fields`` restricts the match to some index columns (see INDEX_COLUMNS),
+    e.g. ``("baby_name",)``. Returns ranked PatientSearchResults, or a plain
+    ``icontains`` queryset when the database has no full-text support.
+    """
+    Patient = apps.get_model("patients", "Patient")
+    terms = search_terms(text)
+    kind = backend()
+    if queryset is None:
+        queryset = Patient.objects.all()
+    if not terms:
+        return queryset.none()
+    if kind is not None:
+        return PatientSearchResults(kind, terms, fields, queryset)
+
+    source_fields = [
+        field
+        for column in (fields or INDEX_COLUMNS)
+        for field in INDEX_COLUMNS[column]
+    ]
+    condition = Q()
+    for term in terms:
+        term_match = Q()
+        for field in source_fields:
+            term_match |= Q(**{f"{field}__icontains": term})
+        condition &= term_match
+    return queryset.filter(condition).order_by("baby_name", "-id")
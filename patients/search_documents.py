@@ -0,0 +1,508 @@
+"""
+Cross-entity search over patients, videos, assessments, attachments and
+bookmarks.
+
+Every record has one ``SearchDocument`` row (entity type, entity id, patient,
+title, body, date), written from the model signals. Records embed their
+patient's names and identifiers, so "perera video" finds the videos of baby
+Perera. The documents are full-text indexed the same way as the patient search
+(see patients.search): an external-content FTS5 table kept current by SQLite
+triggers, or a generated ``tsvector`` column with a GIN index on PostgreSQL.
+
+``search_everything`` returns the best hits of each entity type together with
+per-type facet counts from a single query.
+"""
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Count, Q
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import strip_tags
+
+from patients.search import backend, fts5_query, search_terms, tsquery_text
+
+DOCUMENT_TABLE = "patients_searchdocument"
+FTS_TABLE = "patients_searchdocument_fts"
+
+# entity_type -> (app_label, model_name)
+ENTITY_MODELS = {
+    "Patient": ("patients", "Patient"),
+    "Video": ("video", "Video"),
+    "GMA": ("patients", "GMAssessment"),
+    "HINE": ("patients", "HINEAssessment"),
+    "DA": ("patients", "DevelopmentalAssessment"),
+    "CDICR": ("patients", "CDICRecord"),
+    "Attachment": ("patients", "Attachment"),
+    "Bookmark": ("patients", "Bookmark"),
+}
+
+ENTITY_URLS = {
+    "Patient": "view-patient",
+    "Video": "video:view",
+    "GMA": "assessment-view",
+    "HINE": "hine-assessment-view",
+    "DA": "da-assessment-view",
+    "CDICR": "cdic-assessment-view",
+    "Attachment": "attachment-view",
+    "Bookmark": "bookmark-view",
+}
+
+
+# Index maintenance ----------------------------------------------------------
+
+
+def create_index(connection=None):
+    """Create the full-text index over the search documents, if supported"""
+    connection = connection or default_connection
+    kind = backend(connection)
+    with connection.cursor() as cursor:
+        if kind == "fts5":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"title, body, content='{DOCUMENT_TABLE}', content_rowid='id', "
+                f"tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+                f"AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+                f"VALUES (new.id, new.title, new.body); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+                f"AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+                f"VALUES ('delete', old.id, old.title, old.body); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+                f"AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) "
+                f"VALUES ('delete', old.id, old.title, old.body); "
+                f"INSERT INTO {FTS_TABLE}(rowid, title, body) "
+                f"VALUES (new.id, new.title, new.body); END"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif kind == "postgresql":
+            cursor.execute(
+                f"ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN IF NOT EXISTS document "
+                f"tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+                f"setweight(to_tsvector('simple'::regconfig, body), 'B')) STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {DOCUMENT_TABLE}_document_idx "
+                f"ON {DOCUMENT_TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(connection=None):
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"DROP INDEX IF EXISTS {DOCUMENT_TABLE}_document_idx")
+            cursor.execute(
+                f"ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS document"
+            )
+
+
+# Document builders ----------------------------------------------------------
+
+
+def _text(*parts):
+    return " ".join(strip_tags(str(part)) for part in parts if part)
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def _patient_text(patient):
+    if patient is None:
+        return ""
+    return _text(
+        patient.baby_name,
+        patient.mother_name,
+        patient.bht,
+        patient.nnc_no,
+        patient.pin,
+    )
+
+
+def _patient_document(patient):
+    return {
+        "patient_id": patient.pk,
+        "title": patient.baby_name or f"Patient #{patient.pk}",
+        "body": _text(
+            patient.mother_name,
+            patient.bht,
+            patient.nnc_no,
+            patient.ptc_no,
+            patient.pc_no,
+            patient.pin,
+            patient.disk_no,
+            patient.moh_area,
+            patient.phm_area,
+            patient.address,
+            patient.problems,
+        ),
+        "date": patient.dob_tob,
+    }
+
+
+def _video_document(video):
+    return {
+        "patient_id": video.patient_id,
+        "title": video.title or f"Video #{video.pk}",
+        "body": _text(video.description, _patient_text(video.patient)),
+        "date": video.recorded_on,
+    }
+
+
+def _gma_document(gma):
+    return {
+        "patient_id": gma.patient_id,
+        "title": _text("GMA", gma.diagnosis_conclusion),
+        "body": _text(
+            gma.diagnosis_other, gma.management_plan, _patient_text(gma.patient)
+        ),
+        "date": gma.date_of_assessment,
+    }
+
+
+def _hine_document(hine):
+    return {
+        "patient_id": hine.patient_id,
+        "title": _text("HINE score", hine.score),
+        "body": _text(
+            hine.comment, hine.assessment_done_by, _patient_text(hine.patient)
+        ),
+        "date": hine.date_of_assessment,
+    }
+
+
+def _da_document(da):
+    return {
+        "patient_id": da.patient_id,
+        "title": _text(
+            "Developmental assessment", "normal" if da.is_dx_normal else "abnormal"
+        ),
+        "body": _text(
+            da.gm_details,
+            da.fmv_details,
+            da.hsl_details,
+            da.seb_details,
+            da.comment,
+            da.assessment_done_by,
+            _patient_text(da.patient),
+        ),
+        "date": da.date_of_assessment,
+    }
+
+
+def _cdic_document(record):
+    return {
+        "patient_id": record.patient_id,
+        "title": _text("CDIC record", "discharged" if record.is_discharged else ""),
+        "body": _text(
+            record.assessment,
+            record.today_interventions,
+            record.next_appointment_plan,
+            record.discharge_plan,
+            record.assessment_done_by,
+            _patient_text(record.patient),
+        ),
+        "date": _as_datetime(record.assessment_date),
+    }
+
+
+def _attachment_document(attachment):
+    return {
+        "patient_id": attachment.patient_id,
+        "title": attachment.title or f"Attachment #{attachment.pk}",
+        "body": _text(
+            attachment.description,
+            attachment.original_filename,
+            attachment.attachment_type,
+            _patient_text(attachment.patient),
+        ),
+        "date": attachment.created_at,
+    }
+
+
+def _bookmark_document(bookmark):
+    return {
+        "patient_id": None,
+        "title": bookmark.title,
+        "body": _text(bookmark.description, bookmark.tags, bookmark.bookmark_type),
+        "date": bookmark.created_at,
+    }
+
+
+BUILDERS = {
+    "Patient": (_patient_document, ()),
+    "Video": (_video_document, ("patient",)),
+    "GMA": (_gma_document, ("patient",)),
+    "HINE": (_hine_document, ("patient",)),
+    "DA": (_da_document, ("patient",)),
+    "CDICR": (_cdic_document, ("patient",)),
+    "Attachment": (_attachment_document, ("patient",)),
+    "Bookmark": (_bookmark_document, ()),
+}
+
+
+def entity_model(entity_type):
+    return apps.get_model(*ENTITY_MODELS[entity_type])
+
+
+def entity_type_of(instance):
+    """The entity type of a model instance, or None when it is not indexed"""
+    label = (instance._meta.app_label, instance._meta.object_name)
+    for entity_type, model_label in ENTITY_MODELS.items():
+        if model_label == label:
+            return entity_type
+    return None
+
+
+def index_records(entity_type, ids=None, batch_size=500):
+    """
+    Write the search documents of the given records (all records when ``ids``
+    is None). Documents of records that no longer exist are removed.
+    Returns the number of documents written.
+    """
+    SearchDocument = apps.get_model("patients", "SearchDocument")
+    build, related = BUILDERS[entity_type]
+
+    model = entity_model(entity_type)
+    records = model.objects.select_related(*related).order_by("pk")
+    stale = SearchDocument.objects.filter(entity_type=entity_type).exclude(
+        entity_id__in=model.objects.values("pk")
+    )
+    if ids is not None:
+        ids = list(ids)
+        records = records.filter(pk__in=ids)
+        stale = stale.filter(entity_id__in=ids)
+    stale.delete()
+
+    written = 0
+    batch = []
+    for record in records.iterator(chunk_size=batch_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            written += _store(SearchDocument, entity_type, build, batch)
+            batch = []
+    if batch:
+        written += _store(SearchDocument, entity_type, build, batch)
+    return written
+
+
+def _store(SearchDocument, entity_type, build, records):
+    existing = {
+        document.entity_id: document
+        for document in SearchDocument.objects.filter(
+            entity_type=entity_type, entity_id__in=[record.pk for record in records]
+        )
+    }
+    to_create, to_update = [], []
+    now = timezone.now()
+    for record in records:
+        values = build(record)
+        values["title"] = values["title"][:255]
+        document = existing.get(record.pk)
+        if document is None:
+            to_create.append(
+                SearchDocument(entity_type=entity_type, entity_id=record.pk, **values)
+            )
+            continue
+        for field, value in values.items():
+            setattr(document, field, value)
+        document.updated_at = now
+        to_update.append(document)
+
+    if to_create:
+        SearchDocument.objects.bulk_create(to_create)
+    if to_update:
+        SearchDocument.objects.bulk_update(
+            to_update, ["patient", "title", "body", "date", "updated_at"]
+        )
+    return len(records)
+
+
+def remove_record(entity_type, entity_id):
+    apps.get_model("patients", "SearchDocument").objects.filter(
+        entity_type=entity_type, entity_id=entity_id
+    ).delete()
+
+
+def index_patient_records(patient_id):
+    """Re-index a patient and every record that embeds the patient's details"""
+    index_records("Patient", [patient_id])
+    for entity_type, (_build, related) in BUILDERS.items():
+        if "patient" not in related:
+            continue
+        ids = entity_model(entity_type).objects.filter(patient_id=patient_id)
+        index_records(entity_type, list(ids.values_list("pk", flat=True)))
+
+
+def rebuild_documents():
+    """Rebuild every search document and the full-text index. Returns totals."""
+    totals = {entity_type: index_records(entity_type) for entity_type in BUILDERS}
+    create_index()
+    return totals
+
+
+# Searching ------------------------------------------------------------------
+
+
+def _hit_url(entity_type, entity_id):
+    try:
+        return reverse(ENTITY_URLS[entity_type], args=[entity_id])
+    except NoReverseMatch:
+        return None
+
+
+def _db_datetime(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _hit(entity_type, entity_id, patient_id, title, date, score):
+    return {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "patient_id": patient_id,
+        "title": title,
+        "date": _db_datetime(date),
+        "score": score,
+        "url": _hit_url(entity_type, entity_id),
+    }
+
+
+def _date_bounds(date_from, date_to):
+    lower = _as_datetime(date_from) if date_from is not None else None
+    upper = _as_datetime(date_to) + timedelta(days=1) if date_to is not None else None
+    return lower, upper
+
+
+def search_everything(
+    text, entity_type=None, date_from=None, date_to=None, per_type=5, offset=0
+):
+    """
+    Search all entity types at once.
+
+    Returns ``{"facets": {entity_type: total}, "groups": {entity_type: [hit]}}``.
+    Each group holds ``per_type`` hits, best first, starting at ``offset``
+    within the type; each hit is a dict with entity_type, entity_id,
+    patient_id, title, date, score and url. With ``entity_type`` only that
+    group is filled, while the facets still count every type. ``date_from``
+    and ``date_to`` bound the document date (inclusive days).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return {"facets": {}, "groups": {}}
+    kind = backend()
+    if kind is None:
+        return _search_without_index(
+            terms, entity_type, date_from, date_to, per_type, offset
+        )
+
+    if kind == "fts5":
+        source = f"{FTS_TABLE} JOIN {DOCUMENT_TABLE} d ON d.id = {FTS_TABLE}.rowid"
+        score = f"bm25({FTS_TABLE}, 4.0, 1.0)"
+        conditions = [f"{FTS_TABLE} MATCH %s"]
+        params = [fts5_query(terms)]
+        order = "score ASC, date DESC"
+    else:
+        source = f"{DOCUMENT_TABLE} d"
+        score = "ts_rank(d.document, to_tsquery('simple', %s))"
+        conditions = ["d.document @@ to_tsquery('simple', %s)"]
+        params = [tsquery_text(terms)] * 2
+        order = "score DESC, date DESC"
+
+    lower, upper = _date_bounds(date_from, date_to)
+    if lower is not None:
+        conditions.append("d.date >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append("d.date < %s")
+        params.append(upper)
+
+    # The first hit of every type is always returned so the facet counts cover
+    # all types; the requested page of hits comes from the same query
+    page = "type_rank > %s AND type_rank <= %s"
+    params += [offset, offset + per_type]
+    if entity_type:
+        page += " AND entity_type = %s"
+        params.append(entity_type)
+
+    sql = (
+        f"WITH hits AS ("
+        f"SELECT d.entity_type, d.entity_id, d.patient_id, d.title, d.date, "
+        f"{score} AS score FROM {source} WHERE {' AND '.join(conditions)}), "
+        f"ranked AS (SELECT hits.*, "
+        f"COUNT(*) OVER (PARTITION BY entity_type) AS type_total, "
+        f"ROW_NUMBER() OVER (PARTITION BY entity_type ORDER BY {order}) AS type_rank "
+        f"FROM hits) "
+        f"SELECT entity_type, entity_id, patient_id, title, date, score, "
+        f"type_total, type_rank FROM ranked "
+        f"WHERE type_rank = 1 OR ({page}) ORDER BY entity_type, type_rank"
+    )
+    with default_connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = {"facets": {}, "groups": {}}
+    for *hit, type_total, type_rank in rows:
+        hit_type = hit[0]
+        results["facets"][hit_type] = type_total
+        if entity_type and hit_type != entity_type:
+            continue
+        if offset < type_rank <= offset + per_type:
+            results["groups"].setdefault(hit_type, []).append(_hit(*hit))
+    return results
+
+
+def _search_without_index(terms, entity_type, date_from, date_to, per_type, offset):
+    """icontains fallback for databases without full-text support"""
+    SearchDocument = apps.get_model("patients", "SearchDocument")
+    documents = SearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    lower, upper = _date_bounds(date_from, date_to)
+    if lower is not None:
+        documents = documents.filter(date__gte=lower)
+    if upper is not None:
+        documents = documents.filter(date__lt=upper)
+
+    facets = dict(
+        documents.order_by()
+        .values_list("entity_type")
+        .annotate(total=Count("id"))
+    )
+    groups = {}
+    for hit_type in facets:
+        if entity_type and hit_type != entity_type:
+            continue
+        page = documents.filter(entity_type=hit_type).order_by("-date", "-id")
+        groups[hit_type] = [
+            _hit(*row, None)
+            for row in page.values_list(
+                "entity_type", "entity_id", "patient_id", "title", "date"
+            )[offset : offset + per_type]
+        ]
+    return {"facets": facets, "groups": groups}
@@ -0,0 +1,457 @@
+"""
+Signal handlers that keep denormalized patient data in sync with the
+assessment tables.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from patients.models import (
+    Patient,
+    GMAssessment,
+    HINEAssessment,
+    DevelopmentalAssessment,
+    CDICRecord,
+    Attachment,
+    Bookmark,
+    PatientClinicalStatus,
+)
+from patients import autocomplete
+from patients.assessment_ages import refresh_assessment_ages
+from patients.counters import adjust, counter_field, set_assessed
+from patients.dashboard import DashboardSnapshot
+from patients.identifiers import invalidate, patient_identifiers, sync_patient
+from patients.recommendations import refresh_recommendations
+from patients.rollups import (
+    patient_activity_buckets,
+    patient_buckets,
+    record_buckets,
+    refresh_buckets,
+)
+from patients.search import index_patients
+from patients.search_documents import (
+    ENTITY_MODELS,
+    entity_model,
+    entity_type_of,
+    index_patient_records,
+    index_records,
+    remove_record,
+)
+from ndas.custom_codes import counts
+from users.models import CustomUser
+from video.models import Video
+
+CLINICAL_STATUS_SOURCES = (
+    GMAssessment,
+    HINEAssessment,
+    DevelopmentalAssessment,
+    CDICRecord,
+)
+
+DASHBOARD_SOURCES = (
+    Patient,
+    Video,
+    GMAssessment,
+    HINEAssessment,
+    DevelopmentalAssessment,
+    CDICRecord,
+    Attachment,
+    Bookmark,
+    CustomUser,
+)
+
+# Tables behind the manager list totals and stats cards
+COUNT_SOURCES = DASHBOARD_SOURCES
+
+RECOMMENDATION_SOURCES = (
+    GMAssessment,
+    HINEAssessment,
+    CDICRecord,
+)
+
+COUNTED_SOURCES = (
+    Video,
+    Attachment,
+    GMAssessment,
+    HINEAssessment,
+    DevelopmentalAssessment,
+    CDICRecord,
+)
+
+ROLLUP_SOURCES = (
+    GMAssessment,
+    HINEAssessment,
+    DevelopmentalAssessment,
+    CDICRecord,
+)
+
+
+def refresh_clinical_status_on_save(sender, instance, raw=False, **kwargs):
+    """Rebuild the patient's clinical status after an assessment is saved"""
+    if raw or not instance.patient_id:
+        return
+    PatientClinicalStatus.refresh_for_patient(instance.patient_id)
+
+
+def refresh_clinical_status_on_delete(sender, instance, **kwargs):
+    """Rebuild the patient's clinical status after an assessment is deleted"""
+    if not instance.patient_id:
+        return
+    PatientClinicalStatus.refresh_for_patient(instance.patient_id, create=False)
+
+
+for _model in CLINICAL_STATUS_SOURCES:
+    post_save.connect(
+        refresh_clinical_status_on_save,
+        sender=_model,
+        dispatch_uid=f"clinical_status_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        refresh_clinical_status_on_delete,
+        sender=_model,
+        dispatch_uid=f"clinical_status_delete_{_model.__name__}",
+    )
+
+
+@receiver(m2m_changed, sender=GMAssessment.diagnosis.through)
+def refresh_clinical_status_on_gma_diagnosis(sender, instance, action, **kwargs):
+    """Keep the cached GMA diagnosis titles in sync with the M2M field"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if isinstance(instance, GMAssessment):
+        PatientClinicalStatus.refresh_for_patient(instance.patient_id, create=False)
+
+
+def refresh_recommendations_on_save(sender, instance, raw=False, **kwargs):
+    """Re-evaluate the patient's recommendations after an assessment is saved"""
+    if raw or not instance.patient_id:
+        return
+    refresh_recommendations([instance.patient_id])
+
+
+def refresh_recommendations_on_delete(sender, instance, **kwargs):
+    """Re-evaluate the patient's recommendations after an assessment is deleted"""
+    if not instance.patient_id:
+        return
+    refresh_recommendations([instance.patient_id], create=False)
+
+
+for _model in RECOMMENDATION_SOURCES:
+    post_save.connect(
+        refresh_recommendations_on_save,
+        sender=_model,
+        dispatch_uid=f"recommendations_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        refresh_recommendations_on_delete,
+        sender=_model,
+        dispatch_uid=f"recommendations_delete_{_model.__name__}",
+    )
+
+
+@receiver(post_save, sender=Patient)
+def refresh_recommendations_on_patient_save(sender, instance, raw=False, **kwargs):
+    """The age-driven rules depend on the date of birth"""
+    if raw:
+        return
+    refresh_recommendations([instance.pk])
+
+
+# Saves that only record a login; no dashboard figure or count depends on them
+LOGIN_FIELDS = frozenset({"last_login", "last_login_device"})
+
+
+def _login_bookkeeping(update_fields):
+    return update_fields is not None and set(update_fields) <= LOGIN_FIELDS
+
+
+def invalidate_dashboard(sender, update_fields=None, **kwargs):
+    """Drop the cached dashboard once the write is committed"""
+    if _login_bookkeeping(update_fields):
+        return
+    transaction.on_commit(DashboardSnapshot.invalidate)
+
+
+for _model in DASHBOARD_SOURCES:
+    post_save.connect(
+        invalidate_dashboard,
+        sender=_model,
+        dispatch_uid=f"dashboard_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        invalidate_dashboard,
+        sender=_model,
+        dispatch_uid=f"dashboard_delete_{_model.__name__}",
+    )
+
+
+def invalidate_counts(sender, update_fields=None, **kwargs):
+    """Bump the table's count version once the write is committed"""
+    if _login_bookkeeping(update_fields):
+        return
+    transaction.on_commit(lambda: counts.invalidate(sender))
+
+
+for _model in COUNT_SOURCES:
+    post_save.connect(
+        invalidate_counts,
+        sender=_model,
+        dispatch_uid=f"counts_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        invalidate_counts,
+        sender=_model,
+        dispatch_uid=f"counts_delete_{_model.__name__}",
+    )
+
+
+def _schedule_rollup_refresh(buckets):
+    buckets = set(buckets)
+    if buckets:
+        transaction.on_commit(lambda: refresh_buckets(buckets))
+
+
+def _patient_area(patient_id):
+    return (
+        Patient.objects.filter(pk=patient_id).values_list("moh_area", flat=True).first()
+    )
+
+
+@receiver(pre_save, sender=Patient)
+def capture_patient_rollup_buckets(sender, instance, raw=False, **kwargs):
+    """
+    Remember the birth/admission buckets the patient counted in before the
+    save, and the birth data the stored assessment ages were computed from
+    """
+    instance._rollup_previous = None
+    if raw or not instance.pk:
+        return
+    instance._rollup_previous = (
+        Patient.objects.filter(pk=instance.pk)
+        .only("dob_tob", "do_admission", "moh_area", "pog_wks", "pog_days")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Patient)
+def refresh_rollups_on_patient_save(sender, instance, raw=False, **kwargs):
+    """Recount the daily rollups the patient moved out of and into"""
+    if raw:
+        return
+    previous = getattr(instance, "_rollup_previous", None)
+    buckets = patient_buckets(instance)
+    if previous is not None:
+        if (previous.dob_tob, previous.do_admission, previous.moh_area) == (
+            instance.dob_tob,
+            instance.do_admission,
+            instance.moh_area,
+        ):
+            return
+        buckets |= patient_buckets(previous)
+        if (previous.moh_area or "") != (instance.moh_area or ""):
+            # Every assessment of the patient moves to the new area
+            buckets |= patient_activity_buckets(
+                instance.pk, (previous.moh_area, instance.moh_area)
+            )
+    _schedule_rollup_refresh(buckets)
+
+
+@receiver(post_save, sender=Patient)
+def refresh_assessment_ages_on_patient_save(sender, instance, raw=False, **kwargs):
+    """Keep the stored ages of the patient's records in step with the birth data"""
+    previous = getattr(instance, "_rollup_previous", None)
+    if raw or previous is None:
+        return
+    if (previous.dob_tob, previous.pog_wks, previous.pog_days) != (
+        instance.dob_tob,
+        instance.pog_wks,
+        instance.pog_days,
+    ):
+        refresh_assessment_ages([instance.pk])
+
+
+@receiver(post_delete, sender=Patient)
+def refresh_rollups_on_patient_delete(sender, instance, **kwargs):
+    _schedule_rollup_refresh(patient_buckets(instance))
+
+
+def capture_record_rollup_buckets(sender, instance, raw=False, **kwargs):
+    """Remember the bucket the record counted in before the save"""
+    instance._rollup_previous = set()
+    if raw or not instance.pk:
+        return
+    previous = sender.objects.filter(pk=instance.pk).select_related("patient").first()
+    if previous is not None:
+        instance._rollup_previous = record_buckets(
+            previous, previous.patient.moh_area
+        )
+
+
+def refresh_rollups_on_record_save(sender, instance, raw=False, **kwargs):
+    if raw or not instance.patient_id:
+        return
+    buckets = record_buckets(instance, _patient_area(instance.patient_id))
+    _schedule_rollup_refresh(buckets | getattr(instance, "_rollup_previous", set()))
+
+
+def refresh_rollups_on_record_delete(sender, instance, **kwargs):
+    if not instance.patient_id:
+        return
+    # On a cascading patient delete the records go first, so the patient row
+    # is still there to read the area from
+    area = _patient_area(instance.patient_id)
+    _schedule_rollup_refresh(record_buckets(instance, area))
+
+
+for _model in ROLLUP_SOURCES:
+    pre_save.connect(
+        capture_record_rollup_buckets,
+        sender=_model,
+        dispatch_uid=f"rollups_pre_save_{_model.__name__}",
+    )
+    post_save.connect(
+        refresh_rollups_on_record_save,
+        sender=_model,
+        dispatch_uid=f"rollups_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        refresh_rollups_on_record_delete,
+        sender=_model,
+        dispatch_uid=f"rollups_delete_{_model.__name__}",
+    )
+
+
+@receiver(post_save, sender=Patient)
+def index_patient_on_save(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search index in step with the patient row"""
+    if raw:
+        return
+    index_patients([instance.pk])
+
+
+@receiver(post_delete, sender=Patient)
+def unindex_patient_on_delete(sender, instance, **kwargs):
+    index_patients([instance.pk])
+
+
+@receiver(post_save, sender=Patient)
+def sync_identifiers_on_patient_save(sender, instance, raw=False, **kwargs):
+    """Keep the normalized identifier rows in step with the patient numbers"""
+    if raw:
+        return
+    sync_patient(instance)
+
+
+@receiver(post_delete, sender=Patient)
+def forget_identifiers_on_patient_delete(sender, instance, **kwargs):
+    # The rows go with the cascade; only the cached lookups need dropping
+    invalidate(value for _kind, value in patient_identifiers(instance))
+
+
+@receiver(post_save, sender=Patient)
+def sync_autocomplete_on_patient_save(sender, instance, raw=False, **kwargs):
+    """Refresh the patient's autocomplete keys and drop cached suggestions"""
+    if raw:
+        return
+    autocomplete.sync_patient(instance)
+    transaction.on_commit(autocomplete.invalidate)
+
+
+@receiver(post_delete, sender=Patient)
+def invalidate_autocomplete_on_patient_delete(sender, instance, **kwargs):
+    transaction.on_commit(autocomplete.invalidate)
+
+
+def index_search_document_on_save(sender, instance, raw=False, **kwargs):
+    """Refresh the record's cross-entity search document"""
+    if raw:
+        return
+    if sender is Patient:
+        # Every record of the patient embeds the patient's names
+        index_patient_records(instance.pk)
+    else:
+        index_records(entity_type_of(instance), [instance.pk])
+
+
+def remove_search_document_on_delete(sender, instance, **kwargs):
+    remove_record(entity_type_of(instance), instance.pk)
+
+
+for _entity_type in ENTITY_MODELS:
+    _model = entity_model(_entity_type)
+    post_save.connect(
+        index_search_document_on_save,
+        sender=_model,
+        dispatch_uid=f"search_document_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        remove_search_document_on_delete,
+        sender=_model,
+        dispatch_uid=f"search_document_delete_{_model.__name__}",
+    )
+
+
+def capture_counted_record(sender, instance, raw=False, **kwargs):
+    """Remember the patient (and, for a GMA, the video) the record counted towards"""
+    instance._counter_previous = None
+    if raw or instance._state.adding:
+        return
+    fields = ["patient_id"]
+    if sender is GMAssessment:
+        fields.append("video_file_id")
+    instance._counter_previous = (
+        sender.objects.filter(pk=instance.pk).values(*fields).first()
+    )
+
+
+def count_record_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep the patient's counter column in step with its records"""
+    if raw:
+        return
+    field = counter_field(sender)
+    previous = getattr(instance, "_counter_previous", None)
+    if created or previous is None:
+        adjust(instance.patient_id, field, 1)
+    elif previous["patient_id"] != instance.patient_id:
+        adjust(previous["patient_id"], field, -1)
+        adjust(instance.patient_id, field, 1)
+
+
+def uncount_record_on_delete(sender, instance, **kwargs):
+    adjust(instance.patient_id, counter_field(sender), -1)
+
+
+for _model in COUNTED_SOURCES:
+    pre_save.connect(
+        capture_counted_record,
+        sender=_model,
+        dispatch_uid=f"counters_pre_save_{_model.__name__}",
+    )
+    post_save.connect(
+        count_record_on_save,
+        sender=_model,
+        dispatch_uid=f"counters_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        uncount_record_on_delete,
+        sender=_model,
+        dispatch_uid=f"counters_delete_{_model.__name__}",
+    )
+
+
+@receiver(post_save, sender=GMAssessment)
+def mark_video_assessed_on_gma_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_counter_previous", None)
+    if previous is not None:
+        if previous["video_file_id"] == instance.video_file_id:
+            return
+        set_assessed(previous["video_file_id"], False)
+    set_assessed(instance.video_file_id, True)
+
+
+@receiver(post_delete, sender=GMAssessment)
+def mark_video_unassessed_on_gma_delete(sender, instance, **kwargs):
+    set_assessed(instance.video_file_id, False)
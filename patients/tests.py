@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.test import TestCase
+
+from patients.models import (
+    CDICRecord,
+    DevelopmentalAssessment,
+    GMAssessment,
+    HINEAssessment,
+    Patient,
+)
+from patients.timeline import patient_timeline
+from users.models import CustomUser
+from video.models import Video
+
+
+class PatientTimelineTests(TestCase):
+    """Keyset paging of the merged timeline over date and datetime records"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create(username="timeline", email="t@example.com")
+        first_day = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        cls.patient = Patient.objects.create(
+            bht="T0001",
+            pin="T0001",
+            nnc_no="T0001",
+            baby_name="Timeline Baby",
+            mother_name="Mother",
+            gender="Male",
+            dob_tob=first_day - timedelta(days=30),
+            birth_weight=2500,
+            ofc=33,
+            tp_mobile="0771234567",
+            mo_delivery="Other",
+            pog_wks=34,
+            pog_days=2,
+            moh_area="Kandy",
+            do_admission=first_day - timedelta(days=29),
+            added_by=user,
+        )
+        for day in range(3):
+            # Every record of a day sits at midnight UTC, so dates tie
+            # across types, and twice within each type
+            midnight = first_day + timedelta(days=day)
+            for copy in range(2):
+                video = Video.objects.create(
+                    video_file=f"videos/t{day}_{copy}.mp4",
+                    title=f"video {day} {copy}",
+                    patient=cls.patient,
+                    recorded_on=midnight,
+                    added_by=user,
+                )
+                GMAssessment.objects.create(
+                    patient=cls.patient,
+                    video_file=video,
+                    date_of_assessment=midnight,
+                    diagnosis_conclusion="NORMAL",
+                    added_by=user,
+                )
+                HINEAssessment.objects.create(
+                    patient=cls.patient,
+                    date_of_assessment=midnight,
+                    score=70,
+                    assessment_done_by="dr",
+                    added_by=user,
+                )
+                DevelopmentalAssessment.objects.create(
+                    patient=cls.patient,
+                    date_of_assessment=midnight,
+                    gm_age_from=0,
+                    gm_age_to=3,
+                    assessment_done_by="dr",
+                    added_by=user,
+                )
+                CDICRecord.objects.create(
+                    patient=cls.patient,
+                    assessment_date=midnight.date(),
+                    added_by=user,
+                )
+            # One record later in the day, after the midnight ties
+            HINEAssessment.objects.create(
+                patient=cls.patient,
+                date_of_assessment=midnight + timedelta(hours=9),
+                score=65,
+                assessment_done_by="dr",
+                added_by=user,
+            )
+
+    def walk(self, limit):
+        events, cursor = patient_timeline(self.patient.pk, limit=limit)
+        while cursor:
+            page, cursor = patient_timeline(self.patient.pk, cursor, limit=limit)
+            self.assertLessEqual(len(page), limit)
+            events += page
+        return [(event["type"], event["id"]) for event in events]
+
+    def test_pages_cover_every_event_once_in_order(self):
+        everything, cursor = patient_timeline(self.patient.pk, limit=100)
+        self.assertIsNone(cursor)
+        self.assertEqual(len(everything), 3 * (2 * 5 + 1))
+        expected = [(event["type"], event["id"]) for event in everything]
+
+        keys = [
+            (event["date"], event["type"], event["id"]) for event in everything
+        ]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        for limit in (1, 2, 3, 5, 7):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(limit), expected)
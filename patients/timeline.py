@@ -0,0 +1,208 @@
+"""
+Per-patient timeline of videos, attachments and assessments.
+
+All record types are projected onto (event type, id, date, summary) and merged
+with a single ``UNION ALL`` query, newest first. Pages are fetched by keyset:
+the cursor is the last event's (date, type, id), and the "older than" filter
+is pushed into each branch of the union, so every branch is a range scan on
+its (patient, date) index whatever the page.
+"""
+
+from datetime import time
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.core import signing
+from django.db.models import (
+    Case,
+    CharField,
+    DateTimeField,
+    F,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, NullIf
+from django.urls import NoReverseMatch, reverse
+from django.utils.dateparse import parse_datetime
+
+from patients.search_documents import ENTITY_MODELS, ENTITY_URLS, _db_datetime
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+_SALT = "patients.timeline.cursor"
+
+
+def _numbered(label, field="title"):
+    return Coalesce(
+        NullIf(F(field), Value("")),
+        Concat(Value(f"{label} #"), Cast("id", CharField())),
+        output_field=CharField(),
+    )
+
+
+def _flagged(flag, when_true, when_false):
+    return Case(
+        When(**{flag: True}, then=Value(when_true)),
+        default=Value(when_false),
+        output_field=CharField(),
+    )
+
+
+# event type -> (date field, summary expression); types as in ENTITY_MODELS
+TIMELINE_SOURCES = {
+    "Video": ("recorded_on", lambda: _numbered("Video")),
+    "Attachment": ("created_at", lambda: _numbered("Attachment")),
+    "GMA": (
+        "date_of_assessment",
+        lambda: Concat(
+            Value("GMA "),
+            Coalesce("diagnosis_conclusion", Value("")),
+            output_field=CharField(),
+        ),
+    ),
+    "HINE": (
+        "date_of_assessment",
+        lambda: Concat(
+            Value("HINE score "),
+            Cast("score", CharField()),
+            output_field=CharField(),
+        ),
+    ),
+    "DA": (
+        "date_of_assessment",
+        lambda: _flagged(
+            "is_dx_normal",
+            "Developmental assessment normal",
+            "Developmental assessment abnormal",
+        ),
+    ),
+    "CDICR": (
+        "assessment_date",
+        lambda: _flagged("is_discharged", "CDIC record discharged", "CDIC record"),
+    ),
+}
+
+
+class _StartOfDay(Cast):
+    """
+    A date column as the datetime of its midnight (UTC). On SQLite, ``Cast``
+    renders as ``strftime(... %f)`` (``00:00:00.000``), which sorts after a
+    stored midnight datetime (``00:00:00``); the text form of stored
+    datetimes keeps the union's order the one ``_older_than`` assumes.
+    """
+
+    def __init__(self, expression):
+        super().__init__(expression, DateTimeField())
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="(%(expressions)s || ' 00:00:00')",
+            **extra_context,
+        )
+
+
+def _older_than(event_type, date_field, cursor):
+    """
+    Rows of ``event_type`` after the cursor in (date, type, id) descending
+    order. The type is constant within a branch, so the comparison reduces
+    to a plain range on the date (and id).
+    """
+    date, cursor_type, cursor_id = cursor
+    if event_type < cursor_type:
+        return Q(**{f"{date_field}__lte": date})
+    if event_type > cursor_type:
+        return Q(**{f"{date_field}__lt": date})
+    return Q(**{f"{date_field}__lt": date}) | Q(
+        **{date_field: date, "id__lt": cursor_id}
+    )
+
+
+def _older_than_day(event_type, date_field, cursor):
+    """
+    ``_older_than`` for a date column, whose events sit at midnight UTC. A
+    cursor later in the day only bounds the date, inclusively.
+    """
+    date, cursor_type, cursor_id = cursor
+    date = date.astimezone(dt_timezone.utc)
+    if date.time() != time.min:
+        return Q(**{f"{date_field}__lte": date.date()})
+    return _older_than(event_type, date_field, (date.date(), cursor_type, cursor_id))
+
+
+def _branch(event_type, patient_id, cursor):
+    date_field, summary = TIMELINE_SOURCES[event_type]
+    model = apps.get_model(*ENTITY_MODELS[event_type])
+    field = model._meta.get_field(date_field)
+    event_date = (
+        F(date_field) if isinstance(field, DateTimeField) else _StartOfDay(date_field)
+    )
+    queryset = model.objects.filter(patient_id=patient_id).order_by()
+    if cursor is not None:
+        queryset = queryset.filter(
+            _older_than(event_type, date_field, cursor)
+            if isinstance(field, DateTimeField)
+            else _older_than_day(event_type, date_field, cursor)
+        )
+    return queryset.annotate(
+        event_type=Value(event_type, output_field=CharField()),
+        event_date=event_date,
+        event_summary=summary(),
+    ).values_list("event_type", "id", "event_date", "event_summary")
+
+
+def _encode(event):
+    return signing.dumps(
+        [event["date"].isoformat(), event["type"], event["id"]], salt=_SALT
+    )
+
+
+def _decode(token):
+    try:
+        date, event_type, event_id = signing.loads(token, salt=_SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    date = parse_datetime(date)
+    if date is None or event_type not in TIMELINE_SOURCES:
+        return None
+    return date, event_type, int(event_id)
+
+
+def _url(event_type, event_id):
+    try:
+        return reverse(ENTITY_URLS[event_type], args=[event_id])
+    except NoReverseMatch:
+        return None
+
+
+def patient_timeline(patient_id, cursor=None, limit=PAGE_SIZE):
+    """
+    One page of the patient's events, newest first. Returns
+    ``(events, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    position = _decode(cursor) if cursor else None
+    branches = [
+        _branch(event_type, patient_id, position) for event_type in TIMELINE_SOURCES
+    ]
+    merged = (
+        branches[0]
+        .union(*branches[1:], all=True)
+        .order_by("-event_date", "-event_type", "-id")
+    )
+    rows = list(merged[: limit + 1])
+
+    events = [
+        {
+            "type": event_type,
+            "id": event_id,
+            "date": _db_datetime(date),
+            "summary": summary,
+            "url": _url(event_type, event_id),
+        }
+        for event_type, event_id, date, summary in rows[:limit]
+    ]
+    next_cursor = _encode(events[-1]) if len(rows) > limit else None
+    return events, next_cursor
@@ -20,13 +20,18 @@ urlpatterns = [
     path("manager/patient/diagnosed/da/normal", views.patient_manager_da_normal, name='manage-patients-diagnosed-da-normal'),
     path("manager/patient/diagnosed/da/abnormal", views.patient_manager_da_abnormal, name='manage-patients-diagnosed-da-abnormal'),
     path("manager/patient/discharged", views.patient_manager_discharged_only, name='manage-patients-discharged'),
+    path("manager/worklist/", views.recommendation_worklist, name='recommendation-worklist'),
     path("patient/add/", views.patient_add, name='add-patient'),
     path("patient/view/<str:pk>/", views.patient_view, name='view-patient'),
+    path("patient/view/<str:pk>/timeline/", views.patient_timeline, name='patient-timeline'),
     path("patient/edit/<str:pk>/", views.patient_edit, name='edit-patient'),
     path("patient/delete/confirm/<str:pk>/", views.patient_delete_confirm, name='delete-confirm-patient'),
     path("patient/delete/<str:pk>/", views.patient_delete, name='delete-patient'),
     path("search/", views.search_start, name='search-start'),
     path("search/results/", views.search_results, name='search-results'),
+    path("search/all/", views.search_all, name='search-all'),
+    path("search/identifiers/", views.identifier_lookup, name='identifier-lookup'),
+    path("search/autocomplete/", views.patient_autocomplete, name='patient-autocomplete'),
     path("help/article/", views.help_home, name='help-home'),
     path("help/article/<str:pk>/", views.help_article, name='help-article'),
 
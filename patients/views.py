@@ -11,7 +11,14 @@ from patients.models import (
     Attachment,
     HINEAssessment,
     DevelopmentalAssessment,
+    PatientRecommendation,
 )
+from patients.dashboard import DashboardSnapshot
+from patients import autocomplete, identifiers, timeline
+from patients.bundle import PatientBundle
+from patients.manager_stats import BOOKMARK_STATS, CDIC_STATS, DA_STATS, HINE_STATS
+from patients.search import search_patients
+from patients.search_documents import search_everything
 from video.models import Video
 from users.models import CustomUser
 from users.views import userViewByUsername
@@ -24,7 +31,12 @@ from patients.forms import (
     HINEAssessmentForm,
     DevelopmentalAssessmentForm,
 )
-from ndas.custom_codes.choice import BOOKMARK_TYPE
+from ndas.custom_codes.choice import (
+    BOOKMARK_TYPE,
+    RECOMMENDATION_RULES,
+    SEARCH_ENTITY_TYPE,
+)
+from ndas.custom_codes.pagination import paginate
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -42,15 +54,10 @@ from ndas.custom_codes.validators import (
     getVideoMaxSizeMB,
 )
 from ndas.custom_codes.custom_methods import (
-    get_admissions_data_barchart,
-    get_gma_diagnosis_data,
-    get_all_diagnosis_data,
-    get_userStats,
     getAttachmentType,
     getCurrentDateTime,
     getFileSizeInMb,
     getPatientList,
-    getCountZeroIfNone,
 )
 from datetime import datetime
 from django.views.decorators.csrf import csrf_exempt
@@ -58,14 +65,21 @@ from django.views.decorators.http import require_http_methods
 import pytz, os, logging, subprocess, tempfile
 from django.http import JsonResponse
 from django.utils.timezone import localtime, now
+from django.utils.dateparse import parse_date
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.db.models import Q, Count, Exists, OuterRef, Prefetch
 
 # from moviepy.editor import VideoFileClip  # Temporarily commented out
 from django.core.files import File
 from django.core.files.storage import FileSystemStorage
 from ndas.custom_codes.ndas_enums import PtStatus
+from ndas.custom_codes.ages import (
+    MONTH_BAND_SLACK_DAYS,
+    completed_months,
+    month_band_days,
+)
+import numpy as np
 
 # Configure logger for patient operations
 logger = logging.getLogger("django")
@@ -74,84 +88,21 @@ logger = logging.getLogger("django")
 # Create your views here
 @login_required(login_url="user-login")
 def dashboard(request):
-    # load common record as variables
-    var_patients = getPatientList(PtStatus.ALL)
-    var_videos = Video.objects.all()
-    var_gm_assessments = GMAssessment.objects.all()
-    var_hine_assessments = HINEAssessment.objects.all()
-    var_da_assessments = DevelopmentalAssessment.objects.all()
-    var_cdic_records = CDICRecord.objects.all()
-
-    var_new_Patients = var_patients.filter(videos__isnull=True).distinct()
-    Patients_new_list_10 = var_new_Patients[:5]
-    patients_new_count = getCountZeroIfNone(var_new_Patients)
-    patients_total_count = getCountZeroIfNone(var_patients)
-    patients_discharged_count = getCountZeroIfNone(getPatientList(PtStatus.DISCHARGED))
-
-    bookmark = Bookmark.objects.all()
-    attachments_count = getCountZeroIfNone(Attachment.objects.all())
-    users_total_count = getCountZeroIfNone(CustomUser.objects.all())
-
-    videos_total_count = getCountZeroIfNone(var_videos)
-    var_new_videos = var_videos.filter(gmassessment__isnull=True).distinct()
-    new_videos = var_new_videos[:5]
-    new_videos_count = getCountZeroIfNone(var_new_videos)
-
-    all_gm_assessments_count = getCountZeroIfNone(var_gm_assessments)
-    all_hine_assessments_count = getCountZeroIfNone(var_hine_assessments)
-    all_da_assessments_count = getCountZeroIfNone(var_da_assessments)
-    all_cdic_records_count = getCountZeroIfNone(var_cdic_records)
-
-    dx_gm_assessments_count = getCountZeroIfNone(
-        GMAssessment.objects.exclude(diagnosis_conclusion="NORMAL")
-    )
-    dx_hine_assessments_count = getCountZeroIfNone(
-        HINEAssessment.objects.filter(score__lt=73)
-    )
-    dx_da_assessments_count = getCountZeroIfNone(
-        DevelopmentalAssessment.objects.filter(is_dx_normal=False)
-    )
-
-    # get data for bar chart
-    bar_chart_monthly_admissions = get_admissions_data_barchart()
-    diagnosis_data_gma = get_gma_diagnosis_data()
-    diagnosis_data_all = get_all_diagnosis_data()
-    user_stat = get_userStats()
-
-    context = {
-        "videos_total_count": videos_total_count,
-        "dx_gm_assessments_count": dx_gm_assessments_count,
-        "dx_hine_assessments_count": dx_hine_assessments_count,
-        "dx_da_assessments_count": dx_da_assessments_count,
-        "all_gm_assessments_count": all_gm_assessments_count,
-        "all_hine_assessments_count": all_hine_assessments_count,
-        "all_da_assessments_count": all_da_assessments_count,
-        "all_cdic_records_count": all_cdic_records_count,
-        "new_videos": new_videos,
-        "new_videos_count": new_videos_count,
-        "videos_total_count": videos_total_count,
-        "patients_total_count": patients_total_count,
-        "Patients_new_list_10": Patients_new_list_10,
-        "patients_new_count": patients_new_count,
-        "patients_discharged_count": patients_discharged_count,
-        "bookmark": bookmark,
-        "bar_chart_monthly_admissions": bar_chart_monthly_admissions,
-        "diagnosis_data_gma": diagnosis_data_gma,
-        "diagnosis_data_all": diagnosis_data_all,
-        "users_total_count": users_total_count,
-        "attachments_count": attachments_count,
-        "user_stat": user_stat,
-    }
-
+    context = DashboardSnapshot.get()
     return render(request, "patients/index.html", context)
 
 
 @login_required(login_url="user-login")
 def patient_manager(request):
-    patients_list = Patient.objects.all().order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        Patient.objects.with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request, "patients/manager.html", {"patients_page_obj": paginated_pt_list}
     )
@@ -159,10 +110,16 @@ def patient_manager(request):
 
 @login_required(login_url="user-login")
 def patient_manager_diagnosed_any(request):
-    patients_list = getPatientList(PtStatus.DIAGNOSED).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DIAGNOSED)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -172,10 +129,16 @@ def patient_manager_diagnosed_any(request):
 
 @login_required(login_url="user-login")
 def patient_manager_diagnosis_normal(request):
-    patients_list = getPatientList(PtStatus.DX_NORMAL).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_NORMAL)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -185,10 +148,16 @@ def patient_manager_diagnosis_normal(request):
 
 @login_required(login_url="user-login")
 def patient_manager_diagnosed_gma_normal(request):
-    patients_list = getPatientList(PtStatus.DX_GMA_NORMAL).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_GMA_NORMAL)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -198,10 +167,16 @@ def patient_manager_diagnosed_gma_normal(request):
 
 @login_required(login_url="user-login")
 def patient_manager_diagnosed_gma_abnormal(request):
-    patients_list = getPatientList(PtStatus.DX_GMA_ABNORMAL).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_GMA_ABNORMAL)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -211,10 +186,16 @@ def patient_manager_diagnosed_gma_abnormal(request):
 
 @login_required(login_url="user-login")
 def patient_manager_diagnosed_hine(request):
-    patients_list = getPatientList(PtStatus.DX_HINE).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_HINE)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -224,10 +205,16 @@ def patient_manager_diagnosed_hine(request):
 
 @login_required(login_url="user-login")
 def patient_manager_da_normal(request):
-    patients_list = getPatientList(PtStatus.DX_DA_NORMAL).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_DA_NORMAL)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -237,10 +224,16 @@ def patient_manager_da_normal(request):
 
 @login_required(login_url="user-login")
 def patient_manager_da_abnormal(request):
-    patients_list = getPatientList(PtStatus.DX_DA_ABNORMAL).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DX_DA_ABNORMAL)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -250,10 +243,16 @@ def patient_manager_da_abnormal(request):
 
 @login_required(login_url="user-login")
 def patient_manager_discharged_only(request):
-    patients_list = getPatientList(PtStatus.DISCHARGED).order_by("-id")
-    paginator = Paginator(patients_list, 10)
-    page_number = request.GET.get("page")
-    paginated_pt_list = paginator.get_page(page_number)
+    patients_list = (
+        getPatientList(PtStatus.DISCHARGED)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -262,11 +261,59 @@ def patient_manager_discharged_only(request):
 
 
 @login_required(login_url="user-login")
-def patient_manager_new_only(request):
-    patients_list = Patient.objects.filter(videos__isnull=True).order_by("-id")
-    paginator = Paginator(patients_list, 10)
+def recommendation_worklist(request):
+    """Patients with due follow-up actions, for clinic preparation"""
+    rule = request.GET.get("rule")
+    due = PatientRecommendation.objects.filter(is_due=True)
+    rule_counts = dict(
+        due.values_list("rule_id").annotate(total=Count("id")).order_by()
+    )
+    if rule in dict(RECOMMENDATION_RULES):
+        due = due.filter(rule_id=rule)
+    else:
+        rule = None
+
+    patients_list = (
+        Patient.objects.filter(Exists(due.filter(patient=OuterRef("pk"))))
+        .prefetch_related(
+            Prefetch(
+                "recommendations",
+                queryset=due.order_by("rule_id"),
+                to_attr="due_recommendations",
+            )
+        )
+        .order_by("dob_tob", "id")
+    )
+    paginator = Paginator(patients_list, 25)
     page_number = request.GET.get("page")
     paginated_pt_list = paginator.get_page(page_number)
+    rules = [
+        (rule_id, label, rule_counts.get(rule_id, 0))
+        for rule_id, label in RECOMMENDATION_RULES
+    ]
+    return render(
+        request,
+        "patients/worklist.html",
+        {
+            "patients_page_obj": paginated_pt_list,
+            "rules": rules,
+            "selected_rule": rule,
+        },
+    )
+
+
+@login_required(login_url="user-login")
+def patient_manager_new_only(request):
+    patients_list = (
+        Patient.objects.filter(videos__isnull=True)
+        .with_clinical_summary()
+        .select_related("clinical_status")
+        .order_by("-id")
+    )
+    patients_list = Bookmark.annotate_bookmark_ids(
+        patients_list, "Patient", request.user
+    )
+    paginated_pt_list = paginate(request, patients_list, 10)
     return render(
         request,
         "patients/manager.html",
@@ -375,67 +422,23 @@ def patient_add(request):
 
 @login_required(login_url="user-login")
 def patient_view(request, pk):
-    selected_patient = Patient.objects.get(id=pk)
-    indications = selected_patient.indecation_for_gma
-
-    var_file_video = Video.objects.filter(patient=selected_patient).order_by("-id")
-    file_video_count = var_file_video.count()
-    file_videos = var_file_video[:5]
-
-    var_file_attachments = Attachment.objects.filter(patient=selected_patient).order_by(
-        "-id"
-    )
-    file_attachment_count = var_file_attachments.count()
-    file_attachment = var_file_attachments[:5]
-
-    var_gma = GMAssessment.objects.filter(patient=selected_patient).order_by("-id")
-    gm_assessments_count = var_gma.count()
-    gm_assessments = var_gma[:5]
-    gm_last_assessment = var_gma.last
+    bundle = PatientBundle.load(pk, request.user)
+    return render(request, "patients/view.html", bundle.context())
 
-    var_hine = HINEAssessment.objects.filter(patient=selected_patient).order_by("-id")
-    hine_assessments_count = var_hine.count()
-    hine_assessments = var_hine[:5]
 
-    var_da = DevelopmentalAssessment.objects.filter(patient=selected_patient).order_by(
-        "-id"
-    )
-    da_assessments_count = var_da.count()
-    da_assessments = var_da[:5]
-
-    var_cdic = CDICRecord.objects.filter(patient=selected_patient).order_by("-id")
-    cdic_record_count = var_cdic.count()
-    cdic_record = var_cdic[:5]
-
-    # check bookmark
-    bm = (
-        Bookmark.objects.filter(bookmark_type="Patient")
-        .filter(object_id=selected_patient.id)
-        .first()
+@login_required(login_url="user-login")
+def patient_timeline(request, pk):
+    """JSON page of a patient's events, newest first; ``cursor`` for older"""
+    if not Patient.objects.filter(pk=pk).exists():
+        return JsonResponse({"error": "Patient not found"}, status=404)
+    try:
+        limit = int(request.GET.get("limit", timeline.PAGE_SIZE))
+    except ValueError:
+        limit = timeline.PAGE_SIZE
+    events, next_cursor = timeline.patient_timeline(
+        pk, request.GET.get("cursor") or None, limit
     )
-
-    context = {
-        "patient": selected_patient,
-        "file_videos": file_videos,
-        "file_video_count": file_video_count,
-        "file_attachment": file_attachment,
-        "file_attachment_count": file_attachment_count,
-        "indications": indications,
-        "bookmark": bm,
-        "gm_assessments_new": "",
-        "gm_assessments_completed": "",
-        "gm_assessments": gm_assessments,
-        "gm_assessments_count": gm_assessments_count,
-        "gm_last_assessment": gm_last_assessment,
-        "hine_assessments_count": hine_assessments_count,
-        "hine_assessments": hine_assessments,
-        "da_assessments_count": da_assessments_count,
-        "da_assessments": da_assessments,
-        "cdic_record_count": cdic_record_count,
-        "cdic_record": cdic_record,
-    }
-
-    return render(request, "patients/view.html", context)
+    return JsonResponse({"events": events, "next": next_cursor})
 
 
 @login_required(login_url="user-login")
@@ -665,143 +668,152 @@ def search_start(request):
     return render(request, "patients/search.html", {"username_list": username_list})
 
 
+def _render_patient_matches(request, results, pagn, params):
+    """Show a single match directly, or a page of ranked matches"""
+    total = results.count()
+    if total == 1:
+        messages.success(request, "Search results for : %s" % pagn)
+        return render(
+            request,
+            "patients/view.html",
+            {"patient": results[0], "patients_page_obj": None, "pgn": pagn},
+        )
+    if total > 1:
+        paginator = Paginator(results, 10)
+        page_number = params.get("page")
+        paginated_pt_list = paginator.get_page(page_number)
+        # Page links repeat the search as a GET request
+        query = params.copy()
+        query.pop("page", None)
+        query.pop("csrfmiddlewaretoken", None)
+        return render(
+            request,
+            "patients/results.html",
+            {
+                "patient": None,
+                "patients_page_obj": paginated_pt_list,
+                "pgn": pagn,
+                "search_query": query.urlencode(),
+            },
+        )
+    return render(request, "patients/search_notfound.html", {"pgn": pagn})
+
+
+def _render_identifier_matches(request, search_text, kinds, pagn, params):
+    """Resolve a typed identifier and show the matching patient(s)"""
+    results = Patient.objects.with_clinical_summary().filter(
+        pk__in=identifiers.resolve(search_text, kinds)
+    )
+    return _render_patient_matches(request, results, pagn, params)
+
+
+@login_required(login_url="user-login")
+def patient_autocomplete(request):
+    """JSON suggestions for a typed name or identifier prefix"""
+    try:
+        limit = int(request.GET.get("limit", autocomplete.DEFAULT_LIMIT))
+    except ValueError:
+        limit = autocomplete.DEFAULT_LIMIT
+    return JsonResponse(
+        {"results": autocomplete.suggest(request.GET.get("q", ""), limit)}
+    )
+
+
+@login_required(login_url="user-login")
+def identifier_lookup(request):
+    """Resolve a pasted list of identifiers at once (e.g. for ward rounds)"""
+    pasted = request.POST.get("identifiers", "") if request.method == "POST" else ""
+    rows = []
+    if pasted:
+        entries = identifiers.split_list(pasted)
+        if len(entries) > identifiers.MAX_BULK:
+            messages.warning(
+                request,
+                "Only the first %s identifiers were looked up" % identifiers.MAX_BULK,
+            )
+        resolved = identifiers.resolve_many(entries)
+        patients = Patient.objects.in_bulk(
+            {pk for _text, ids in resolved for pk in ids}
+        )
+        rows = [
+            (text, [patients[pk] for pk in ids if pk in patients])
+            for text, ids in resolved
+        ]
+    return render(
+        request,
+        "patients/identifier_lookup.html",
+        {
+            "identifiers": pasted,
+            "rows": rows,
+            "found_count": sum(1 for _text, matches in rows if matches),
+        },
+    )
+
+
 @login_required(login_url="user-login")
 def search_results(request):
-    combo_record_type = request.POST.get("combo_record_type", None)
-    combo_pt_param_type = request.POST.get("combo_pt_param_type", None)
-    como_user_username = request.POST.get("combo_users", None)
+    params = request.POST if request.method == "POST" else request.GET
+    combo_record_type = params.get("combo_record_type", None)
+    combo_pt_param_type = params.get("combo_pt_param_type", None)
+    como_user_username = params.get("combo_users", None)
     pagn = ""
-    search_text = request.POST.get("search_text", None)
+    search_text = params.get("search_text", None)
 
     # search patients --------------------------------------------------------------
     if combo_record_type == "rtype_pt":
         patient = Patient()
         if combo_pt_param_type == "pts_bht" and BHT_validation(request, search_text):
             pagn = " : Patients > BHT > " + str(search_text)
-            try:
-                pagn = " : Patients > BHT > " + str(search_text)
-                patient = Patient.objects.get(bht=search_text)
-                messages.success(request, "Search results for : %s" % pagn)
-                return render(
-                    request, "patients/view.html", {"patient": patient, "pgn": pagn}
-                )
-            except patient.DoesNotExist:
-                pagn = " : Patients > BHT > " + str(search_text)
-                return render(
-                    request,
-                    "patients/search_notfound.html",
-                    {"patient": patient, "pgn": pagn},
-                )
+            return _render_identifier_matches(
+                request, search_text, ("BHT",), pagn, params
+            )
 
         elif combo_pt_param_type == "pts_phn" and PHN_validation(request, search_text):
             pagn = " : Patients > PHN > " + str(search_text)
-            try:
-                patient = Patient.objects.get(pin=search_text)
-                messages.success(request, "Search results for : %s" % pagn)
-                return render(request, "patients/view.html", {"patient": patient})
-            except patient.DoesNotExist:
-                return render(
-                    request,
-                    "patients/search_notfound.html",
-                    {"patient": patient, "pgn": pagn},
-                )
+            return _render_identifier_matches(
+                request, search_text, ("PIN",), pagn, params
+            )
 
         elif combo_pt_param_type == "pts_nnc_no" and NNC_validation(
             request, search_text
         ):
-            try:
-                patient = Patient.objects.get(nnc_no=search_text)
-                messages.success(request, "Search results for : %s" % pagn)
-                return render(
-                    request, "patients/view.html", {"patient": patient, "pgn": pagn}
-                )
-            except patient.DoesNotExist:
-                return render(
-                    request,
-                    "patients/search_notfound.html",
-                    {"patient": patient, "pgn": pagn},
-                )
+            pagn = " : Patients > Clinic number > " + str(search_text)
+            return _render_identifier_matches(
+                request, search_text, ("NNC",), pagn, params
+            )
+
+        elif combo_pt_param_type == "pts_identifier" and search_text:
+            pagn = " : Patients > Any identifier > " + str(search_text)
+            return _render_identifier_matches(request, search_text, None, pagn, params)
 
         elif combo_pt_param_type == "pts_name_baby" and Name_baby_validation(
             request, search_text
         ):
             pagn = " : Patients > Name of the baby > " + str(search_text)
-            try:
-                patient = Patient.objects.filter(
-                    Q(baby_name__startswith=search_text)
-                    | Q(baby_name__icontains=search_text)
-                )
-            except patient.DoesNotExist:
-                return render(request, "patients/search_notfound.html", {"pgn": pagn})
-            if len(patient) == 1:
-                messages.success(request, "Search results for : %s" % pagn)
-                return render(
-                    request,
-                    "patients/view.html",
-                    {
-                        "patient": patient.first(),
-                        "patients_page_obj": None,
-                        "pgn": pagn,
-                    },
-                )
-            if len(patient) > 1:
-                paginator = Paginator(patient, 10)
-                page_number = request.GET.get("page")
-                paginated_pt_list = paginator.get_page(page_number)
-                return render(
-                    request,
-                    "patients/results.html",
-                    {
-                        "patient": None,
-                        "patients_page_obj": paginated_pt_list,
-                        "pgn": pagn,
-                    },
-                )
-            else:
-                return render(request, "patients/search_notfound.html", {"pgn": pagn})
+            results = search_patients(
+                search_text,
+                fields=("baby_name",),
+                queryset=Patient.objects.with_clinical_summary(),
+            )
+            return _render_patient_matches(request, results, pagn, params)
 
         elif combo_pt_param_type == "pts_name_mother" and Name_mother_validation(
             request, search_text
         ):
             pagn = " : Patients > Name of the mother > " + str(search_text)
-            try:
-                patient = Patient.objects.filter(
-                    Q(mother_name__startswith=search_text)
-                    | Q(mother_name__icontains=search_text)
-                )
-            except patient.DoesNotExist:
-                return render(request, "patients/search_notfound.html", {"pgn": pagn})
+            results = search_patients(
+                search_text,
+                fields=("mother_name",),
+                queryset=Patient.objects.with_clinical_summary(),
+            )
+            return _render_patient_matches(request, results, pagn, params)
 
-            if len(patient) == 1:
-                messages.success(request, "Search results for : %s" % pagn)
-                return render(
-                    request,
-                    "patients/view.html",
-                    {
-                        "patient": patient.first(),
-                        "patients_page_obj": None,
-                        "pgn": pagn,
-                    },
-                )
-            if len(patient) > 1:
-                paginator = Paginator(patient, 10)
-                page_number = request.GET.get("page")
-                paginated_pt_list = paginator.get_page(page_number)
-                return render(
-                    request,
-                    "patients/results.html",
-                    {
-                        "patient": None,
-                        "patients_page_obj": paginated_pt_list,
-                        "pgn": pagn,
-                    },
-                )
-            else:
-                return render(
-                    request,
-                    "patients/results.html",
-                    {"patient": patient, "patients_page_obj": None, "pgn": pagn},
-                )
+        elif combo_pt_param_type == "pts_keyword" and search_text:
+            pagn = " : Patients > Any detail > " + str(search_text)
+            results = search_patients(
+                search_text, queryset=Patient.objects.with_clinical_summary()
+            )
+            return _render_patient_matches(request, results, pagn, params)
         else:
             username_list = CustomUser.objects.all()
             return render(
@@ -820,6 +832,78 @@ def search_results(request):
         return render(request, "patients/search_notfound.html")
 
 
+@login_required(login_url="user-login")
+def search_all(request):
+    """One search box over patients, videos, assessments, attachments and bookmarks"""
+    query = request.GET.get("q", "").strip()
+    entity_type = request.GET.get("type") or None
+    if entity_type not in dict(SEARCH_ENTITY_TYPE):
+        entity_type = None
+
+    dates = {}
+    for name in ("date_from", "date_to"):
+        value = request.GET.get(name, "").strip()
+        dates[name] = parse_date(value) if value else None
+        if value and dates[name] is None:
+            messages.warning(request, "Invalid date, please use YYYY-MM-DD format.")
+
+    per_type = 20 if entity_type else 5
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+
+    results = search_everything(
+        query,
+        entity_type=entity_type,
+        date_from=dates["date_from"],
+        date_to=dates["date_to"],
+        per_type=per_type,
+        offset=offset if entity_type else 0,
+    )
+
+    # Patient names for the hits, in one query
+    patient_ids = {
+        hit["patient_id"]
+        for hits in results["groups"].values()
+        for hit in hits
+        if hit["patient_id"]
+    }
+    patients = Patient.objects.only("id", "baby_name", "bht").in_bulk(patient_ids)
+    groups = []
+    for type_value, label in SEARCH_ENTITY_TYPE:
+        hits = results["groups"].get(type_value)
+        if not hits:
+            continue
+        for hit in hits:
+            hit["patient"] = patients.get(hit["patient_id"])
+        groups.append((type_value, label, results["facets"][type_value], hits))
+
+    params = request.GET.copy()
+    params.pop("offset", None)
+    params.pop("type", None)
+    total = results["facets"].get(entity_type, 0) if entity_type else 0
+    context = {
+        "query": query,
+        "selected_type": entity_type,
+        "date_from": request.GET.get("date_from", ""),
+        "date_to": request.GET.get("date_to", ""),
+        "facets": [
+            (type_value, label, results["facets"][type_value])
+            for type_value, label in SEARCH_ENTITY_TYPE
+            if type_value in results["facets"]
+        ],
+        "total_hits": sum(results["facets"].values()),
+        "groups": groups,
+        "base_query": params.urlencode(),
+        "previous_offset": max(offset - per_type, 0) if entity_type and offset else None,
+        "next_offset": offset + per_type
+        if entity_type and offset + per_type < total
+        else None,
+    }
+    return render(request, "patients/search_all.html", context)
+
+
 # methods for assessment operations ------------------------------------------------------------------------------
 @login_required(login_url="user-login")
 def assessment_add(request, ptid, fid):
@@ -1097,9 +1181,10 @@ def assessment_delete(request, pk):
 @login_required(login_url="user-login")
 def assessment_manager(request):
     assessment_list = GMAssessment.objects.all().order_by("-id")
-    paginator = Paginator(assessment_list, 10)
-    page_number = request.GET.get("page")
-    paginated_assmnt_list = paginator.get_page(page_number)
+    assessment_list = Bookmark.annotate_bookmark_ids(
+        assessment_list, "GMA", request.user
+    )
+    paginated_assmnt_list = paginate(request, assessment_list, 10)
     return render(
         request,
         "assessment/manager.html",
@@ -1111,9 +1196,10 @@ def assessment_manager(request):
 def assessment_manager_by_patients(request, pk):
     patient = Patient.objects.get(id=pk)
     assessment_list = GMAssessment.objects.filter(patient=patient).order_by("-id")
-    paginator = Paginator(assessment_list, 10)
-    page_number = request.GET.get("page")
-    paginated_assmnt_list = paginator.get_page(page_number)
+    assessment_list = Bookmark.annotate_bookmark_ids(
+        assessment_list, "GMA", request.user
+    )
+    paginated_assmnt_list = paginate(request, assessment_list, 10)
     return render(
         request,
         "assessment/manager.html",
@@ -1171,7 +1257,6 @@ def bookmark_manager(request):
         
         # Apply date range filters
         if date_range:
-            from datetime import timedelta
             from django.utils import timezone
             
             now = timezone.now()
@@ -1189,19 +1274,11 @@ def bookmark_manager(request):
                 var_bookmarks_list = var_bookmarks_list.filter(created_on__gte=start_date)
         
         # Calculate statistics
-        bookmark_stats = {
-            'total': var_bookmarks_list.count(),
-            'patient': var_bookmarks_list.filter(bookmark_type='Patient').count(),
-            'video': var_bookmarks_list.filter(bookmark_type='Video').count(),
-            'assessment': var_bookmarks_list.filter(
-                bookmark_type__in=['GMA', 'HINE', 'DA', 'CDICR']
-            ).count(),
-        }
+        bookmark_stats = BOOKMARK_STATS.compute(var_bookmarks_list)
         
         # Pagination
-        paginator = Paginator(var_bookmarks_list, 15)
-        page_number = request.GET.get("page")
-        bookmark_page_obj = paginator.get_page(page_number)
+        bookmark_page_obj = paginate(request, var_bookmarks_list, 15)
+        Bookmark.resolve_objects(bookmark_page_obj)
         
         context = {
             "bookmark_page_obj": bookmark_page_obj,
@@ -1329,9 +1406,8 @@ def bookmark_delete(request, pk):
 def bookmark_manager_user(request, username):
     user = CustomUser.objects.get(username=username)
     var_patients_list = Bookmark.objects.filter(owner=user).order_by("-id")
-    paginator = Paginator(var_patients_list, 10)
-    page_number = request.GET.get("page")
-    bookmark_list = paginator.get_page(page_number)
+    bookmark_list = paginate(request, var_patients_list, 10)
+    Bookmark.resolve_objects(bookmark_list)
     return render(
         request, "bookmark/manager.html", {"bookmark_page_obj": bookmark_list}
     )
@@ -1372,9 +1448,10 @@ def bookmark_edit(request, pk):
 @login_required(login_url="user-login")
 def attachment_manager(request):
     var_attachment_list = Attachment.objects.order_by("-id")
-    paginator = Paginator(var_attachment_list, 10)
-    page_number = request.GET.get("page")
-    attachment_list = paginator.get_page(page_number)
+    var_attachment_list = Bookmark.annotate_bookmark_ids(
+        var_attachment_list, "Attachment", request.user
+    )
+    attachment_list = paginate(request, var_attachment_list, 10)
     return render(
         request, "attachment/manager.html", {"attachment_page_obj": attachment_list}
     )
@@ -1383,9 +1460,10 @@ def attachment_manager(request):
 @login_required(login_url="user-login")
 def attachment_manager_patient(request, pid):
     var_attachment_list = Attachment.objects.filter(patient=pid).order_by("-id")
-    paginator = Paginator(var_attachment_list, 10)
-    page_number = request.GET.get("page")
-    attachment_list = paginator.get_page(page_number)
+    var_attachment_list = Bookmark.annotate_bookmark_ids(
+        var_attachment_list, "Attachment", request.user
+    )
+    attachment_list = paginate(request, var_attachment_list, 10)
     return render(
         request, "attachment/manager.html", {"attachment_page_obj": attachment_list}
     )
@@ -1683,7 +1761,7 @@ def cdic_assessment_view(request, cdic_id):
 def cdic_assessment_manager(request):
     try:
         # Get all CDIC records
-        var_cdic_list = CDICRecord.objects.select_related('patient', 'created_by', 'edit_by').all().order_by("-id")
+        var_cdic_list = CDICRecord.objects.select_related('patient', 'added_by', 'last_edit_by').all().order_by("-id")
         
         # Search and filter functionality
         search_patient = request.GET.get('search_patient', '').strip()
@@ -1699,12 +1777,11 @@ def cdic_assessment_manager(request):
         
         if created_by:
             var_cdic_list = var_cdic_list.filter(
-                created_by__username__icontains=created_by
+                added_by__username__icontains=created_by
             )
         
         # Apply date range filters
         if date_range:
-            from datetime import timedelta
             from django.utils import timezone
             
             now = timezone.now()
@@ -1745,25 +1822,14 @@ def cdic_assessment_manager(request):
                 )
         
         # Calculate statistics
-        from datetime import date
-        today = date.today()
-        
-        cdic_stats = {
-            'total': var_cdic_list.count(),
-            'completed': var_cdic_list.filter(next_appointment_date__isnull=True).count(),
-            'pending': var_cdic_list.filter(
-                next_appointment_date__isnull=False,
-                next_appointment_date__gte=today
-            ).count(),
-            'this_week': var_cdic_list.filter(
-                assessment_date__gte=today - timedelta(days=7)
-            ).count(),
-        }
+        cdic_stats = CDIC_STATS.compute(var_cdic_list)
         
         # Pagination
-        paginator = Paginator(var_cdic_list, 15)
-        page_number = request.GET.get("page")
-        cdic_record_list = paginator.get_page(page_number)
+        var_cdic_list = Bookmark.annotate_bookmark_ids(
+            var_cdic_list, "CDICR", request.user
+        )
+        cdic_record_list = paginate(request, var_cdic_list, 15)
+        Patient.prime_ages(record.patient for record in cdic_record_list)
         
         context = {
             "cdic_record_list": cdic_record_list,
@@ -1793,7 +1859,7 @@ def cdic_assessment_manager_by_patients(request, pid):
             return redirect("manage-patients")
         
         # Get CDIC records for this patient
-        var_cdic_list = CDICRecord.objects.select_related('patient', 'created_by', 'edit_by').filter(patient=sp.id).order_by("-id")
+        var_cdic_list = CDICRecord.objects.select_related('patient', 'added_by', 'last_edit_by').filter(patient=sp.id).order_by("-id")
         
         # Search and filter functionality (same as general manager but for specific patient)
         date_range = request.GET.get('date_range', '')
@@ -1803,11 +1869,11 @@ def cdic_assessment_manager_by_patients(request, pid):
         # Apply filters
         if created_by:
             var_cdic_list = var_cdic_list.filter(
-                created_by__username__icontains=created_by
+                added_by__username__icontains=created_by
             )
         
         if date_range:
-            from datetime import datetime, timedelta
+            from datetime import datetime
             from django.utils import timezone
             
             now = timezone.now()
@@ -1847,25 +1913,13 @@ def cdic_assessment_manager_by_patients(request, pid):
                 )
         
         # Calculate statistics for this patient
-        from datetime import date
-        today = date.today()
-        
-        cdic_stats = {
-            'total': var_cdic_list.count(),
-            'completed': var_cdic_list.filter(next_appointment_date__isnull=True).count(),
-            'pending': var_cdic_list.filter(
-                next_appointment_date__isnull=False,
-                next_appointment_date__gte=today
-            ).count(),
-            'this_week': var_cdic_list.filter(
-                assessment_date__gte=today - timedelta(days=7)
-            ).count(),
-        }
+        cdic_stats = CDIC_STATS.compute(var_cdic_list)
         
         # Pagination
-        paginator = Paginator(var_cdic_list, 15)
-        page_number = request.GET.get("page")
-        cdic_record_list = paginator.get_page(page_number)
+        var_cdic_list = Bookmark.annotate_bookmark_ids(
+            var_cdic_list, "CDICR", request.user
+        )
+        cdic_record_list = paginate(request, var_cdic_list, 15)
         
         context = {
             "patient": sp,
@@ -2029,7 +2083,6 @@ def hine_assessment_manager(request):
         
         # Apply date range filters
         if date_range:
-            from datetime import timedelta
             from django.utils import timezone
             
             now = timezone.now()
@@ -2047,17 +2100,13 @@ def hine_assessment_manager(request):
                 var_hine_list = var_hine_list.filter(date_of_assessment__gte=start_date)
         
         # Calculate statistics
-        hine_stats = {
-            'total': var_hine_list.count(),
-            'normal': var_hine_list.filter(score__gte=60).count(),
-            'moderate': var_hine_list.filter(score__gte=40, score__lt=60).count(),
-            'significant': var_hine_list.filter(score__lt=40).count(),
-        }
+        hine_stats = HINE_STATS.compute(var_hine_list)
         
         # Pagination
-        paginator = Paginator(var_hine_list, 15)  # Increased page size
-        page_number = request.GET.get("page")
-        hine_record_list = paginator.get_page(page_number)
+        var_hine_list = Bookmark.annotate_bookmark_ids(
+            var_hine_list, "HINE", request.user
+        )
+        hine_record_list = paginate(request, var_hine_list, 15)
         
         context = {
             "patient": None,
@@ -2109,7 +2158,7 @@ def hine_assessment_manager_by_patients(request, pid):
                 var_hine_list = var_hine_list.filter(score__lt=40)
         
         if date_range:
-            from datetime import datetime, timedelta
+            from datetime import datetime
             from django.utils import timezone
             
             now = timezone.now()
@@ -2127,17 +2176,13 @@ def hine_assessment_manager_by_patients(request, pid):
                 var_hine_list = var_hine_list.filter(date_of_assessment__gte=start_date)
         
         # Calculate statistics for this patient
-        hine_stats = {
-            'total': var_hine_list.count(),
-            'normal': var_hine_list.filter(score__gte=60).count(),
-            'moderate': var_hine_list.filter(score__gte=40, score__lt=60).count(),
-            'significant': var_hine_list.filter(score__lt=40).count(),
-        }
+        hine_stats = HINE_STATS.compute(var_hine_list)
         
         # Pagination
-        paginator = Paginator(var_hine_list, 15)
-        page_number = request.GET.get("page")
-        hine_record_list = paginator.get_page(page_number)
+        var_hine_list = Bookmark.annotate_bookmark_ids(
+            var_hine_list, "HINE", request.user
+        )
+        hine_record_list = paginate(request, var_hine_list, 15)
         
         context = {
             "patient": sp,
@@ -2269,6 +2314,28 @@ def da_assessment_view(request, da_id):
     return render(request, "develop_assemnt/view.html", {"DARecord": sdar})
 
 
+def filter_by_assessment_age(queryset, min_age, max_age):
+    """Keep assessments whose age at assessment is within [min_age, max_age] months"""
+    low, high = month_band_days(min_age, max_age)
+    queryset = queryset.filter(
+        age_days_at_assessment__gte=low, age_days_at_assessment__lt=high
+    )
+    # Only ages near the band edges can differ in calendar months
+    edge = 2 * MONTH_BAND_SLACK_DAYS
+    rows = list(
+        queryset.filter(
+            Q(age_days_at_assessment__lt=low + edge)
+            | Q(age_days_at_assessment__gte=high - edge)
+        ).values_list("id", "patient__dob_tob", queryset.model.AGE_REFERENCE_FIELD)
+    )
+    if not rows:
+        return queryset
+    ids, dobs, assessed_on = zip(*rows)
+    age_months = completed_months(dobs, assessed_on)
+    outside = ~((age_months >= min_age) & (age_months <= max_age))
+    return queryset.exclude(id__in=[ids[i] for i in np.flatnonzero(outside)])
+
+
 @login_required(login_url="user-login")
 def da_assessment_manager(request):
     try:
@@ -2299,7 +2366,7 @@ def da_assessment_manager(request):
             elif development_status == 'delayed':
                 var_da_list = var_da_list.filter(is_dx_normal=False)
         
-        # Apply age range filters (assuming getAssessmentAgeInMonths method exists)
+        # Apply age range filters
         if age_range:
             age_ranges = {
                 '0-6': (0, 6),
@@ -2311,20 +2378,7 @@ def da_assessment_manager(request):
             }
             if age_range in age_ranges:
                 min_age, max_age = age_ranges[age_range]
-                # This would require a custom filter or database function
-                # For now, we'll filter in Python (not ideal for large datasets)
-                filtered_ids = []
-                for record in var_da_list:
-                    try:
-                        age_months = record.getAssessmentAgeInMonths
-                        if isinstance(age_months, str):
-                            # Extract numeric value if it's a string like "12 months"
-                            age_months = int(''.join(filter(str.isdigit, age_months)))
-                        if min_age <= age_months <= max_age:
-                            filtered_ids.append(record.id)
-                    except (ValueError, AttributeError):
-                        continue
-                var_da_list = var_da_list.filter(id__in=filtered_ids)
+                var_da_list = filter_by_assessment_age(var_da_list, min_age, max_age)
         
         # Apply date range filters
         if date_range:
@@ -2346,19 +2400,14 @@ def da_assessment_manager(request):
                 var_da_list = var_da_list.filter(date_of_assessment__gte=start_date)
         
         # Calculate statistics
-        da_stats = {
-            'total': var_da_list.count(),
-            'normal': var_da_list.filter(is_dx_normal=True).count(),
-            'delayed': var_da_list.filter(is_dx_normal=False).count(),
-            'this_month': var_da_list.filter(
-                date_of_assessment__gte=timezone.now() - timedelta(days=30)
-            ).count(),
-        }
+        da_stats = DA_STATS.compute(var_da_list)
         
         # Pagination
-        paginator = Paginator(var_da_list, 15)
-        page_number = request.GET.get("page")
-        da_record_list = paginator.get_page(page_number)
+        var_da_list = Bookmark.annotate_bookmark_ids(
+            var_da_list, "DA", request.user
+        )
+        da_record_list = paginate(request, var_da_list, 15)
+        Patient.prime_ages(record.patient for record in da_record_list)
         
         context = {
             "patient": None,
@@ -2420,17 +2469,7 @@ def da_assessment_manager_by_patients(request, pid):
             }
             if age_range in age_ranges:
                 min_age, max_age = age_ranges[age_range]
-                filtered_ids = []
-                for record in var_da_list:
-                    try:
-                        age_months = record.getAssessmentAgeInMonths
-                        if isinstance(age_months, str):
-                            age_months = int(''.join(filter(str.isdigit, age_months)))
-                        if min_age <= age_months <= max_age:
-                            filtered_ids.append(record.id)
-                    except (ValueError, AttributeError):
-                        continue
-                var_da_list = var_da_list.filter(id__in=filtered_ids)
+                var_da_list = filter_by_assessment_age(var_da_list, min_age, max_age)
         
         # Apply date range filters
         if date_range:
@@ -2452,19 +2491,13 @@ def da_assessment_manager_by_patients(request, pid):
                 var_da_list = var_da_list.filter(date_of_assessment__gte=start_date)
         
         # Calculate statistics for this patient
-        da_stats = {
-            'total': var_da_list.count(),
-            'normal': var_da_list.filter(is_dx_normal=True).count(),
-            'delayed': var_da_list.filter(is_dx_normal=False).count(),
-            'this_month': var_da_list.filter(
-                date_of_assessment__gte=timezone.now() - timedelta(days=30)
-            ).count(),
-        }
+        da_stats = DA_STATS.compute(var_da_list)
         
         # Pagination
-        paginator = Paginator(var_da_list, 15)
-        page_number = request.GET.get("page")
-        da_record_list = paginator.get_page(page_number)
+        var_da_list = Bookmark.annotate_bookmark_ids(
+            var_da_list, "DA", request.user
+        )
+        da_record_list = paginate(request, var_da_list, 15)
         
         context = {
             "patient": sp,
@@ -0,0 +1,126 @@
+/**
+ * patient-autocomplete.js - Typeahead for patient names and identifiers
+ * Part of NDAS (Neonatal Development Assessment System)
+ *
+ * Any input with a data-patient-autocomplete="<endpoint url>" attribute gets a
+ * suggestion list fed by the JSON autocomplete endpoint. Choosing a suggestion
+ * opens the patient; Enter without a selection submits the form as usual.
+ */
+
+(function () {
+    'use strict';
+
+    const DEBOUNCE_MS = 150;
+    const MIN_CHARS = 2;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function describe(patient) {
+        const ids = [];
+        if (patient.bht) ids.push('BHT ' + patient.bht);
+        if (patient.nnc_no) ids.push('NNC ' + patient.nnc_no);
+        if (patient.pin) ids.push('PIN ' + patient.pin);
+        if (patient.dob) ids.push('DOB ' + patient.dob);
+        return ids.join(' · ');
+    }
+
+    function attach(input) {
+        const endpoint = input.dataset.patientAutocomplete;
+        const list = document.createElement('div');
+        list.className = 'list-group shadow patient-autocomplete';
+        list.style.cssText = 'position:absolute;z-index:1050;display:none;min-width:280px;';
+        input.parentNode.style.position = input.parentNode.style.position || 'relative';
+        input.parentNode.appendChild(list);
+        input.setAttribute('autocomplete', 'off');
+
+        let timer = null;
+        let controller = null;
+        let active = -1;
+
+        function hide() {
+            list.style.display = 'none';
+            list.innerHTML = '';
+            active = -1;
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('.list-group-item');
+            items.forEach(function (item, i) {
+                item.classList.toggle('active', i === index);
+            });
+            active = index;
+        }
+
+        function render(results) {
+            if (!results.length) {
+                hide();
+                return;
+            }
+            list.innerHTML = results.map(function (patient) {
+                return '<a href="' + escapeHtml(patient.url) + '" class="list-group-item list-group-item-action py-1">' +
+                    '<div>' + escapeHtml(patient.baby_name) +
+                    ' <small class="text-muted">(' + escapeHtml(patient.mother_name) + ')</small></div>' +
+                    '<small class="text-muted">' + escapeHtml(describe(patient)) + '</small></a>';
+            }).join('');
+            list.style.top = (input.offsetTop + input.offsetHeight) + 'px';
+            list.style.left = input.offsetLeft + 'px';
+            list.style.display = 'block';
+            active = -1;
+        }
+
+        function lookup() {
+            const text = input.value.trim();
+            if (text.length < MIN_CHARS) {
+                hide();
+                return;
+            }
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(endpoint + '?q=' + encodeURIComponent(text), {
+                headers: { 'Accept': 'application/json' },
+                credentials: 'same-origin',
+                signal: controller.signal
+            })
+                .then(function (response) { return response.ok ? response.json() : { results: [] }; })
+                .then(function (data) { render(data.results || []); })
+                .catch(function (error) {
+                    if (error.name !== 'AbortError') hide();
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(lookup, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', function (event) {
+            const items = list.querySelectorAll('.list-group-item');
+            if (!items.length) return;
+            if (event.key === 'ArrowDown') {
+                event.preventDefault();
+                highlight((active + 1) % items.length);
+            } else if (event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight((active - 1 + items.length) % items.length);
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                window.location.href = items[active].getAttribute('href');
+            } else if (event.key === 'Escape') {
+                hide();
+            }
+        });
+
+        input.addEventListener('blur', function () {
+            // Let a click on a suggestion land before the list goes away
+            setTimeout(hide, 200);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-patient-autocomplete]').forEach(attach);
+    });
+})();
@@ -0,0 +1,100 @@
+/**
+ * patient-timeline.js - Merged event feed on the patient page
+ * Part of NDAS (Neonatal Development Assessment System)
+ *
+ * A container with data-patient-timeline="<endpoint url>" shows the newest
+ * events as soon as the page loads; older pages are fetched with the cursor
+ * the endpoint returns whenever the end of the list scrolls into view.
+ */
+
+(function () {
+    'use strict';
+
+    const ICONS = {
+        Video: 'fas fa-play-circle',
+        Attachment: 'fas fa-paperclip',
+        GMA: 'fas fa-child',
+        HINE: 'fas fa-stethoscope',
+        DA: 'fas fa-chart-line',
+        CDICR: 'fas fa-notes-medical'
+    };
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function formatDate(value) {
+        const date = new Date(value);
+        return isNaN(date) ? '' : date.toLocaleString();
+    }
+
+    function row(event) {
+        const summary = escapeHtml(event.summary);
+        const label = event.url
+            ? '<a href="' + escapeHtml(event.url) + '">' + summary + '</a>'
+            : summary;
+        return '<li class="list-group-item py-2">' +
+            '<i class="' + (ICONS[event.type] || 'fas fa-circle') + ' mr-2 text-muted"></i>' + label +
+            '<small class="text-muted float-right">' + escapeHtml(formatDate(event.date)) + '</small></li>';
+    }
+
+    function attach(container) {
+        const endpoint = container.dataset.patientTimeline;
+        const list = container.querySelector('[data-timeline-events]');
+        const status = container.querySelector('[data-timeline-status]');
+        let cursor = null;
+        let loading = false;
+        let done = false;
+        let observer = null;
+
+        function load() {
+            if (loading || done) return;
+            loading = true;
+            status.textContent = 'Loading...';
+            const url = endpoint + (cursor ? '?cursor=' + encodeURIComponent(cursor) : '');
+            fetch(url, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+                .then(function (response) {
+                    if (!response.ok) throw new Error(response.statusText);
+                    return response.json();
+                })
+                .then(function (data) {
+                    list.insertAdjacentHTML('beforeend', (data.events || []).map(row).join(''));
+                    cursor = data.next;
+                    done = !cursor;
+                    if (done) {
+                        status.textContent = list.children.length ? '' : 'No events recorded for this patient.';
+                        if (observer) observer.disconnect();
+                    } else {
+                        status.textContent = '';
+                        // Re-arm: fires again at once if the end is still in view
+                        if (observer) {
+                            observer.unobserve(status);
+                            observer.observe(status);
+                        }
+                    }
+                })
+                .catch(function () {
+                    status.textContent = 'Could not load the timeline.';
+                })
+                .finally(function () {
+                    loading = false;
+                });
+        }
+
+        load();
+        if ('IntersectionObserver' in window) {
+            observer = new IntersectionObserver(function (entries) {
+                if (entries.some(function (entry) { return entry.isIntersecting; })) load();
+            });
+            observer.observe(status);
+        } else {
+            status.addEventListener('click', load);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-patient-timeline]').forEach(attach);
+    });
+})();
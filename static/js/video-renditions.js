@@ -0,0 +1,86 @@
+/**
+ * video-renditions.js - Play the smallest rendition that fits the player
+ * Part of NDAS (Neonatal Development Assessment System)
+ *
+ * A <video data-video-sources="<json_script id>"> lists its sources (the
+ * original and the transcoded renditions, each with width, height and size).
+ * Before playback starts the player switches to the smallest source that
+ * still covers the player's on-screen size at the device pixel ratio, or to
+ * the smallest of all when the browser asks to save data.
+ *
+ * When the list has an HLS master playlist (long recordings) that is played
+ * instead: natively where the browser supports HLS (Safari), otherwise via
+ * Video.js, whose HTTP streaming picks the variant from measured bandwidth.
+ */
+
+(function () {
+    'use strict';
+
+    const SLOW_CONNECTIONS = ['slow-2g', '2g', '3g'];
+    const HLS_TYPE = 'application/x-mpegURL';
+
+    function saveData() {
+        const connection = navigator.connection;
+        return !!connection && (connection.saveData || SLOW_CONNECTIONS.indexOf(connection.effectiveType) !== -1);
+    }
+
+    function playerBox(video) {
+        const ratio = window.devicePixelRatio || 1;
+        const maxHeight = parseFloat(window.getComputedStyle(video).maxHeight) || window.innerHeight;
+        return {
+            width: (video.clientWidth || window.innerWidth) * ratio,
+            height: Math.min(maxHeight, window.innerHeight) * ratio
+        };
+    }
+
+    function covers(source, box) {
+        if (!source.width || !source.height) return true;
+        // Scale at which the source fits the box; above 1 it would be upscaled
+        const scale = Math.min(box.width / source.width, box.height / source.height);
+        return scale <= 1;
+    }
+
+    function playHls(video, source) {
+        if (video.canPlayType('application/vnd.apple.mpegurl')) {
+            video.src = source.src;
+            video.load();
+        } else if (window.videojs && window.MediaSource && video.id) {
+            videojs(video, { fluid: true }).src({ src: source.src, type: HLS_TYPE });
+        } else {
+            return false;
+        }
+        video.dataset.quality = source.quality;
+        return true;
+    }
+
+    function pick(sources, video) {
+        const known = sources.filter(function (source) { return source.size && source.type !== HLS_TYPE; });
+        if (!known.length) return null;
+        known.sort(function (a, b) { return a.size - b.size; });
+        if (saveData()) return known[0];
+        const box = playerBox(video);
+        return known.find(function (source) { return covers(source, box); }) || known[known.length - 1];
+    }
+
+    function attach(video) {
+        const data = document.getElementById(video.dataset.videoSources);
+        if (!data) return;
+        let sources;
+        try {
+            sources = JSON.parse(data.textContent);
+        } catch (error) {
+            return;
+        }
+        const stream = sources.find(function (source) { return source.type === HLS_TYPE; });
+        if (stream && playHls(video, stream)) return;
+        const choice = pick(sources, video);
+        if (!choice || video.currentSrc === new URL(choice.src, window.location.href).href) return;
+        video.src = choice.src;
+        video.dataset.quality = choice.quality;
+        video.load();
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('video[data-video-sources]').forEach(attach);
+    });
+})();
@@ -0,0 +1,68 @@
+/**
+ * video-scrub-preview.js - Sprite sheet previews while scrubbing a video
+ * Part of NDAS (Neonatal Development Assessment System)
+ *
+ * A <video> with a <track kind="metadata" label="thumbnails"> (WebVTT cues
+ * whose text is "<sprite url>#xywh=x,y,w,h") shows the tile for the time
+ * under the pointer while it moves over the bottom of the player, where the
+ * progress bar is. Only the small sprite sheet is fetched, never the video.
+ */
+
+(function () {
+    'use strict';
+
+    const CONTROLS_HEIGHT = 48;
+    const XYWH = /^(.*)#xywh=(\d+),(\d+),(\d+),(\d+)$/;
+
+    function cueAt(cues, time) {
+        for (let i = 0; i < cues.length; i++) {
+            if (cues[i].startTime <= time && time < cues[i].endTime) return cues[i];
+        }
+        return null;
+    }
+
+    function attach(video) {
+        const trackElement = video.querySelector('track[kind="metadata"][label="thumbnails"]');
+        if (!trackElement) return;
+        const track = trackElement.track;
+        track.mode = 'hidden';  // load the cues without rendering them
+
+        const preview = document.createElement('div');
+        preview.className = 'video-scrub-preview border rounded shadow-sm';
+        preview.style.cssText = 'position:absolute;display:none;pointer-events:none;background-repeat:no-repeat;z-index:10;';
+        video.parentNode.style.position = 'relative';
+        video.parentNode.appendChild(preview);
+
+        video.addEventListener('mousemove', function (event) {
+            const box = video.getBoundingClientRect();
+            if (!video.duration || !track.cues || box.bottom - event.clientY > CONTROLS_HEIGHT) {
+                preview.style.display = 'none';
+                return;
+            }
+            const fraction = Math.min(Math.max((event.clientX - box.left) / box.width, 0), 1);
+            const cue = cueAt(track.cues, fraction * video.duration);
+            const match = cue && XYWH.exec(cue.text.trim());
+            if (!match) {
+                preview.style.display = 'none';
+                return;
+            }
+            const width = parseInt(match[4], 10);
+            const height = parseInt(match[5], 10);
+            const left = Math.min(Math.max(event.clientX - box.left - width / 2, 0), box.width - width);
+            preview.style.width = width + 'px';
+            preview.style.height = height + 'px';
+            preview.style.left = left + video.offsetLeft + 'px';
+            preview.style.top = video.offsetTop + box.height - CONTROLS_HEIGHT - height - 4 + 'px';
+            preview.style.backgroundImage = 'url("' + match[1] + '")';
+            preview.style.backgroundPosition = '-' + match[2] + 'px -' + match[3] + 'px';
+            preview.style.display = 'block';
+        });
+        video.addEventListener('mouseleave', function () {
+            preview.style.display = 'none';
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('video').forEach(attach);
+    });
+})();
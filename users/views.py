@@ -1,7 +1,11 @@
 from django.shortcuts import render
 from users.models import CustomUser, UserActivityLog, UserSession
 from django.contrib.auth import authenticate, login, logout
-from ndas.custom_codes.custom_methods import getCurrentDateTime, getFullDeviceDetails
+from ndas.custom_codes.custom_methods import (
+    getCurrentDateTime,
+    getFullDeviceDetails,
+    get_userStats,
+)
 from django.contrib import messages
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
@@ -464,6 +468,11 @@ def admin_dashboard(request):
     # Get recently added users (last 5)
     recent_users = CustomUser.objects.order_by('-date_joined')[:5]
     
+    # Per-user contributions for the selected window (30 or 90 days, or all time)
+    window = request.GET.get('window', '30')
+    contribution_window = int(window) if window in ('30', '90') else None
+    contribution_stats = get_userStats(days=contribution_window)
+    
     context = {
         'total_users': total_users,
         'active_users': active_users,
@@ -471,6 +480,8 @@ def admin_dashboard(request):
         'recent_logins': recent_logins,
         'recent_activities': recent_activities,
         'recent_users': recent_users,
+        'contribution_window': contribution_window,
+        'contribution_stats': contribution_stats,
     }
     
     return render(request, 'users/admin/admin_dashboard.html', context)
@@ -0,0 +1,129 @@
+"""
+HLS packaging of video renditions.
+
+Recordings of at least ``VIDEO_HLS_MIN_DURATION`` seconds get each rendition
+remuxed (no re-encode) into fMP4 HLS: an init segment, segments of about
+``VIDEO_HLS_SEGMENT_SECONDS`` (renditions have keyframes on those boundaries)
+and a VOD media playlist. They are stored next to the video, under
+``videos/YYYY/MM/hls/<video id>/<quality>/``. Players fetch only the segments
+around the point they seek to.
+
+The master playlist is built per request from the renditions that have been
+segmented (``master_playlist``). Playlists and segments are served by the
+access-checked ``video:hls`` views, so relative segment URLs resolve there.
+"""
+
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+from ndas.custom_codes.video_probe import local_path
+from video.transcode import RENDITION_PROFILES, TranscodeError, run_ffmpeg
+
+PLAYLIST = "index.m3u8"
+CONTENT_TYPE = "application/vnd.apple.mpegurl"
+_SEGMENT_NAME = re.compile(r"^[\w-]+\.(m3u8|m4s|mp4)$")
+
+
+def wanted(video):
+    """Whether ``video`` is long enough to be worth segmenting"""
+    minimum = settings.VIDEO_HLS_MIN_DURATION
+    return bool(minimum) and (video.duration_seconds or 0) >= minimum
+
+
+def rendition_dir(rendition):
+    video = rendition.video
+    return os.path.join(
+        os.path.dirname(video.video_file.name), "hls", str(video.pk), rendition.quality
+    )
+
+
+def segment_name(rendition, name):
+    """Storage name of a playlist or segment file, None when not a valid one"""
+    if not rendition.hls_playlist or not _SEGMENT_NAME.match(name):
+        return None
+    return os.path.join(os.path.dirname(rendition.hls_playlist), name)
+
+
+def ffmpeg_command(source, workdir):
+    return [
+        settings.FFMPEG_BINARY,
+        "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-i", source,
+        "-map", "0",
+        "-c", "copy",
+        "-f", "hls",
+        "-hls_time", str(settings.VIDEO_HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(workdir, "seg_%05d.m4s"),
+        os.path.join(workdir, PLAYLIST),
+    ]  # fmt: skip
+
+
+def _delete_dir(storage, directory):
+    try:
+        _subdirs, files = storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        storage.delete(os.path.join(directory, name))
+
+
+def delete_segments(rendition):
+    if rendition.hls_playlist:
+        _delete_dir(rendition.file.storage, os.path.dirname(rendition.hls_playlist))
+
+
+def segment_rendition(rendition):
+    """(Re)package one rendition as HLS and record its playlist"""
+    storage = rendition.file.storage
+    directory = rendition_dir(rendition)
+    with local_path(rendition.file) as source, tempfile.TemporaryDirectory() as workdir:
+        run_ffmpeg(ffmpeg_command(source, workdir))
+        if not os.path.exists(os.path.join(workdir, PLAYLIST)):
+            raise TranscodeError("ffmpeg wrote no HLS playlist")
+
+        delete_segments(rendition)
+        _delete_dir(storage, directory)
+        # The playlist goes last, so it never lists a segment not yet stored
+        names = sorted(os.listdir(workdir), key=lambda name: name == PLAYLIST)
+        for name in names:
+            target = os.path.join(directory, name)
+            with open(os.path.join(workdir, name), "rb") as handle:
+                stored = storage.save(target, File(handle))
+            if stored != target:
+                # The playlist refers to segments by their exact names
+                storage.delete(stored)
+                raise TranscodeError(f"Storage renamed {target} to {stored}")
+
+    rendition.hls_playlist = os.path.join(directory, PLAYLIST)
+    rendition.save(update_fields=["hls_playlist", "updated_at"])
+    return rendition.hls_playlist
+
+
+def master_playlist(renditions):
+    """Master playlist text for the segmented ``renditions``, lowest first"""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    variants = []
+    for rendition in renditions:
+        if not rendition.hls_playlist:
+            continue
+        profile = RENDITION_PROFILES.get(rendition.quality, {})
+        average = (rendition.bitrate_kbps or 0) * 1000
+        peak = max(
+            average,
+            (profile.get("maxrate_kbps", 0) + profile.get("audio_kbps", 0)) * 1000,
+        )
+        attributes = f"BANDWIDTH={peak},RESOLUTION={rendition.width}x{rendition.height}"
+        if average:
+            attributes += f",AVERAGE-BANDWIDTH={average}"
+        variants.append((peak, attributes, f"{rendition.quality}/{PLAYLIST}"))
+    for _peak, attributes, uri in sorted(variants):
+        lines += [f"#EXT-X-STREAM-INF:{attributes}", uri]
+    return "\n".join(lines) + "\n" if variants else None
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from video.models import Video
+from video import hls
+from video.tasks import run_segmenting, run_transcoding, submit_transcoding
+from video.transcode import qualities_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcode the missing renditions of processed videos, e.g. for "
+        "videos uploaded before renditions existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--video",
+            type=int,
+            action="append",
+            help="Only this video (repeatable)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Transcode every tier again, not only the missing ones",
+        )
+        parser.add_argument(
+            "--hls",
+            action="store_true",
+            help="Also package existing renditions of long videos as HLS",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Hand the jobs to the background workers instead of "
+            "transcoding here",
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(processing_status="completed").order_by("pk")
+        if options["video"]:
+            videos = videos.filter(pk__in=options["video"])
+        jobs = 0
+        for video in videos.prefetch_related("renditions"):
+            existing = {rendition.quality for rendition in video.renditions.all()}
+            qualities = [
+                quality
+                for quality in qualities_for(video)
+                if options["rebuild"] or quality not in existing
+            ]
+            if options["queue"]:
+                submit_transcoding(video, qualities)
+            else:
+                for quality in qualities:
+                    run_transcoding(video.pk, quality)
+            jobs += len(qualities)
+            if options["hls"] and hls.wanted(video):
+                for rendition in video.renditions.all():
+                    if rendition.quality not in qualities and not rendition.hls_playlist:
+                        run_segmenting(rendition)
+        verb = "Queued" if options["queue"] else "Ran"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {jobs} transcoding job(s)"))
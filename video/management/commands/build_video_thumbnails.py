@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from video.models import Video
+from video.tasks import run_thumbnails, submit_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the poster, sprite sheet and thumbnail track of processed "
+        "videos that have none, e.g. videos uploaded before previews existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--video",
+            type=int,
+            action="append",
+            help="Only this video (repeatable)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Build the previews again, not only the missing ones",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Hand the jobs to the background workers instead of " "building here",
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(processing_status="completed").order_by("pk")
+        if options["video"]:
+            videos = videos.filter(pk__in=options["video"])
+        if not options["rebuild"]:
+            videos = videos.filter(poster="")
+        jobs = 0
+        for video in videos.only("pk"):
+            if options["queue"]:
+                submit_thumbnails(video)
+            else:
+                run_thumbnails(video.pk)
+            jobs += 1
+        verb = "Queued" if options["queue"] else "Ran"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {jobs} thumbnail job(s)"))
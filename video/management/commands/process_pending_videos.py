@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from video.models import Video
+from video.tasks import process_video_with_retries, submit
+
+
+class Command(BaseCommand):
+    help = (
+        "Process videos still waiting for ffprobe: uploads from before the "
+        "background pipeline, or jobs lost to a restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Also retry videos that failed (e.g. once ffprobe is installed)",
+        )
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=None,
+            help="Requeue videos stuck in processing for longer than this",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Hand the videos to the background workers instead of "
+            "processing them here",
+        )
+
+    def handle(self, *args, **options):
+        if options["stale_minutes"] is not None:
+            cutoff = timezone.now() - timedelta(minutes=options["stale_minutes"])
+            stale = Video.objects.filter(
+                processing_status="processing", updated_at__lt=cutoff
+            ).update(processing_status="pending")
+            self.stdout.write(f"Requeued {stale} stale video(s)")
+
+        statuses = ["pending", "failed"] if options["failed"] else ["pending"]
+        video_ids = list(
+            Video.objects.filter(processing_status__in=statuses)
+            .order_by("created_at")
+            .values_list("pk", flat=True)
+        )
+        outcomes = {}
+        for video_id in video_ids:
+            if options["queue"]:
+                submit(video_id)
+                outcome = "queued"
+            else:
+                outcome = process_video_with_retries(video_id) or "skipped"
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        summary = ", ".join(f"{n} {outcome}" for outcome, n in outcomes.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(video_ids)} video(s): {summary or 'none'}")
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("video", "0003_alter_video_processing_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Chronological age in days on the assessment date",
+                null=True,
+                verbose_name="Age at Assessment (days)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="corrected_age_days_at_assessment",
+            field=models.IntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Age corrected for prematurity, in days, on the assessment date",
+                null=True,
+                verbose_name="Corrected Age at Assessment (days)",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("video", "0004_video_assessment_age_days"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="assessed",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Whether a GM assessment has been recorded for this video",
+                verbose_name="Assessed",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="video",
+            index=models.Index(
+                fields=["assessed", "-created_at"],
+                name="video_video_assesse_1915ca_idx",
+            ),
+        ),
+    ]
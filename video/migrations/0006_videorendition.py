@@ -0,0 +1,102 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import ndas.custom_codes.custom_methods
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("video", "0005_video_assessed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="When this record was created",
+                        verbose_name="Created At",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="When this record was last updated",
+                        verbose_name="Updated At",
+                    ),
+                ),
+                (
+                    "quality",
+                    models.CharField(
+                        choices=[
+                            ("original", "Original Quality"),
+                            ("high", "High Quality (1080p)"),
+                            ("medium", "Medium Quality (720p)"),
+                            ("low", "Low Quality (480p)"),
+                            ("mobile", "Mobile Quality (360p)"),
+                        ],
+                        max_length=20,
+                        verbose_name="Quality",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to=ndas.custom_codes.custom_methods.get_compressed_video_path,
+                        verbose_name="Rendition File",
+                    ),
+                ),
+                ("width", models.PositiveSmallIntegerField(verbose_name="Width")),
+                ("height", models.PositiveSmallIntegerField(verbose_name="Height")),
+                (
+                    "file_size_bytes",
+                    models.PositiveBigIntegerField(verbose_name="File Size (bytes)"),
+                ),
+                (
+                    "bitrate_kbps",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Bitrate (kbps)"
+                    ),
+                ),
+                (
+                    "has_audio",
+                    models.BooleanField(default=False, verbose_name="Has Audio"),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="video.video",
+                        verbose_name="Video",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Video Rendition",
+                "verbose_name_plural": "Video Renditions",
+                "ordering": ["video", "height"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="videorendition",
+            constraint=models.UniqueConstraint(
+                fields=("video", "quality"), name="unique_rendition_per_quality"
+            ),
+        ),
+    ]
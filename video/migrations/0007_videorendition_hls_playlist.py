@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-17 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("video", "0006_videorendition"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videorendition",
+            name="hls_playlist",
+            field=models.CharField(
+                blank=True, default="", max_length=255, verbose_name="HLS Playlist"
+            ),
+        ),
+    ]
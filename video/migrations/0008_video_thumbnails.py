@@ -0,0 +1,47 @@
+# Generated by Django 4.2.16 on 2026-10-17 05:05
+
+from django.db import migrations, models
+import ndas.custom_codes.custom_methods
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("video", "0007_videorendition_hls_playlist"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="poster",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                help_text="Still frame shown before playback and in lists",
+                upload_to=ndas.custom_codes.custom_methods.get_video_thumbnail_path,
+                verbose_name="Poster",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="sprite_sheet",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                help_text="Tiled frames shown while scrubbing",
+                upload_to=ndas.custom_codes.custom_methods.get_video_thumbnail_path,
+                verbose_name="Sprite Sheet",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="thumbnail_track",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                help_text="WebVTT track mapping playback times to sprite tiles",
+                upload_to=ndas.custom_codes.custom_methods.get_video_thumbnail_path,
+                verbose_name="Thumbnail Track",
+            ),
+        ),
+    ]
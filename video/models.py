@@ -1,3 +1,4 @@
+import hashlib
 import os
 from datetime import timedelta
 from django.db import models
@@ -6,12 +7,25 @@ from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.utils.html import format_html
-from ndas.custom_codes.Custom_abstract_class import TimeStampedModel, UserTrackingMixin
+from ndas.custom_codes.Custom_abstract_class import (
+    AssessmentAgeMixin,
+    CountedRecordMixin,
+    TimeStampedModel,
+    UserTrackingMixin,
+)
+from ndas.custom_codes.ages import age_ymd
 from ndas.custom_codes.validators import validate_video_file, validate_recording_date
         
-from ndas.custom_codes.choice import PROCESSING_STATUS
+from ndas.custom_codes.choice import PROCESSING_STATUS, QUALITY_CHOICES
+from ndas.custom_codes.custom_methods import (
+    get_compressed_video_path,
+    get_video_thumbnail_path,
+)
+from patients.counters import VIDEO_COUNTER_FIELDS, fields_to_save
 
-class Video(TimeStampedModel, UserTrackingMixin):
+class Video(
+    TimeStampedModel, UserTrackingMixin, AssessmentAgeMixin, CountedRecordMixin
+):
     """
     Video model for storing patient video records with comprehensive metadata.
     
@@ -107,6 +121,31 @@ class Video(TimeStampedModel, UserTrackingMixin):
         verbose_name=_("Height"),
         help_text=_("Video height in pixels"),
     )
+
+    # Previews built after processing (see video.thumbnails)
+    poster = models.ImageField(
+        upload_to=get_video_thumbnail_path,
+        blank=True,
+        editable=False,
+        verbose_name=_("Poster"),
+        help_text=_("Still frame shown before playback and in lists"),
+    )
+
+    sprite_sheet = models.ImageField(
+        upload_to=get_video_thumbnail_path,
+        blank=True,
+        editable=False,
+        verbose_name=_("Sprite Sheet"),
+        help_text=_("Tiled frames shown while scrubbing"),
+    )
+
+    thumbnail_track = models.FileField(
+        upload_to=get_video_thumbnail_path,
+        blank=True,
+        editable=False,
+        verbose_name=_("Thumbnail Track"),
+        help_text=_("WebVTT track mapping playback times to sprite tiles"),
+    )
     
     # Medical assessment flags
     is_assessment_ready = models.BooleanField(
@@ -116,6 +155,19 @@ class Video(TimeStampedModel, UserTrackingMixin):
         db_index=True,
     )
 
+    # Counter-cache flag, maintained in SQL (see patients.counters)
+    assessed = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Assessed"),
+        help_text=_("Whether a GM assessment has been recorded for this video"),
+    )
+
+    # The stored ages are measured on the recording date
+    AGE_REFERENCE_FIELD = "recorded_on"
+
+    THUMBNAIL_FIELDS = ("poster", "sprite_sheet", "thumbnail_track")
+
     class Meta:
         verbose_name = _("Video")
         verbose_name_plural = _("Videos")
@@ -126,6 +178,7 @@ class Video(TimeStampedModel, UserTrackingMixin):
             models.Index(fields=['patient', '-recorded_on']),
             models.Index(fields=['processing_status', '-created_at']),
             models.Index(fields=['is_assessment_ready', '-recorded_on']),
+            models.Index(fields=['assessed', '-created_at']),
         ]
         
         # Ensure no duplicate videos for same patient at same time
@@ -172,6 +225,8 @@ class Video(TimeStampedModel, UserTrackingMixin):
         
         # Validate before saving
         self.clean()
+        if kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = fields_to_save(self, VIDEO_COUNTER_FIELDS)
         super().save(*args, **kwargs)
 
     @property
@@ -189,55 +244,45 @@ class Video(TimeStampedModel, UserTrackingMixin):
         """Calculate age string in human-readable format."""
         if recording_date < birth_date:
             return "Invalid: Recording before birth"
-            
-        delta = recording_date - birth_date
-        total_days = delta.days
-        
+
+        total_days = (recording_date - birth_date).days
+
         if total_days == 0:
             return "Same day as birth"
         elif total_days < 7:
             return f"{total_days} day{'s' if total_days != 1 else ''}"
-        elif total_days < 30:
+
+        years, months, days = (int(part) for part in age_ymd(birth_date, recording_date))
+        if years == 0 and months == 0:
             weeks, days = divmod(total_days, 7)
             if days == 0:
                 return f"{weeks} week{'s' if weeks != 1 else ''}"
             return f"{weeks} week{'s' if weeks != 1 else ''} and {days} day{'s' if days != 1 else ''}"
-        elif total_days < 365:
-            months, remaining_days = divmod(total_days, 30)
-            weeks, days = divmod(remaining_days, 7)
-            if weeks == 0 and days == 0:
+        elif years == 0:
+            if days == 0:
                 return f"{months} month{'s' if months != 1 else ''}"
-            elif days == 0:
-                return f"{months} month{'s' if months != 1 else ''} and {weeks} week{'s' if weeks != 1 else ''}"
             return f"{months} month{'s' if months != 1 else ''} and {days} day{'s' if days != 1 else ''}"
         else:
-            years, remaining_days = divmod(total_days, 365)
-            months, days = divmod(remaining_days, 30)
-            if months == 0 and days == 0:
+            if months == 0:
                 return f"{years} year{'s' if years != 1 else ''}"
-            elif days == 0:
-                return f"{years} year{'s' if years != 1 else ''} and {months} month{'s' if months != 1 else ''}"
             return f"{years} year{'s' if years != 1 else ''} and {months} month{'s' if months != 1 else ''}"
     
     # Cached properties to avoid repeated database hits
     def is_new_file(self):
         """Check if this video has been used in any assessments."""
-        from patients.models import GMAssessment
-        return not GMAssessment.objects.filter(video_file=self).exists()
+        return not self.assessed
     
     def is_bookmarked(self):
         """Check if this video is bookmarked by any user."""
-        from patients.models import Bookmark
-        return Bookmark.objects.filter(
-            bookmark_type="File", 
-            object_id=self.pk
-        ).exists()
+        return self.get_bookmark() is not None
     
     def get_bookmark(self):
         """Get the bookmark object if it exists."""
         from patients.models import Bookmark
+        if hasattr(self, "bookmark_pk"):
+            return Bookmark.from_annotation(self, "Video")
         return Bookmark.objects.filter(
-            bookmark_type="File", 
+            bookmark_type="Video", 
             object_id=self.pk
         ).first()
     
@@ -307,3 +352,111 @@ class Video(TimeStampedModel, UserTrackingMixin):
         self.processing_status = 'failed'
         self.is_assessment_ready = False
         self.save(update_fields=['processing_status', 'is_assessment_ready', 'updated_at'])
+
+    def delete_renditions(self):
+        """Delete the transcoded renditions and their files."""
+        for rendition in self.renditions.all():
+            rendition.delete_with_files()
+
+    def thumbnail_url(self, kind, field_file):
+        """Versioned URL of a preview file, so it can be cached for good."""
+        if not field_file:
+            return None
+        version = hashlib.sha1(field_file.name.encode()).hexdigest()[:10]
+        return f"{reverse('video:thumbnail', args=[self.pk, kind])}?v={version}"
+
+    @property
+    def poster_url(self):
+        return self.thumbnail_url("poster", self.poster)
+
+    @property
+    def thumbnail_track_url(self):
+        return self.thumbnail_url("track", self.thumbnail_track)
+
+    def delete_thumbnails(self):
+        """Delete the poster, sprite sheet and thumbnail track files."""
+        for field in self.THUMBNAIL_FIELDS:
+            field_file = getattr(self, field)
+            if field_file:
+                field_file.delete(save=False)
+        if self.pk:
+            self.save(update_fields=[*self.THUMBNAIL_FIELDS, "updated_at"])
+
+
+class VideoRendition(TimeStampedModel):
+    """
+    A transcoded H.264/AAC MP4 copy of a video at one quality tier, with its
+    measured size. The original upload is the "original" tier and has no row.
+    """
+
+    video = models.ForeignKey(
+        Video,
+        on_delete=models.CASCADE,
+        related_name="renditions",
+        verbose_name=_("Video"),
+    )
+    quality = models.CharField(
+        max_length=20,
+        choices=QUALITY_CHOICES,
+        verbose_name=_("Quality"),
+    )
+    file = models.FileField(
+        upload_to=get_compressed_video_path,
+        verbose_name=_("Rendition File"),
+    )
+    width = models.PositiveSmallIntegerField(verbose_name=_("Width"))
+    height = models.PositiveSmallIntegerField(verbose_name=_("Height"))
+    file_size_bytes = models.PositiveBigIntegerField(
+        verbose_name=_("File Size (bytes)"),
+    )
+    bitrate_kbps = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Bitrate (kbps)"),
+    )
+    has_audio = models.BooleanField(default=False, verbose_name=_("Has Audio"))
+    # Storage name of the HLS media playlist; segments sit next to it
+    hls_playlist = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        verbose_name=_("HLS Playlist"),
+    )
+
+    class Meta:
+        verbose_name = _("Video Rendition")
+        verbose_name_plural = _("Video Renditions")
+        ordering = ["video", "height"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["video", "quality"], name="unique_rendition_per_quality"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.video.title} ({self.get_quality_display()})"
+
+    # get_compressed_video_path names the file after the video's patient/title
+    @property
+    def patient(self):
+        return self.video.patient
+
+    @property
+    def title(self):
+        return f"{self.video.title}-{self.quality}"
+
+    @property
+    def file_size_mb(self):
+        return round(self.file_size_bytes / (1024 * 1024), 2)
+
+    def delete_with_files(self):
+        """Delete the rendition, its file and its HLS segments."""
+        from video.hls import delete_segments
+
+        delete_segments(self)
+        self.file.delete(save=False)
+        self.delete()
+
+    @property
+    def resolution(self):
+        return f"{self.width}×{self.height}"
@@ -0,0 +1,166 @@
+"""
+Byte-range file responses for video playback.
+
+``stream_file`` answers a GET for a stored file. A single ``Range`` request
+gets ``206 Partial Content`` with only those bytes, so players can seek
+without downloading from the start. The body is a ``FileResponse`` over the
+open file, read in ``VIDEO_STREAM_CHUNK_SIZE`` blocks and capped at the end
+of the range. Multi-range requests and a stale ``If-Range`` get the whole
+file, as RFC 9110 allows.
+
+When ``VIDEO_STREAM_OFFLOAD`` names the front-end server, the response is
+only headers (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache or
+lighttpd), and that server sends the bytes itself, ranges included.
+Access checks stay in the Django view either way. Files in remote storage
+are redirected to their storage URL.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.http import http_date
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class _RangeFile:
+    """Read-only view of ``length`` bytes of an open file from ``start``"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single-range ``Range`` header, None
+    when the header should be ignored and the whole file sent.
+    """
+    match = _RANGE_RE.match(header.replace(" ", ""))
+    if match is None:
+        return None  # malformed or multiple ranges
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _validators(path, size):
+    mtime = os.path.getmtime(path)
+    etag = hashlib.sha1(f"{path}:{size}:{mtime}".encode()).hexdigest()[:20]
+    return f'"{etag}"', http_date(mtime)
+
+
+# Types mimetypes does not know everywhere
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".m4s": "video/iso.segment",
+    ".vtt": "text/vtt",
+}
+
+
+def _content_type(name):
+    extension = os.path.splitext(name)[1].lower()
+    if extension in CONTENT_TYPES:
+        return CONTENT_TYPES[extension]
+    content_type, _encoding = mimetypes.guess_type(name)
+    return content_type or "application/octet-stream"
+
+
+def _offload(name, path, content_type):
+    mode = settings.VIDEO_STREAM_OFFLOAD
+    response = HttpResponse(content_type=content_type)
+    if mode == "nginx":
+        response["X-Accel-Redirect"] = settings.VIDEO_STREAM_ACCEL_PREFIX + quote(name)
+    else:
+        response["X-Sendfile"] = path
+    return response
+
+
+def stream_file(request, storage, name, download_name=None):
+    """Response for a GET of the stored file ``name``, honouring ``Range``"""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage: its own (signed) URLs serve ranges
+        return HttpResponseRedirect(storage.url(name))
+    size = os.path.getsize(path)
+    content_type = _content_type(name)
+    etag, last_modified = _validators(path, size)
+
+    if settings.VIDEO_STREAM_OFFLOAD:
+        response = _offload(name, path, content_type)
+    elif request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    else:
+        byte_range = None
+        range_header = request.headers.get("Range")
+        if_range = request.headers.get("If-Range")
+        if range_header and (not if_range or if_range in (etag, last_modified)):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                response["Accept-Ranges"] = "bytes"
+                return response
+
+        handle = open(path, "rb")
+        if byte_range is None:
+            response = FileResponse(
+                _RangeFile(handle, 0, size), content_type=content_type
+            )
+            response["Content-Length"] = size
+        else:
+            start, end = byte_range
+            response = FileResponse(
+                _RangeFile(handle, start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Length"] = end - start + 1
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response.block_size = settings.VIDEO_STREAM_CHUNK_SIZE
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    # Access-checked content: browsers may cache it, shared caches may not
+    response["Cache-Control"] = "private, max-age=3600"
+    if download_name:
+        response["Content-Disposition"] = (
+            f"attachment; filename*=UTF-8''{quote(download_name)}"
+        )
+    return response
@@ -0,0 +1,250 @@
+"""
+Background processing of uploaded videos.
+
+``enqueue_processing`` schedules a video once the upload's transaction has
+committed, so the request returns immediately. The job claims the row
+(pending/failed -> processing) with a conditional UPDATE, so a video queued
+twice is processed once, then probes the file with ffprobe and records the
+metadata (completed) or the reason it is unusable (failed). Probe errors that
+may be transient are retried with backoff, the row going back to pending in
+between; the last attempt marks it failed. A completed video then gets a
+thumbnail job (poster, sprite sheet and WebVTT track, see ``video.thumbnails``)
+and one transcoding job per rendition tier (see ``video.transcode``), which
+also packages long recordings as HLS (``video.hls``).
+
+Jobs go to Celery when it is installed and a broker is configured
+(``CELERY_BROKER_URL``, defaulting to ``REDIS_URL``), otherwise to a small
+in-process thread pool; thumbnails and transcoding share their own pool (or
+Celery queue) bounded by ``VIDEO_TRANSCODE_CONCURRENCY``, so ffmpeg never
+takes every core. The
+status column is the source of truth either way:
+``process_pending_videos`` picks up rows left pending, e.g. by a restart
+before an in-process job ran, ``build_video_renditions`` fills in missing
+renditions and ``build_video_thumbnails`` missing previews.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ndas.custom_codes.video_probe import InvalidVideo, ProbeError, probe_file
+from video import hls, thumbnails
+from video.models import Video
+from video.transcode import TranscodeError, qualities_for, transcode_rendition
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+# Statuses a job may pick a video up from
+CLAIMABLE = ("pending", "failed")
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _backoff(attempt):
+    return settings.VIDEO_PROCESSING_RETRY_DELAY * 2**attempt
+
+
+def claim(video_id):
+    """Move a claimable video to processing; False when another job has it"""
+    return bool(
+        Video.objects.filter(pk=video_id, processing_status__in=CLAIMABLE).update(
+            processing_status="processing", updated_at=timezone.now()
+        )
+    )
+
+
+def process_video(video_id, final=True):
+    """
+    Probe one video and record the outcome. Returns the new status, or None
+    when the video was not claimable. When ``final`` is False a transient
+    ``ProbeError`` puts the video back to pending and is re-raised for the
+    caller to retry.
+    """
+    if not claim(video_id):
+        return None
+    try:
+        video = Video.objects.select_related("patient").get(pk=video_id)
+        metadata = probe_file(video.video_file)
+    except ProbeError as e:
+        if not final:
+            Video.objects.filter(pk=video_id).update(processing_status="pending")
+            logger.warning(f"Video {video_id} probe failed, will retry: {e}")
+            raise
+        logger.error(f"Video {video_id} probe failed, giving up: {e}")
+        video.mark_processing_failed()
+        return "failed"
+    except InvalidVideo as e:
+        logger.warning(f"Video {video_id} is not a usable video: {e}")
+        video.mark_processing_failed()
+        return "failed"
+    except Exception:
+        Video.objects.filter(pk=video_id).update(
+            processing_status="failed", is_assessment_ready=False
+        )
+        raise
+
+    video.mark_processing_completed(**metadata)
+    logger.info(f"Video {video_id} processed: {metadata}")
+    submit_thumbnails(video)
+    submit_transcoding(video)
+    return "completed"
+
+
+def process_video_with_retries(video_id):
+    """``process_video`` with the configured retries, in the calling thread"""
+    retries = settings.VIDEO_PROCESSING_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            return process_video(video_id, final=attempt >= retries)
+        except ProbeError:
+            time.sleep(_backoff(attempt))
+
+
+if shared_task is not None:
+
+    @shared_task(
+        bind=True,
+        name="video.process_video",
+        max_retries=settings.VIDEO_PROCESSING_RETRIES,
+    )
+    def process_video_task(self, video_id):
+        try:
+            return process_video(
+                video_id, final=self.request.retries >= self.max_retries
+            )
+        except ProbeError as e:
+            raise self.retry(exc=e, countdown=_backoff(self.request.retries))
+
+    @shared_task(name="video.transcode_rendition")
+    def transcode_rendition_task(video_id, quality):
+        run_transcoding(video_id, quality)
+
+    @shared_task(name="video.build_thumbnails")
+    def build_thumbnails_task(video_id):
+        run_thumbnails(video_id)
+
+
+def _use_celery():
+    return shared_task is not None and bool(
+        getattr(settings, "CELERY_BROKER_URL", None)
+    )
+
+
+def _get_executor(name, workers):
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix=f"video-{name}"
+            )
+        return _executors[name]
+
+
+def _in_background(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception(f"Background job {function.__name__}{args} crashed")
+    finally:
+        # Worker threads open their own connections; don't leak them
+        connections.close_all()
+
+
+def run_transcoding(video_id, quality):
+    """Transcode one rendition in the calling thread, logging the outcome"""
+    try:
+        rendition = transcode_rendition(video_id, quality)
+    except TranscodeError as e:
+        logger.error(f"Video {video_id} {quality} rendition failed: {e}")
+        return
+    if rendition is None:
+        return
+    logger.info(
+        f"Video {video_id} {quality} rendition: {rendition.resolution}, "
+        f"{rendition.file_size_mb} MB"
+    )
+    if hls.wanted(rendition.video):
+        run_segmenting(rendition)
+
+
+def run_thumbnails(video_id):
+    """Build one video's previews in the calling thread, logging the outcome"""
+    try:
+        video = thumbnails.build_thumbnails(video_id)
+    except TranscodeError as e:
+        logger.error(f"Video {video_id} thumbnails failed: {e}")
+        return
+    if video is not None:
+        logger.info(f"Video {video_id} thumbnails built")
+
+
+def run_segmenting(rendition):
+    """Package one rendition as HLS, logging the outcome"""
+    try:
+        hls.segment_rendition(rendition)
+    except TranscodeError as e:
+        logger.error(
+            f"Video {rendition.video_id} {rendition.quality} HLS failed: {e}"
+        )
+
+
+def submit(video_id):
+    """Start processing now, on Celery or the in-process executor"""
+    if _use_celery():
+        try:
+            process_video_task.delay(video_id)
+            return
+        except Exception as e:
+            # Broker down: the row is still pending, run it here instead
+            logger.error(f"Could not queue video {video_id} on Celery: {e}")
+    _get_executor("processing", settings.VIDEO_PROCESSING_WORKERS).submit(
+        _in_background, process_video_with_retries, video_id
+    )
+
+
+def submit_thumbnails(video):
+    """Start building ``video``'s poster, sprite sheet and thumbnail track"""
+    if _use_celery():
+        try:
+            build_thumbnails_task.apply_async(
+                args=[video.pk], queue=settings.VIDEO_TRANSCODE_QUEUE
+            )
+            return
+        except Exception as e:
+            logger.error(f"Could not queue video {video.pk} thumbnails: {e}")
+    _get_executor("transcode", settings.VIDEO_TRANSCODE_CONCURRENCY).submit(
+        _in_background, run_thumbnails, video.pk
+    )
+
+
+def submit_transcoding(video, qualities=None):
+    """Start transcoding ``video``'s rendition tiers (all that apply by default)"""
+    qualities = qualities_for(video) if qualities is None else qualities
+    for quality in qualities:
+        if _use_celery():
+            try:
+                transcode_rendition_task.apply_async(
+                    args=[video.pk, quality], queue=settings.VIDEO_TRANSCODE_QUEUE
+                )
+                continue
+            except Exception as e:
+                logger.error(f"Could not queue video {video.pk} transcoding: {e}")
+        _get_executor("transcode", settings.VIDEO_TRANSCODE_CONCURRENCY).submit(
+            _in_background, run_transcoding, video.pk, quality
+        )
+
+
+def enqueue_processing(video):
+    """Process ``video`` in the background once the current transaction commits"""
+    video_id = video.pk
+    transaction.on_commit(lambda: submit(video_id))
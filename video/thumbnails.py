@@ -0,0 +1,158 @@
+"""
+Poster frames, scrubbing sprite sheets and WebVTT thumbnail tracks.
+
+ffmpeg decodes only keyframes of the smallest available copy of the video
+(a rendition when one exists) and writes raw frames: one for the poster, and
+one every ``interval`` seconds for the sprite, with at most ``SPRITE_MAX_TILES``
+frames however long the recording. Pillow scales the poster into a progressive
+JPEG and tiles the sprite frames into one JPEG. The WebVTT track maps each
+time range to its tile (``#xywh=``). All three are a few tens of kilobytes,
+so list pages show previews without touching the video files.
+"""
+
+import math
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from ndas.custom_codes.video_probe import local_path
+from video.models import Video
+from video.transcode import TranscodeError, run_ffmpeg
+
+POSTER_WIDTH = 640
+POSTER_AT = 0.1  # fraction of the duration, capped at POSTER_MAX_SECONDS
+POSTER_MAX_SECONDS = 5
+TILE_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+SPRITE_MIN_INTERVAL = 2  # seconds
+JPEG_QUALITY = 75
+
+
+def sprite_interval(duration):
+    """Seconds between sprite frames for a ``duration``-second video"""
+    return max(SPRITE_MIN_INTERVAL, math.ceil(duration / SPRITE_MAX_TILES))
+
+
+def _source(video):
+    rendition = video.renditions.order_by("file_size_bytes").first()
+    return rendition.file if rendition else video.video_file
+
+
+def _frames_command(source, workdir, poster_at, interval):
+    return [
+        settings.FFMPEG_BINARY,
+        "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-skip_frame", "nokey",
+        "-i", source,
+        "-map", "0:v:0", "-vf", f"fps=1/{interval},scale={TILE_WIDTH}:-2",
+        "-vsync", "cfr",
+        os.path.join(workdir, "tile_%04d.png"),
+        "-ss", str(poster_at),
+        "-map", "0:v:0", "-vf", f"scale='min({POSTER_WIDTH},iw)':-2",
+        "-frames:v", "1",
+        os.path.join(workdir, "poster.png"),
+    ]  # fmt: skip
+
+
+def _jpeg(image, **options):
+    buffer = BytesIO()
+    image.convert("RGB").save(
+        buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, **options
+    )
+    return buffer.getvalue()
+
+
+def _sprite(tile_paths):
+    tiles = [Image.open(path) for path in tile_paths]
+    try:
+        width, height = tiles[0].size
+        columns = min(SPRITE_COLUMNS, len(tiles))
+        rows = math.ceil(len(tiles) / columns)
+        sheet = Image.new("RGB", (width * columns, height * rows))
+        for index, tile in enumerate(tiles):
+            row, column = divmod(index, columns)
+            sheet.paste(tile.resize((width, height)), (column * width, row * height))
+        return sheet, width, height, columns
+    finally:
+        for tile in tiles:
+            tile.close()
+
+
+def _timestamp(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def vtt_track(sprite_url, count, interval, duration, width, height, columns):
+    """WebVTT cues pointing each ``interval`` of the video at its sprite tile"""
+    lines = ["WEBVTT", ""]
+    for index in range(count):
+        start = index * interval
+        if start >= duration:
+            break
+        end = min(start + interval, duration)
+        row, column = divmod(index, columns)
+        lines += [
+            f"{_timestamp(start)} --> {_timestamp(end)}",
+            f"{sprite_url}#xywh={column * width},{row * height},{width},{height}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def build_thumbnails(video_id):
+    """
+    (Re)build the poster, sprite sheet and thumbnail track of a processed
+    video. Returns the video, or None when it is not ready.
+    """
+    video = Video.objects.select_related("patient").filter(pk=video_id).first()
+    if video is None or video.processing_status != "completed":
+        return None
+    duration = video.duration_seconds or 1
+    interval = sprite_interval(duration)
+    poster_at = min(duration * POSTER_AT, POSTER_MAX_SECONDS)
+
+    with local_path(_source(video)) as source, tempfile.TemporaryDirectory() as workdir:
+        run_ffmpeg(_frames_command(source, workdir, poster_at, interval))
+        poster_path = os.path.join(workdir, "poster.png")
+        tile_paths = sorted(
+            os.path.join(workdir, name)
+            for name in os.listdir(workdir)
+            if name.startswith("tile_")
+        )
+        if not os.path.exists(poster_path) and tile_paths:
+            poster_path = tile_paths[0]
+        if not os.path.exists(poster_path):
+            raise TranscodeError("ffmpeg extracted no frames")
+
+        with Image.open(poster_path) as poster:
+            poster_jpeg = _jpeg(poster, progressive=True)
+        sheet, width, height, columns = _sprite(tile_paths or [poster_path])
+        sprite_jpeg = _jpeg(sheet)
+
+    previous = [getattr(video, field).name for field in Video.THUMBNAIL_FIELDS]
+    video.poster.save("poster.jpg", ContentFile(poster_jpeg), save=False)
+    video.sprite_sheet.save("sprite.jpg", ContentFile(sprite_jpeg), save=False)
+    track = vtt_track(
+        video.thumbnail_url("sprite", video.sprite_sheet),
+        max(1, len(tile_paths)),
+        interval,
+        duration,
+        width,
+        height,
+        columns,
+    )
+    video.thumbnail_track.save("track.vtt", ContentFile(track.encode()), save=False)
+    video.save(update_fields=[*Video.THUMBNAIL_FIELDS, "updated_at"])
+
+    current = {getattr(video, field).name for field in Video.THUMBNAIL_FIELDS}
+    for name in previous:
+        if name and name not in current:
+            video.poster.storage.delete(name)
+    return video
@@ -0,0 +1,161 @@
+"""
+Transcoding videos into smaller renditions.
+
+Each quality tier of ``QUALITY_CHOICES`` below the original maps to a target
+short side (so portrait phone videos are sized like landscape ones), a CRF
+and a peak bitrate. Only tiers no larger than the source are produced. A
+rendition is H.264 (yuv420p) with AAC audio when the source has audio, in an
+MP4 with the index up front so playback can start before the download ends.
+
+The measured size of the output is stored on the ``VideoRendition``; an
+output that turns out no smaller than the original is discarded, since the
+original then serves that tier better.
+"""
+
+import logging
+import os
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+from ndas.custom_codes.video_probe import (
+    InvalidVideo,
+    ProbeError,
+    has_audio,
+    local_path,
+    read_streams,
+    summarize,
+)
+from video.models import Video, VideoRendition
+
+logger = logging.getLogger(__name__)
+
+# quality -> short side in pixels, x264 CRF, peak video and audio bitrates
+RENDITION_PROFILES = {
+    "high": {"short_side": 1080, "crf": 23, "maxrate_kbps": 5000, "audio_kbps": 128},
+    "medium": {"short_side": 720, "crf": 23, "maxrate_kbps": 2800, "audio_kbps": 96},
+    "low": {"short_side": 480, "crf": 24, "maxrate_kbps": 1200, "audio_kbps": 96},
+    "mobile": {"short_side": 360, "crf": 26, "maxrate_kbps": 700, "audio_kbps": 64},
+}
+
+
+class TranscodeError(Exception):
+    """ffmpeg could not produce a rendition"""
+
+
+def _even(value):
+    return max(2, int(round(value / 2)) * 2)
+
+
+def target_size(width, height, short_side):
+    """Output size for a ``width``×``height`` source scaled to ``short_side``"""
+    scale = short_side / min(width, height)
+    return _even(width * scale), _even(height * scale)
+
+
+def qualities_for(video):
+    """Tiers worth producing for ``video``: those not larger than its size"""
+    if not video.width or not video.height:
+        return []
+    short_side = min(video.width, video.height)
+    return [
+        quality
+        for quality, profile in RENDITION_PROFILES.items()
+        if profile["short_side"] <= short_side
+    ]
+
+
+def ffmpeg_command(source, output, width, height, profile):
+    maxrate = profile["maxrate_kbps"]
+    return [
+        settings.FFMPEG_BINARY,
+        "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-i", source,
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale={width}:{height}",
+        "-c:v", "libx264",
+        "-preset", settings.VIDEO_TRANSCODE_PRESET,
+        "-crf", str(profile["crf"]),
+        "-maxrate", f"{maxrate}k", "-bufsize", f"{2 * maxrate}k",
+        "-pix_fmt", "yuv420p",
+        # Keyframes on HLS segment boundaries (see video.hls)
+        "-force_key_frames",
+        f"expr:gte(t,n_forced*{settings.VIDEO_HLS_SEGMENT_SECONDS})",
+        "-c:a", "aac", "-b:a", f"{profile['audio_kbps']}k", "-ac", "2",
+        "-movflags", "+faststart",
+        "-threads", str(settings.VIDEO_TRANSCODE_THREADS),
+        output,
+    ]  # fmt: skip
+
+
+def run_ffmpeg(command):
+    try:
+        result = subprocess.run(
+            command, capture_output=True, timeout=settings.VIDEO_TRANSCODE_TIMEOUT
+        )
+    except FileNotFoundError:
+        raise TranscodeError(f"{settings.FFMPEG_BINARY} is not installed")
+    except subprocess.TimeoutExpired:
+        raise TranscodeError(
+            f"ffmpeg timed out after {settings.VIDEO_TRANSCODE_TIMEOUT}s"
+        )
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise TranscodeError(message[-1] if message else "ffmpeg failed")
+
+
+def _store(video, quality, output, metadata, audio):
+    size = os.path.getsize(output)
+    rendition = VideoRendition.objects.filter(video=video, quality=quality).first()
+    if rendition is None:
+        rendition = VideoRendition(video=video, quality=quality)
+    previous = rendition.file.name if rendition.pk else None
+
+    with open(output, "rb") as handle:
+        rendition.file.save(f"{quality}.mp4", File(handle), save=False)
+    rendition.width = metadata["width"]
+    rendition.height = metadata["height"]
+    rendition.file_size_bytes = size
+    rendition.bitrate_kbps = (
+        round(size * 8 / metadata["duration"] / 1000) if metadata["duration"] else None
+    )
+    rendition.has_audio = audio
+    rendition.save()
+    if previous and previous != rendition.file.name:
+        rendition.file.storage.delete(previous)
+    return rendition
+
+
+def transcode_rendition(video_id, quality):
+    """
+    Produce (or replace) one rendition of a processed video. Returns the
+    ``VideoRendition``, or None when there was nothing worth keeping.
+    """
+    video = Video.objects.select_related("patient").filter(pk=video_id).first()
+    if video is None or video.processing_status != "completed":
+        return None
+    if quality not in qualities_for(video):
+        return None
+    profile = RENDITION_PROFILES[quality]
+    width, height = target_size(video.width, video.height, profile["short_side"])
+
+    with local_path(video.video_file) as source, tempfile.TemporaryDirectory() as workdir:
+        output = os.path.join(workdir, f"{quality}.mp4")
+        run_ffmpeg(ffmpeg_command(source, output, width, height, profile))
+        try:
+            data = read_streams(output)
+            metadata = summarize(data)
+        except (ProbeError, InvalidVideo) as e:
+            raise TranscodeError(f"Unreadable {quality} rendition: {e}")
+
+        if video.file_size_bytes and os.path.getsize(output) >= video.file_size_bytes:
+            logger.info(
+                f"Video {video_id} {quality} rendition is no smaller than the "
+                "original, not kept"
+            )
+            for stale in VideoRendition.objects.filter(video=video, quality=quality):
+                stale.delete_with_files()
+            return None
+        return _store(video, quality, output, metadata, has_audio(data))
@@ -10,6 +10,11 @@ urlpatterns = [
     path("add/<int:patient_id>/", views.video_add, name="add"),
     path("view/<int:video_id>/", views.video_view, name="view"),
     path("edit/<int:video_id>/", views.video_edit, name="edit"),
+    path("stream/<int:video_id>/", views.video_stream, name="stream"),
+    path("stream/<int:video_id>/<str:quality>/", views.video_stream, name="stream-rendition"),
+    path("hls/<int:video_id>/master.m3u8", views.video_hls_master, name="hls-master"),
+    path("hls/<int:video_id>/<str:quality>/<str:name>", views.video_hls_file, name="hls-file"),
+    path("thumbnail/<int:video_id>/<str:kind>/", views.video_thumbnail, name="thumbnail"),
     path("delete/<int:video_id>/", views.video_delete, name="delete"),
     path("delete-confirm/<int:video_id>/", views.video_delete_confirm, name="delete-confirm"),
 ]
\ No newline at end of file
@@ -4,11 +4,11 @@ Enhanced video views with complete upload and processing functionality.
 
 import json
 import logging
+import os
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden, Http404
-from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
@@ -16,14 +16,23 @@ from django.db.models import Q
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 
-from patients.models import Patient
+from patients.models import Bookmark, Patient
 from .models import Video
 from .forms import VideoForm
+from . import hls
+from .streaming import stream_file
+from .tasks import enqueue_processing
 from ndas.custom_codes.choice import PROCESSING_STATUS
+from ndas.custom_codes.pagination import paginate
 
 logger = logging.getLogger(__name__)
 
 
+def can_access_video(user, video):
+    """Staff see every video, other users the ones they uploaded"""
+    return user.is_staff or video.added_by_id == user.id
+
+
 @login_required(login_url="user-login")
 def video_add(request, patient_id):
     """Enhanced video upload with proper form handling and progress tracking"""
@@ -45,6 +54,7 @@ def video_add(request, patient_id):
                         raise ValidationError('Recording date cannot be before patient birth date.')
                 
                 video.save()
+                enqueue_processing(video)
 
                 logger.info(f"Video uploaded successfully: {video.id} by user {request.user.id}")
 
@@ -109,7 +119,7 @@ def video_view(request, video_id):
     video = get_object_or_404(Video, id=video_id)
 
     # Check access permissions
-    if not request.user.is_staff and video.added_by != request.user:
+    if not can_access_video(request.user, video):
         messages.error(request, "You do not have permission to view this video.")
         return redirect("manage-patients")
 
@@ -126,12 +136,44 @@ def video_view(request, video_id):
     except:
         is_new_file = True
 
+    # Sources the player picks from: the original plus each rendition
+    renditions = list(video.renditions.order_by("file_size_bytes"))
+    sources = [
+        {
+            "src": reverse("video:stream-rendition", args=[video.id, rendition.quality]),
+            "quality": rendition.quality,
+            "width": rendition.width,
+            "height": rendition.height,
+            "size": rendition.file_size_bytes,
+        }
+        for rendition in renditions
+    ]
+    sources.append(
+        {
+            "src": reverse("video:stream", args=[video.id]),
+            "quality": "original",
+            "width": video.width,
+            "height": video.height,
+            "size": video.file_size_bytes,
+        }
+    )
+    if any(rendition.hls_playlist for rendition in renditions):
+        sources.append(
+            {
+                "src": reverse("video:hls-master", args=[video.id]),
+                "quality": "auto",
+                "type": "application/x-mpegURL",
+            }
+        )
+
     context = {
         "video": video,
         "file": video,  # For backward compatibility with template
         "patient": video.patient,
         "bookmark": bookmark,
         "is_new_file": is_new_file,
+        "renditions": renditions,
+        "video_sources": sources,
         "page_title": f"Video: {video.title}",
         "breadcrumbs": [
             {"name": "Dashboard", "url": reverse("home")},
@@ -143,6 +185,96 @@ def video_view(request, video_id):
     return render(request, "video/view.html", context)
 
 
+@login_required(login_url="user-login")
+@require_http_methods(["GET", "HEAD"])
+def video_stream(request, video_id, quality="original"):
+    """Serve the video (or one rendition) with byte-range support"""
+    video = get_object_or_404(Video.objects.select_related("patient"), id=video_id)
+    if not can_access_video(request.user, video):
+        return HttpResponseForbidden("You do not have permission to view this video.")
+
+    if quality == "original":
+        field_file = video.video_file
+    else:
+        rendition = get_object_or_404(video.renditions, quality=quality)
+        field_file = rendition.file
+    if not field_file:
+        raise Http404("Video file not found")
+
+    download_name = None
+    if request.GET.get("download"):
+        extension = os.path.splitext(field_file.name)[1]
+        download_name = f"{video.title}{extension}"
+    try:
+        return stream_file(
+            request, field_file.storage, field_file.name, download_name
+        )
+    except FileNotFoundError:
+        raise Http404("Video file not found")
+
+
+@login_required(login_url="user-login")
+@require_http_methods(["GET", "HEAD"])
+def video_hls_master(request, video_id):
+    """HLS master playlist listing the segmented renditions"""
+    video = get_object_or_404(Video, id=video_id)
+    if not can_access_video(request.user, video):
+        return HttpResponseForbidden("You do not have permission to view this video.")
+    playlist = hls.master_playlist(video.renditions.all())
+    if playlist is None:
+        raise Http404("This video has no HLS stream")
+    response = HttpResponse(playlist, content_type=hls.CONTENT_TYPE)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@login_required(login_url="user-login")
+@require_http_methods(["GET", "HEAD"])
+def video_hls_file(request, video_id, quality, name):
+    """A rendition's HLS media playlist or one of its segments"""
+    video = get_object_or_404(Video, id=video_id)
+    if not can_access_video(request.user, video):
+        return HttpResponseForbidden("You do not have permission to view this video.")
+    rendition = get_object_or_404(video.renditions, quality=quality)
+    storage_name = hls.segment_name(rendition, name)
+    if storage_name is None:
+        raise Http404("No such HLS file")
+    try:
+        return stream_file(request, rendition.file.storage, storage_name)
+    except FileNotFoundError:
+        raise Http404("No such HLS file")
+
+
+# URL kind -> Video field of the preview files
+THUMBNAIL_KINDS = {
+    "poster": "poster",
+    "sprite": "sprite_sheet",
+    "track": "thumbnail_track",
+}
+
+
+@login_required(login_url="user-login")
+@require_http_methods(["GET", "HEAD"])
+def video_thumbnail(request, video_id, kind):
+    """A video's poster, sprite sheet or WebVTT thumbnail track"""
+    if kind not in THUMBNAIL_KINDS:
+        raise Http404("No such thumbnail")
+    video = get_object_or_404(Video, id=video_id)
+    if not can_access_video(request.user, video):
+        return HttpResponseForbidden("You do not have permission to view this video.")
+    field_file = getattr(video, THUMBNAIL_KINDS[kind])
+    if not field_file:
+        raise Http404("No such thumbnail")
+    try:
+        response = stream_file(request, field_file.storage, field_file.name)
+    except FileNotFoundError:
+        raise Http404("No such thumbnail")
+    if request.get_full_path() == video.thumbnail_url(kind, field_file):
+        # Rebuilt previews get new file names, hence new versioned URLs
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
 @login_required(login_url="user-login")
 def video_edit(request, video_id):
     """Edit video details with enhanced validation and error handling"""
@@ -167,7 +299,21 @@ def video_edit(request, video_id):
                         form.add_error('recorded_on', 'Recording date cannot be before patient birth date.')
                         raise ValidationError('Recording date cannot be before patient birth date.')
                 
+                file_replaced = "video_file" in form.changed_data
+                if file_replaced:
+                    # The new file is probed again; drop the old one's metadata
+                    updated_video.processing_status = "pending"
+                    updated_video.is_assessment_ready = False
+                    updated_video.file_size_bytes = None
+                    updated_video.duration_seconds = None
+                    updated_video.width = None
+                    updated_video.height = None
+
                 updated_video.save()
+                if file_replaced:
+                    updated_video.delete_renditions()
+                    updated_video.delete_thumbnails()
+                    enqueue_processing(updated_video)
 
                 logger.info(f"Video updated successfully: {video.id} by user {request.user.id}")
                 messages.success(request, "Video information updated successfully.")
@@ -236,7 +382,6 @@ def video_manager(request):
     patient_filter = request.GET.get("patient", "")
     date_from = request.GET.get("date_from", "")
     date_to = request.GET.get("date_to", "")
-    page_number = request.GET.get("page", 1)
 
     # Base queryset with optimized related data loading
     queryset = (
@@ -291,16 +436,10 @@ def video_manager(request):
                 request, "Invalid 'to' date format. Please use YYYY-MM-DD format."
             )
 
-    # Get total count before pagination
-    total_count = queryset.count()
-
-    # Pagination with proper error handling
-    paginator = Paginator(queryset, 25)  # Show 25 videos per page
-    try:
-        page_obj = paginator.get_page(page_number)
-    except Exception as e:
-        logger.error(f"Pagination error: {str(e)}")
-        page_obj = paginator.get_page(1)
+    # Cursor pagination; the total is counted on the first page only
+    queryset = Bookmark.annotate_bookmark_ids(queryset, "Video", request.user)
+    page_obj = paginate(request, queryset, 25)  # Show 25 videos per page
+    total_count = page_obj.paginator.count
 
     # Get unique patients for filter dropdown (optimized query)
     patients = (
@@ -341,17 +480,14 @@ def video_manager_new_only(request):
     # Base queryset for new videos only
     queryset = (
         Video.objects.select_related("patient", "added_by", "last_edit_by")
-        .filter(is_new_file=True)
+        .filter(assessed=False)
         .order_by("-recorded_on", "-created_at")
     )
 
-    # Get total count
-    total_count = queryset.count()
-
-    # Pagination
-    paginator = Paginator(queryset, 25)
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination; the total is counted on the first page only
+    queryset = Bookmark.annotate_bookmark_ids(queryset, "Video", request.user)
+    page_obj = paginate(request, queryset, 25)
+    total_count = page_obj.paginator.count
 
     # Get processing status choices for filter dropdown
     status_choices = PROCESSING_STATUS
@@ -398,13 +534,10 @@ def video_manager_by_patient(request, patient_id):
     if status_filter:
         queryset = queryset.filter(processing_status=status_filter)
 
-    # Get total count
-    total_count = queryset.count()
-
-    # Pagination
-    paginator = Paginator(queryset, 25)
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
+    # Cursor pagination; the total is counted on the first page only
+    queryset = Bookmark.annotate_bookmark_ids(queryset, "Video", request.user)
+    page_obj = paginate(request, queryset, 25)
+    total_count = page_obj.paginator.count
 
     # Get processing status choices for filter dropdown
     status_choices = PROCESSING_STATUS
@@ -490,7 +623,12 @@ def video_delete(request, video_id):
         patient_id = video.patient.id
         video_title = video.title
 
-        # Delete the video file from storage
+        # Delete the video file, its renditions and previews from storage
+        try:
+            video.delete_renditions()
+            video.delete_thumbnails()
+        except Exception as e:
+            logger.warning(f"Failed to delete video renditions: {e}")
         if video.video_file:
             try:
                 video.video_file.delete(save=False)